@@ -0,0 +1,310 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from money import parse_minor
+
+# Positions in the list stored for every group of the rollups
+INCOME, EXPENDITURE, INCOME_ROWS, EXPENDITURE_ROWS = range(4)
+
+# Version of the persisted rollups, rollups of another version are rebuilt (version 2 holds sums in minor units)
+FORMAT_VERSION = 2
+
+
+def parse_date(value):
+    """
+    Parse the date of one record stored in the format dd.mm.yyyy.
+
+    Args:
+        value (str): The date as stored in the ledger file.
+
+    Returns:
+        datetime or None: The parsed date, None if the date can not be parsed.
+    """
+    try:
+        return datetime.strptime(value, "%d.%m.%Y")
+    except (TypeError, ValueError):
+        return None
+
+
+def day_key(parsed):
+    """
+    Build the key of the day of a parsed date, like the datetime64[D] days of the typed ledger render as text.
+
+    The year is zero-padded explicitly, strftime("%Y") leaves years below 1000 unpadded.
+
+    Args:
+        parsed (datetime): The parsed date.
+
+    Returns:
+        str: The day as YYYY-MM-DD.
+    """
+    return f"{parsed.year:04d}-{parsed.month:02d}-{parsed.day:02d}"
+
+
+def month_key(parsed):
+    """
+    Build the key of the month of a parsed date, like the datetime64[M] months of the typed ledger render as text.
+
+    Args:
+        parsed (datetime): The parsed date.
+
+    Returns:
+        str: The month as YYYY-MM.
+    """
+    return f"{parsed.year:04d}-{parsed.month:02d}"
+
+
+def sidecar_path(path):
+    """
+    Build the path of the file holding the persisted rollups of a ledger.
+
+    The file is hidden and placed next to the ledger, so it is not listed between the ledgers in the home frame.
+
+    Args:
+        path (str): The path of the ledger file.
+
+    Returns:
+        str: The path of the rollups file.
+    """
+    directory, file_name = os.path.split(path)
+    return os.path.join(directory, "." + os.path.splitext(file_name)[0] + ".aggregates.json")
+
+
+class AggregateStore:
+    """
+    Running rollups of income and expenditure of one ledger.
+
+    The store keeps the sums (in minor units) and the numbers of income and expenditure rows per day, per month and
+    per category, together with the totals. Adding or removing a record updates one group of every rollup, so it costs
+    O(1) regardless of the size of the ledger. Statistics and chart inputs derived from the store only walk the groups,
+    never the records.
+    """
+
+    def __init__(self, daily=None, monthly=None, categories=None, totals=None):
+        self.daily = daily if daily is not None else {}
+        self.monthly = monthly if monthly is not None else {}
+        self.categories = categories if categories is not None else {}
+        self.totals = totals if totals is not None else [0, 0, 0, 0]
+
+    @classmethod
+    def from_ledger(cls, ledger):
+        """
+        Build the rollups of a whole ledger with vectorized groupings.
+
+        Args:
+            ledger (Ledger): The typed ledger.
+
+        Returns:
+            AggregateStore: The rollups of the ledger.
+        """
+        store = cls()
+        dated = ledger.dated
+        _add_groups(store.daily, dated.date.astype(str), dated)
+        _add_groups(store.monthly, dated.year_month.astype(str), dated)
+        _add_categories(store.categories, ledger)
+        store.totals = [int(ledger.incomes.price.sum()), int(ledger.expenditures.price.sum()),
+                        len(ledger.incomes), len(ledger.expenditures)]
+        return store
+
+    def copy(self):
+        """
+        Copy the store, the copy can be updated without changing the original.
+
+        Returns:
+            AggregateStore: The copied store.
+        """
+        return AggregateStore(daily={key: list(value) for key, value in self.daily.items()},
+                              monthly={key: list(value) for key, value in self.monthly.items()},
+                              categories={key: list(value) for key, value in self.categories.items()},
+                              totals=list(self.totals))
+
+    def add(self, date, type_of_ex_in, price, in_or_ex, sign=1):
+        """
+        Add one record to the rollups.
+
+        Args:
+            date (str): The date of the record in the format dd.mm.yyyy.
+            type_of_ex_in (str): The type of the record.
+            price (str): The price of the record.
+            in_or_ex (str): "1" for income, "0" for expenditure.
+            sign (int): 1 to add the record, -1 to remove it.
+        """
+        is_income = in_or_ex == "1"
+        value = parse_minor(price) * sign
+        column = INCOME if is_income else EXPENDITURE
+        rows = INCOME_ROWS if is_income else EXPENDITURE_ROWS
+
+        groups = [(self.categories, str(type_of_ex_in))]
+        parsed = parse_date(date)
+        if parsed is not None:
+            groups.append((self.daily, day_key(parsed)))
+            groups.append((self.monthly, month_key(parsed)))
+
+        for rollup, key in groups:
+            group = rollup.setdefault(key, [0, 0, 0, 0])
+            group[column] += value
+            group[rows] += sign
+            if group[INCOME_ROWS] == 0 and group[EXPENDITURE_ROWS] == 0:
+                # The last record of the group was removed
+                del rollup[key]
+
+        self.totals[column] += value
+        self.totals[rows] += sign
+
+    def remove(self, date, type_of_ex_in, price, in_or_ex):
+        """
+        Remove one record from the rollups.
+
+        Args:
+            date (str): The date of the record in the format dd.mm.yyyy.
+            type_of_ex_in (str): The type of the record.
+            price (str): The price of the record.
+            in_or_ex (str): "1" for income, "0" for expenditure.
+        """
+        self.add(date, type_of_ex_in, price, in_or_ex, sign=-1)
+
+    def replace(self, old_record, new_record):
+        """
+        Replace an edited record in the rollups.
+
+        Args:
+            old_record (tuple): The record before the edit as (date, type, price, income_expenditure).
+            new_record (tuple): The record after the edit as (date, type, price, income_expenditure).
+        """
+        self.remove(*old_record)
+        self.add(*new_record)
+
+    def expenditure_by_category(self):
+        """
+        Sum the expenditure by category.
+
+        Returns:
+            tuple: Categories with at least one expenditure (sorted) and their expenditure sums.
+        """
+        keys = sorted(key for key, group in self.categories.items() if group[EXPENDITURE_ROWS])
+        return keys, [self.categories[key][EXPENDITURE] for key in keys]
+
+    def by_month_of_year(self, column):
+        """
+        Fold the monthly rollup by the month of the year.
+
+        Args:
+            column (int): INCOME or EXPENDITURE.
+
+        Returns:
+            dict: The month of the year (1-12) mapped to the sum and the number of rows of the column.
+        """
+        rows = INCOME_ROWS if column == INCOME else EXPENDITURE_ROWS
+        folded = {}
+        for key, group in self.monthly.items():
+            if group[rows]:
+                month = folded.setdefault(int(key[5:7]), [0, 0])
+                month[0] += group[column]
+                month[1] += group[rows]
+        return folded
+
+    def balance_by_month_of_year(self):
+        """
+        Calculate income minus expenditure for every month of the year with at least one record.
+
+        Returns:
+            tuple: The months of the year (sorted) and their balances.
+        """
+        balance = {}
+        for key, group in self.monthly.items():
+            month = int(key[5:7])
+            balance[month] = balance.get(month, 0) + group[INCOME] - group[EXPENDITURE]
+        months = sorted(balance)
+        return months, [balance[month] for month in months]
+
+    def expenditure_by_day_of_year(self):
+        """
+        Fold the daily rollup by the day and month, ignoring the year.
+
+        Returns:
+            dict: (day, month) mapped to the expenditure sum of the days with at least one expenditure.
+        """
+        folded = {}
+        for key, group in self.daily.items():
+            if group[EXPENDITURE_ROWS]:
+                day = (int(key[8:10]), int(key[5:7]))
+                folded[day] = folded.get(day, 0) + group[EXPENDITURE]
+        return folded
+
+    def to_dict(self):
+        """
+        Convert the store to a JSON serializable dictionary.
+        """
+        return {"daily": self.daily, "monthly": self.monthly, "categories": self.categories, "totals": self.totals}
+
+    def save(self, path, signature):
+        """
+        Persist the rollups next to the ledger.
+
+        Args:
+            path (str): The path of the ledger file.
+            signature (tuple): The signature of the ledger file the rollups describe.
+        """
+        data = self.to_dict()
+        data["signature"] = list(signature)
+        data["version"] = FORMAT_VERSION
+        # The rollups are written in the background, readers never see a half written file
+        temporary = sidecar_path(path) + ".tmp"
+        with open(temporary, 'w') as f:
+            json.dump(data, f)
+        os.replace(temporary, sidecar_path(path))
+
+    @classmethod
+    def load(cls, path, signature):
+        """
+        Load the persisted rollups of a ledger.
+
+        Args:
+            path (str): The path of the ledger file.
+            signature (tuple): The current signature of the ledger file.
+
+        Returns:
+            AggregateStore or None: The rollups, None if they are missing or describe another version of the ledger.
+        """
+        try:
+            with open(sidecar_path(path), 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("signature") != list(signature) or data.get("version") != FORMAT_VERSION:
+            return None
+        return cls(daily=data["daily"], monthly=data["monthly"], categories=data["categories"], totals=data["totals"])
+
+
+def _add_categories(rollup, ledger):
+    """
+    Fill the rollup by category with the sums and row counts of one bincount over the category codes of the income and
+    of the expenditure rows, no type strings are compared.
+    """
+    for rows, column, count_column in ((ledger.incomes, INCOME, INCOME_ROWS),
+                                       (ledger.expenditures, EXPENDITURE, EXPENDITURE_ROWS)):
+        categories, sums, counts = rows.category_sums()
+        for category, value, count in zip(categories.tolist(), sums.tolist(), counts.tolist()):
+            group = rollup.setdefault(str(category), [0, 0, 0, 0])
+            group[column] += value
+            group[count_column] += count
+
+
+def _add_groups(rollup, keys, ledger):
+    """
+    Fill a rollup with the sums and row counts of the income and expenditure rows grouped by keys.
+    """
+    for is_income, column, rows in ((True, INCOME, INCOME_ROWS), (False, EXPENDITURE, EXPENDITURE_ROWS)):
+        mask = ledger.is_income == is_income
+        unique_keys, inverse = np.unique(keys[mask], return_inverse=True)
+        sums = np.zeros(len(unique_keys), dtype=np.int64)
+        np.add.at(sums, inverse, ledger.price[mask])
+        counts = np.bincount(inverse, minlength=len(unique_keys))
+        for key, value, count in zip(unique_keys.tolist(), sums.tolist(), counts.tolist()):
+            group = rollup.setdefault(key, [0, 0, 0, 0])
+            group[column] = value
+            group[rows] = count
@@ -0,0 +1,417 @@
+"""
+Import of bank statement exports (CSV) into ledgers.
+
+The rows of a statement are read in chunks of bounded size and every chunk is converted with column operations: the
+dates and amounts are parsed in the formats of the bank, the signs of the amounts tell incomes from expenditures and
+the expenditures are classified into the types of the ledger by keyword rules over their descriptions. Every row gets a
+content hash; the hashes of the imported rows are kept in an index next to the ledger, so importing a statement which
+overlaps an already imported one adds only the rows which are new. Run:
+
+    python bank_import.py ledger statement.csv [--profile profile.json]
+"""
+import argparse
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from money import MINOR_UNITS
+
+# Number of statement rows converted at once
+CHUNK_ROWS = 50000
+
+# Name of the import profile of the bank, it is placed next to the ledgers
+PROFILE_FILE = "bank_profile.json"
+
+# Type of the income records and of the expenditures matched by no rule, as used by the adding frame
+INCOME_TYPE = "Income"
+UNKNOWN_TYPE = "None"
+
+
+def import_index_path(path):
+    """
+    Build the path of the index of the statement rows imported into a ledger.
+
+    The index is hidden and placed next to the ledger, so it is not listed between the ledgers in the home frame.
+
+    Args:
+        path (str): The path of the ledger file.
+
+    Returns:
+        str: The path of the index.
+    """
+    directory, file_name = os.path.split(path)
+    return os.path.join(directory, "." + os.path.splitext(file_name)[0] + ".imports.npy")
+
+
+def profile_path(directory):
+    """
+    Build the path of the import profile of a directory with ledgers.
+
+    Args:
+        directory (str): The directory with the ledgers.
+
+    Returns:
+        str: The path of the profile.
+    """
+    return os.path.join(directory, PROFILE_FILE)
+
+
+class ImportProfile:
+    """
+    Layout of the statement exports of a bank.
+
+    The profile names the columns holding the date, the signed amount and the description of a transaction and the
+    formats they are written in. The rules map the types of the ledger to keywords searched in the descriptions.
+    A profile is stored as a JSON object with the arguments of the constructor as its keys, e.g.:
+
+        {"date": "Datum", "amount": "Částka", "description": "Zpráva", "date_format": "%d.%m.%Y",
+         "rules": {"Food": ["albert", "lidl"], "Fuel": ["shell", "omv"]}}
+    """
+
+    def __init__(self, date="date", amount="amount", description="description", date_format="%d.%m.%Y",
+                 decimal=",", thousands=" ", delimiter=";", encoding="utf-8", skip_rows=0, rules=None):
+        self.date = date
+        self.amount = amount
+        self.description = description
+        self.date_format = date_format
+        self.decimal = decimal
+        self.thousands = thousands
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.skip_rows = skip_rows
+        self.rules = rules if rules is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a profile from a JSON file.
+
+        Args:
+            path (str): The path of the profile.
+
+        Returns:
+            ImportProfile: The profile, the default one if the file does not exist.
+
+        Raises:
+            ValueError: If the file is not a valid profile.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        try:
+            return cls(**data)
+        except TypeError as e:
+            raise ValueError(f"The import profile {path} is not valid: {e}")
+
+
+class RuleClassifier:
+    """
+    Classifier of the expenditures of a statement by keywords in their descriptions.
+
+    The keywords of every type are joined into one case-insensitive pattern, so a chunk of descriptions is classified
+    by one vectorized search per type. The types are tried in the order of the rules and the first matching one wins.
+    """
+
+    def __init__(self, rules, default=UNKNOWN_TYPE):
+        self.default = default
+        self.patterns = [(expenditure_type, "|".join(re.escape(keyword) for keyword in keywords))
+                         for expenditure_type, keywords in rules.items() if keywords]
+
+    def classify(self, descriptions, is_income):
+        """
+        Find the types of the records of a chunk.
+
+        Args:
+            descriptions (pd.Series): The descriptions of the transactions.
+            is_income (np.ndarray): The boolean income flags.
+
+        Returns:
+            np.ndarray: The type of every record (object array), incomes are typed as income.
+        """
+        types = np.full(len(descriptions), self.default, dtype=object)
+        unassigned = ~is_income
+        for expenditure_type, pattern in self.patterns:
+            matched = descriptions.str.contains(pattern, case=False, regex=True).to_numpy(dtype=bool) & unassigned
+            types[matched] = expenditure_type
+            unassigned &= ~matched
+        types[is_income] = INCOME_TYPE
+        return types
+
+
+class ImportIndex:
+    """
+    Content hashes of the statement rows imported into a ledger.
+
+    The hashes are held as a sorted uint64 array, so the rows of a whole chunk are looked up by one binary search.
+    """
+
+    def __init__(self, hashes=None):
+        self.hashes = hashes if hashes is not None else np.array([], dtype=np.uint64)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read the index of a ledger.
+
+        Args:
+            path (str): The path of the ledger file.
+
+        Returns:
+            ImportIndex: The index, empty if nothing was imported into the ledger.
+        """
+        try:
+            return cls(np.load(import_index_path(path)))
+        except (OSError, ValueError):
+            return cls()
+
+    def save(self, path):
+        """
+        Write the index of a ledger through a temporary file, so readers never see a half written index.
+
+        Args:
+            path (str): The path of the ledger file.
+        """
+        target = import_index_path(path)
+        temporary = target + ".tmp"
+        with open(temporary, 'wb') as f:
+            np.save(f, self.hashes)
+        os.replace(temporary, target)
+
+    def contains(self, hashes):
+        """
+        Check which rows were already imported.
+
+        Args:
+            hashes (np.ndarray): The uint64 content hashes of the rows.
+
+        Returns:
+            np.ndarray: The boolean flag of every row.
+        """
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.searchsorted(self.hashes, hashes)
+        return self.hashes[np.minimum(positions, len(self.hashes) - 1)] == hashes
+
+    def add(self, hashes):
+        """
+        Add the hashes of imported rows.
+
+        Args:
+            hashes (np.ndarray): The uint64 content hashes of the rows.
+        """
+        self.hashes = np.union1d(self.hashes, np.asarray(hashes, dtype=np.uint64))
+
+
+class StatementImport:
+    """
+    Records of a statement which are not in the ledger yet.
+
+    The columns hold the values in the form stored in the ledger file, so they are added as records to the transaction
+    model; the hashes of the records are added to the import index once the ledger is saved.
+    """
+
+    def __init__(self):
+        self.columns = {"date": [], "type": [], "price": [], "income_expenditure": []}
+        self.hashes = []
+        self.rows = 0
+        self.duplicates = 0
+        self.invalid = 0
+        # Number of rows seen so far for every content, it tells apart identical transactions of one statement
+        self._occurrences = pd.Series(dtype=np.int64)
+
+    def __len__(self):
+        return len(self.columns["date"])
+
+    def new_hashes(self):
+        """
+        Collect the content hashes of the records.
+
+        Returns:
+            np.ndarray: The uint64 content hashes of the records.
+        """
+        return np.concatenate(self.hashes) if self.hashes else np.array([], dtype=np.uint64)
+
+    def records(self):
+        """
+        Iterate over the records in the form taken by the transaction model.
+
+        Returns:
+            zip: The date, type, price and income/expenditure flag of every record.
+        """
+        return zip(*(self.columns[name] for name in ("date", "type", "price", "income_expenditure")))
+
+    def add_chunk(self, chunk, profile, classifier, index):
+        """
+        Convert a chunk of statement rows and keep the rows which are not in the index.
+
+        Rows without a valid date or with a zero or unparsable amount are skipped.
+
+        Args:
+            chunk (pd.DataFrame): The rows of the statement as strings.
+            profile (ImportProfile): The layout of the statement.
+            classifier (RuleClassifier): The classifier of the expenditures.
+            index (ImportIndex): The hashes of the rows already imported into the ledger.
+        """
+        self.rows += len(chunk)
+        dates = pd.to_datetime(chunk[profile.date].str.strip(), format=profile.date_format, errors='coerce')
+        minor = parse_amounts(chunk[profile.amount], profile.decimal, profile.thousands)
+        if profile.description:
+            descriptions = chunk[profile.description].str.strip()
+        else:
+            descriptions = pd.Series("", index=chunk.index)
+
+        valid = dates.notna().to_numpy() & (minor != 0)
+        self.invalid += int(np.count_nonzero(~valid))
+        dates, minor, descriptions = dates[valid], minor[valid], descriptions[valid]
+
+        hashes = self._content_hashes(dates, minor, descriptions)
+        new = ~index.contains(hashes)
+        self.duplicates += int(np.count_nonzero(~new))
+        dates, minor, descriptions, hashes = dates[new], minor[new], descriptions[new], hashes[new]
+
+        is_income = minor > 0
+        # A statement spans few days, every day is formatted once
+        day_codes, days = pd.factorize(dates)
+        self.columns["date"].extend(np.asarray(days.strftime('%d.%m.%Y'), dtype=object)[day_codes])
+        self.columns["type"].extend(classifier.classify(descriptions, is_income))
+        self.columns["price"].extend(format_prices(np.abs(minor)))
+        self.columns["income_expenditure"].extend(np.where(is_income, "1", "0").tolist())
+        self.hashes.append(hashes)
+        index.add(hashes)
+
+    def _content_hashes(self, dates, minor, descriptions):
+        """
+        Hash the content of the rows: the date, the signed amount, the description and the occurrence of the same
+        content before, so several identical transactions of one day are all imported, and only once.
+        """
+        content = pd.DataFrame({"date": dates.to_numpy(), "amount": minor, "description": descriptions.to_numpy()})
+        base = pd.Series(pd.util.hash_pandas_object(content, index=False).to_numpy())
+        occurrence = base.groupby(base).cumcount().to_numpy() + \
+            self._occurrences.reindex(base).fillna(0).to_numpy(dtype=np.int64)
+        counts = base.value_counts()
+        self._occurrences = self._occurrences.add(counts, fill_value=0).astype(np.int64)
+
+        keyed = pd.DataFrame({"content": base.to_numpy(), "occurrence": occurrence})
+        return pd.util.hash_pandas_object(keyed, index=False).to_numpy()
+
+
+def parse_amounts(values, decimal=",", thousands=" "):
+    """
+    Parse the signed amounts of a statement into minor units.
+
+    Args:
+        values (pd.Series): The amounts as written by the bank.
+        decimal (str): The decimal separator.
+        thousands (str): The thousands separator, spaces are always ignored.
+
+    Returns:
+        np.ndarray: The int64 amounts in minor units, 0 if an amount can not be parsed.
+    """
+    text = values.fillna("").astype(str).str.replace(r"\s", "", regex=True)
+    if thousands and not thousands.isspace():
+        text = text.str.replace(thousands, "", regex=False)
+    if decimal != ".":
+        text = text.str.replace(decimal, ".", regex=False)
+    amount = pd.to_numeric(text, errors='coerce').to_numpy(dtype=np.float64)
+    amount = np.where(np.isfinite(amount), amount, 0)
+    return np.rint(amount * MINOR_UNITS).astype(np.int64)
+
+
+def format_prices(minor):
+    """
+    Format amounts in minor units as the prices stored in the ledger file, e.g. '250' or '12.50'.
+
+    Args:
+        minor (np.ndarray): The non-negative int64 amounts in minor units.
+
+    Returns:
+        list: The prices in crowns.
+    """
+    crowns, haler = np.divmod(minor, MINOR_UNITS)
+    text = pd.Series(crowns).astype(str)
+    fraction = pd.Series(haler).astype(str).str.zfill(2)
+    return list(text.where(haler == 0, text + "." + fraction))
+
+
+def read_statement(path, profile, index, job=None):
+    """
+    Read the rows of a statement which are not in the ledger yet.
+
+    The index is updated with the hashes of the read rows in memory only, it is saved by the caller together with the
+    ledger.
+
+    Args:
+        path (str): The path of the statement (CSV).
+        profile (ImportProfile): The layout of the statement.
+        index (ImportIndex): The hashes of the rows already imported into the ledger.
+        job (Job): The job running the function, checked between the chunks (optional).
+
+    Returns:
+        StatementImport: The new records and the counts of the read, duplicate and invalid rows.
+
+    Raises:
+        ValueError: If the statement lacks a column of the profile.
+    """
+    classifier = RuleClassifier(profile.rules)
+    columns = [name for name in (profile.date, profile.amount, profile.description) if name]
+    statement = StatementImport()
+    try:
+        chunks = pd.read_csv(path, sep=profile.delimiter, encoding=profile.encoding, skiprows=profile.skip_rows,
+                             usecols=columns, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS)
+    except ValueError as e:
+        raise ValueError(f"The statement {path} does not match the import profile: {e}")
+    with chunks:
+        for chunk in chunks:
+            if job is not None:
+                job.check()
+            statement.add_chunk(chunk, profile, classifier, index)
+    return statement
+
+
+def import_statement(path, statement_path, profile):
+    """
+    Import a statement into a ledger file and remember its rows in the import index.
+
+    Args:
+        path (str): The path of the ledger file.
+        statement_path (str): The path of the statement (CSV).
+        profile (ImportProfile): The layout of the statement.
+
+    Returns:
+        StatementImport: The imported records and the counts of the read, duplicate and invalid rows.
+    """
+    # The ledger cache pulls in the storages, they are needed only when the records are written
+    from ledger_cache import ledger_cache
+    from transactions import TransactionModel
+
+    index = ImportIndex.load(path)
+    statement = read_statement(statement_path, profile, index)
+    if len(statement):
+        model = TransactionModel.from_file_data(ledger_cache.load(path), ledger_cache.load_aggregates(path).copy())
+        model.extend(statement.records())
+        ledger_cache.save(path, model)
+        # The index is written after the ledger, an interrupted import is repeated as a whole
+        index.save(path)
+    return statement
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a bank statement export (CSV) into a ledger.")
+    parser.add_argument("ledger", help="path of the ledger file")
+    parser.add_argument("statement", help="path of the statement export")
+    parser.add_argument("--profile", help="import profile of the bank, bank_profile.json next to the ledger by default")
+    args = parser.parse_args()
+
+    profile = ImportProfile.load(args.profile or profile_path(os.path.dirname(os.path.abspath(args.ledger))))
+    statement = import_statement(args.ledger, args.statement, profile)
+    print(f"imported {len(statement)} of {statement.rows} rows, "
+          f"skipped {statement.duplicates} already imported and {statement.invalid} invalid rows")
+
+
+if __name__ == "__main__":
+    main()
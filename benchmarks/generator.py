@@ -0,0 +1,192 @@
+"""
+Generator of synthetic ledgers in the format of the ledger files.
+
+The records look like the ones entered in the adding frame: dates are appended in order over a span of years, every
+month starts with a salary, and expenditures of the six categories have typical price ranges. Large ledgers are written
+in chunks, so generating 10M records does not hold all of them in memory. Run from the repository root:
+
+    python -m benchmarks.generator /tmp/ledger.json --rows 1000000
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+CATEGORIES = ["Food", "Clothes", "Party", "Fuel", "Rent", "Sport"]
+
+# Relative frequency and (median, spread) of the lognormal prices of the expenditure categories
+CATEGORY_WEIGHTS = [0.45, 0.1, 0.15, 0.15, 0.05, 0.1]
+CATEGORY_PRICES = [(250, 0.8), (1200, 0.7), (600, 0.9), (1500, 0.3), (15000, 0.2), (400, 0.6)]
+
+# Monthly salary of the synthetic author
+SALARY = 235000
+
+FIRST_DAY = np.datetime64('2019-01-01')
+
+
+def generate_columns(rows, seed=0, years=5, offset=0, total=None):
+    """
+    Generate a chunk of records as typed columns.
+
+    Records are spread evenly over the span of years, so chunk `offset:offset + rows` of a ledger of `total` records
+    covers its own part of the span and concatenated chunks stay in date order.
+
+    Args:
+        rows (int): The number of records of the chunk.
+        seed (int): The seed of the random generator.
+        years (int): The span of the whole ledger in years.
+        offset (int): The position of the first record of the chunk in the ledger.
+        total (int): The number of records of the whole ledger, the chunk is the whole ledger if None.
+
+    Returns:
+        tuple: Dates (datetime64[D]), types, integer prices and income flags of the records.
+    """
+    total = rows if total is None else total
+    rng = np.random.default_rng([seed, offset])
+    span = years * 365
+
+    # Positions of the records spread over the span, sorted so the dates are appended in order
+    positions = np.sort(offset + rng.random(rows) * rows)
+    days = FIRST_DAY + (positions * span // max(total, 1)).astype('timedelta64[D]')
+
+    categories = rng.choice(len(CATEGORIES), size=rows, p=CATEGORY_WEIGHTS)
+    medians = np.array([median for median, _ in CATEGORY_PRICES])[categories]
+    spreads = np.array([spread for _, spread in CATEGORY_PRICES])[categories]
+    prices = np.maximum(1, np.round(medians * np.exp(rng.normal(0, spreads)))).astype(np.int64)
+    types = np.array(CATEGORIES, dtype=object)[categories]
+
+    # The first record of every month is the salary
+    months = days.astype('datetime64[M]')
+    is_income = np.ones(rows, dtype=bool)
+    is_income[1:] = months[1:] != months[:-1]
+    if offset > 0:
+        is_income[0] = False  # The month may have started in the previous chunk
+    types[is_income] = "Income"
+    prices[is_income] = SALARY
+    return days, types, prices, is_income
+
+
+def to_items(days, types, prices, is_income, offset=0):
+    """
+    Convert typed columns to the "items" dictionary of a ledger file.
+
+    Args:
+        days (np.ndarray): The datetime64[D] dates.
+        types (np.ndarray): The types of the records.
+        prices (np.ndarray): The integer prices.
+        is_income (np.ndarray): The income flags.
+        offset (int): The index of the first record.
+
+    Returns:
+        dict: The column lists of the ledger.
+    """
+    iso = days.astype(str)
+    return {
+        "index": list(range(offset, offset + len(days))),
+        "date": [f"{d[8:10]}.{d[5:7]}.{d[0:4]}" for d in iso],
+        "type": types.tolist(),
+        "price": prices.astype(str).tolist(),
+        "income_expenditure": np.where(is_income, "1", "0").tolist(),
+    }
+
+
+def make_items(rows, seed=0, years=5):
+    """
+    Build the "items" dictionary of a synthetic ledger in memory.
+
+    Args:
+        rows (int): The number of records.
+        seed (int): The seed of the random generator.
+        years (int): The span of the ledger in years.
+
+    Returns:
+        dict: The column lists of the ledger.
+    """
+    return to_items(*generate_columns(rows, seed, years))
+
+
+def make_ledger_data(rows, seed=0, years=5, author="Benchmark"):
+    """
+    Build the content of a synthetic ledger file in memory.
+
+    Args:
+        rows (int): The number of records.
+        seed (int): The seed of the random generator.
+        years (int): The span of the ledger in years.
+        author (str): The author stored in the header.
+
+    Returns:
+        dict: The content of the ledger file.
+    """
+    return {
+        "author": author,
+        "file_name": f"synthetic_{rows}",
+        "datetime": "01012024000000",
+        "items": make_items(rows, seed, years),
+    }
+
+
+def write_ledger(path, rows, seed=0, years=5, chunk_rows=1_000_000, author="Benchmark"):
+    """
+    Write a synthetic ledger file, generating and writing the records in chunks.
+
+    The file has the same header and "items" columns as the ledger files written by the application, only without
+    indentation, which keeps files of millions of records compact.
+
+    Args:
+        path (str): The path of the ledger file.
+        rows (int): The number of records.
+        seed (int): The seed of the random generator.
+        years (int): The span of the ledger in years.
+        chunk_rows (int): The number of records generated at once.
+        author (str): The author stored in the header.
+    """
+    # Every column is written as a separate list, so the chunks are written to one temporary file per column
+    names = ("index", "date", "type", "price", "income_expenditure")
+    parts = {name: open(f"{path}.{name}.tmp", 'w') for name in names}
+    try:
+        for offset in range(0, rows, chunk_rows):
+            columns = generate_columns(min(chunk_rows, rows - offset), seed, years, offset, rows)
+            for name, values in to_items(*columns, offset=offset).items():
+                text = json.dumps(values)[1:-1]
+                if text:
+                    parts[name].write(("," if offset else "") + text)
+        for part in parts.values():
+            part.close()
+
+        header = {"author": author, "file_name": os.path.splitext(os.path.basename(path))[0],
+                  "datetime": "01012024000000"}
+        with open(path, 'w') as f:
+            f.write(json.dumps(header)[:-1] + ', "items": {')
+            for position, name in enumerate(names):
+                f.write(("," if position else "") + json.dumps(name) + ": [")
+                with open(f"{path}.{name}.tmp", 'r') as part:
+                    while True:
+                        block = part.read(1 << 20)
+                        if not block:
+                            break
+                        f.write(block)
+                f.write("]")
+            f.write("}}")
+    finally:
+        for name, part in parts.items():
+            part.close()
+            if os.path.exists(f"{path}.{name}.tmp"):
+                os.remove(f"{path}.{name}.tmp")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic ledger file.")
+    parser.add_argument("path", help="path of the ledger file")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of records")
+    parser.add_argument("--years", type=int, default=5, help="span of the ledger in years")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    args = parser.parse_args()
+
+    write_ledger(args.path, args.rows, args.seed, args.years)
+    print(f"wrote {args.rows} records to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Reference implementations of the statistics panel, kept for the benchmarks.
+
+The panel of the visualization frame reads its statistics from the rollups of the ledger (statistics_from_aggregates).
+The two ways it used to compute them are kept here, free of Tk, as the baselines the benchmarks compare against and
+check the results of:
+
+- the original panel, seven pandas functions which each copy their part of the raw "items" of the file, parse its
+  dates and prices again and group it (original_statistics),
+- the same seven statistics rewritten on the typed ledger, one grouping per statistic (max_expenditure_per_day to
+  month_avg).
+"""
+import pandas as pd
+
+from ledger import group_sum
+from money import format_money
+
+# Text of a statistic which can not be computed, like formatting.format_statistic
+MISSING = "-"
+
+
+def prepare_data(df):
+    """
+    Convert the columns of the original panel to numbers and dates, like the panel did for every statistic.
+    """
+    new = df.copy()
+    new['price'] = pd.to_numeric(new['price'], errors='coerce')
+    new['date'] = pd.to_datetime(new['date'], format='%d.%m.%Y')
+    return new
+
+
+def original_statistics(items):
+    """
+    Compute the panel statistics like the original panel did, starting from the raw "items" of the ledger file.
+
+    Args:
+        items (dict): The column lists of the ledger file, every record must have a valid date.
+
+    Returns:
+        list: The values in crowns and the day, category or month they belong to, in the order of the panel.
+    """
+    data = pd.DataFrame(items)
+    df_exp = data[data['income_expenditure'] == "0"]
+    df_in = data[data['income_expenditure'] == "1"]
+
+    # Maximum expenditure in a single day (day.month)
+    df = prepare_data(df_exp)
+    df['date'] = df['date'].dt.strftime('%d.%m')
+    by_day = df.groupby('date')['price'].sum()
+
+    # Maximum expenditure by category
+    df = prepare_data(df_exp)
+    by_category = df.groupby('type')['price'].sum()
+
+    # Average expenditure per month of the year
+    df = prepare_data(df_exp)
+    df['date'] = df['date'].dt.strftime('%m')
+    expenditure_months = df.groupby('date')['price'].sum()
+
+    # Total spending
+    total_spending = prepare_data(df_exp)["price"].sum()
+
+    # Maximum and average income per month of the year
+    df = prepare_data(df_in)
+    df['date'] = df['date'].dt.strftime('%m')
+    income_months = df.groupby('date')['price'].sum()
+    df = prepare_data(df_in)
+    df['date'] = df['date'].dt.strftime('%m')
+    income_average = df.groupby('date')['price'].sum().mean()
+
+    # Total income
+    total_income = prepare_data(df_in)["price"].sum()
+
+    return [
+        (by_day.max(), by_day.idxmax()),
+        (by_category.max(), by_category.idxmax()),
+        (expenditure_months.mean(), None),
+        (total_spending, None),
+        (income_months.max(), income_months.idxmax()),
+        (income_average, None),
+        (total_income, None),
+    ]
+
+
+def max_expenditure_per_day(ledger):
+    """
+    Calculate the maximum expenditure in a single day.
+
+    Args:
+        ledger (Ledger): Ledger containing expenditure data.
+
+    Returns:
+        str: A formatted string indicating the maximum expenditure and the corresponding day.
+    """
+    dated = ledger.dated
+    # Days are grouped by day and month, the key dd * 100 + mm keeps the order of the 'dd.mm' labels
+    days, day_sum = group_sum(dated.day.astype(int) * 100 + dated.month, dated.price)
+    if len(days) == 0:
+        return MISSING
+    max_day = days[day_sum.argmax()]
+    max_value = day_sum.max()
+    return f"{format_money(max_value)} ({max_day // 100:02d}.{max_day % 100:02d})"
+
+
+def max_expenditure_by_category(ledger):
+    """
+    Calculate the maximum expenditure by category.
+
+    Args:
+        ledger (Ledger): Ledger containing expenditure data.
+
+    Returns:
+        str: A formatted string indicating the maximum expenditure and the corresponding category.
+    """
+    categories, category_sum, _ = ledger.category_sums()
+    if len(categories) == 0:
+        return MISSING
+    max_value = category_sum.max()
+    # Ties resolve to the first category in sorted order, like a sorted groupby
+    max_category = min(categories[category_sum == max_value].tolist(), key=str)
+    return f"{format_money(max_value)} ({max_category})"
+
+
+def avg_expenditure_per_month(ledger):
+    """
+    Calculate the average expenditure per month.
+
+    Args:
+        ledger (Ledger): Ledger containing expenditure data.
+
+    Returns:
+        str: A formatted string indicating the average expenditure per month.
+    """
+    dated = ledger.dated
+    _, month_sum = group_sum(dated.month, dated.price)
+    if len(month_sum) == 0:
+        return MISSING
+    avg_expenditure = month_sum.mean()
+    return f"{format_money(round(avg_expenditure))}"
+
+
+def total_spending(ledger):
+    """
+    Calculate the total spending.
+
+    Args:
+        ledger (Ledger): Ledger containing expenditure data.
+
+    Returns:
+        str: A formatted string indicating the total spending.
+    """
+    total = ledger.price.sum()
+    return f"{format_money(total)}"
+
+
+def total_income(ledger):
+    """
+    Calculate the total income.
+
+    Args:
+        ledger (Ledger): Ledger containing income data.
+
+    Returns:
+        str: A formatted string indicating the total income.
+    """
+    total = ledger.price.sum()
+    return f"{format_money(total)}"
+
+
+def month_max(ledger):
+    """
+    Calculate the maximum income in a single month.
+
+    Args:
+        ledger (Ledger): Ledger containing income data.
+
+    Returns:
+        str: A formatted string indicating the maximum income and the corresponding month.
+    """
+    dated = ledger.dated
+    months, month_sum = group_sum(dated.month, dated.price)
+    if len(months) == 0:
+        return MISSING
+    max_month = months[month_sum.argmax()]
+    max_value = month_sum.max()
+    return f"{format_money(max_value)} ({max_month:02d})"
+
+
+def month_avg(ledger):
+    """
+    Calculate the average income per month.
+
+    Args:
+        ledger (Ledger): Ledger containing income data.
+
+    Returns:
+        str: A formatted string indicating the average income per month.
+    """
+    dated = ledger.dated
+    _, month_sum = group_sum(dated.month, dated.price)
+    if len(month_sum) == 0:
+        return MISSING
+    avg_month = month_sum.mean()
+    return f"{format_money(round(avg_month))}"
+
+
+# Statistics functions of the typed ledger in the order of the panel and the part of the ledger they describe
+STATISTICS = [
+    (max_expenditure_per_day, "expenditures"),
+    (max_expenditure_by_category, "expenditures"),
+    (avg_expenditure_per_month, "expenditures"),
+    (total_spending, "expenditures"),
+    (month_max, "incomes"),
+    (month_avg, "incomes"),
+    (total_income, "incomes"),
+]
+
+
+def separate_statistics(ledger):
+    """
+    Compute the panel statistics with the seven separate functions of the typed ledger.
+
+    Args:
+        ledger (Ledger): The typed ledger.
+
+    Returns:
+        list: The formatted statistics in the order of the panel.
+    """
+    return [function(getattr(ledger, part)) for function, part in STATISTICS]
@@ -0,0 +1,112 @@
+"""
+Benchmark of the start of the application.
+
+Measures, in fresh interpreters, the time to import main.py and checks that the heavy libraries (pandas, Matplotlib,
+numpy) are not imported before the first window. When a display is available, the time from the start of the
+application to its first window is measured as well. Run from the repository root:
+
+    python -m benchmarks.startup --output startup.json [--max-seconds 1.5]
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+
+# Libraries which must not be imported before the first window
+DEFERRED_MODULES = ["numpy", "pandas", "matplotlib", "ledger_cache", "third_frame", "second_frame"]
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+print(",".join(name for name in {modules!r} if name in sys.modules))
+"""
+
+
+def measure_import(repeat):
+    """
+    Time the import of main.py in fresh interpreters.
+
+    Args:
+        repeat (int): The number of measured interpreters.
+
+    Returns:
+        tuple: The best import time in seconds and the deferred modules which were imported anyway.
+    """
+    times = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(modules=DEFERRED_MODULES)],
+                                capture_output=True, text=True, check=True).stdout.splitlines()
+        times.append(float(output[0]))
+        loaded = [name for name in output[1].split(",") if name] if len(output) > 1 else []
+    return min(times), loaded
+
+
+def measure_first_window(repeat, timeout=60):
+    """
+    Time the start of the application until its first window is shown.
+
+    Args:
+        repeat (int): The number of measured starts.
+        timeout (int): The maximum time of one start in seconds.
+
+    Returns:
+        float or None: The best time in seconds, None if no window could be shown (no display).
+    """
+    times = []
+    environment = dict(os.environ, MONEYSAVER_STARTUP_EXIT="1")
+    for _ in range(repeat):
+        try:
+            result = subprocess.run([sys.executable, "main.py"], capture_output=True, text=True, env=environment,
+                                    timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return None
+        match = re.search(r"startup_seconds=([0-9.]+)", result.stdout)
+        if match is None:
+            return None
+        times.append(float(match.group(1)))
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the time to the first window of the application.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measured starts, the best one is reported")
+    parser.add_argument("--output", default="startup_results.json", help="path of the JSON result file")
+    parser.add_argument("--max-seconds", type=float, help="fail when the first window takes longer than this")
+    args = parser.parse_args()
+
+    import_seconds, loaded = measure_import(args.repeat)
+    window_seconds = measure_first_window(args.repeat)
+
+    results = {
+        "python": platform.python_version(),
+        "import_seconds": import_seconds,
+        "first_window_seconds": window_seconds,
+        "deferred_modules_loaded": loaded,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    print(f"import main:   {import_seconds * 1000:.1f} ms")
+    if window_seconds is None:
+        print("first window:  not measured, no display")
+    else:
+        print(f"first window:  {window_seconds * 1000:.1f} ms")
+
+    failures = []
+    if loaded:
+        failures.append(f"imported before the first window: {', '.join(loaded)}")
+    measured = window_seconds if window_seconds is not None else import_seconds
+    if args.max_seconds is not None and measured > args.max_seconds:
+        failures.append(f"startup took {measured:.2f} s, the limit is {args.max_seconds:.2f} s")
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
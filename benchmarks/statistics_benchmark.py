@@ -0,0 +1,123 @@
+"""
+Benchmark of the statistics panel of the visualization frame.
+
+Compares three ways of computing the statistics of the panel on a synthetic ledger, the first two are kept in
+benchmarks/reference_statistics.py:
+
+- original: the code the panel ran before the typed ledger, a DataFrame of the raw "items" of the file split into
+  expenditures and incomes, and seven functions which each copy their part, parse its dates and prices again
+  (prepare_data) and group it with pandas,
+- separate: the same seven statistics rewritten on the typed ledger,
+- fused: the single pass of ledger_statistics.compute_statistics over the typed ledger.
+
+The typed ledger is parsed once per version of the file and shared with the charts, so the separate and fused paths are
+timed on a parsed ledger; the fused path is also timed with the parsing. The panel of the application does not run
+compute_statistics, it reads the statistics from the rollups (statistics_from_aggregates), so the kernel is used by
+the benchmarks only. Run from the repository root:
+
+    python -m benchmarks.statistics_benchmark --rows 1000000
+"""
+import argparse
+import time
+
+from benchmarks.generator import make_items
+from benchmarks.reference_statistics import original_statistics, separate_statistics
+from formatting import format_statistic
+from ledger import Ledger
+from ledger_statistics import compute_statistics
+from money import MINOR_UNITS
+
+
+def fused_statistics(ledger):
+    """
+    Compute the panel statistics with the fused kernel and format them like the panel does.
+    """
+    stats = compute_statistics(ledger)
+    return [
+        format_statistic(stats.max_day_expenditure, stats.max_day),
+        format_statistic(stats.max_category_expenditure, stats.max_category),
+        format_statistic(stats.avg_month_expenditure),
+        format_statistic(stats.total_expenditure),
+        format_statistic(stats.max_month_income, stats.max_month),
+        format_statistic(stats.avg_month_income),
+        format_statistic(stats.total_income),
+    ]
+
+
+def parsed_fused_statistics(items):
+    """
+    Parse the raw "items" of the ledger file and compute the panel statistics with the fused kernel.
+    """
+    return fused_statistics(Ledger.from_items(items))
+
+
+def check_original(original, ledger):
+    """
+    Check the original statistics against the fused kernel, the original amounts are floats in crowns.
+    """
+    stats = compute_statistics(ledger)
+    expected = [
+        (stats.max_day_expenditure, stats.max_day),
+        (stats.max_category_expenditure, stats.max_category),
+        (stats.avg_month_expenditure, None),
+        (stats.total_expenditure, None),
+        (stats.max_month_income, stats.max_month),
+        (stats.avg_month_income, None),
+        (stats.total_income, None),
+    ]
+    for (value, key), (minor, expected_key) in zip(original, expected):
+        # Averages are rounded to whole minor units by the kernel
+        if abs(value * MINOR_UNITS - minor) > 1 or key != expected_key:
+            raise SystemExit(f"Results differ:\n{original}\n{expected}")
+
+
+def fresh_copy(ledger):
+    """
+    Copy a typed ledger, derived columns are cached on the ledger and a fresh copy makes every run pay for them.
+    """
+    return ledger.select(slice(None))
+
+
+def best_time(function, argument, repeat, copy=None):
+    """
+    Return the best wall time of `repeat` runs of function(argument) and its result.
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        fresh = copy(argument) if copy is not None else argument
+        start = time.perf_counter()
+        result = function(fresh)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the statistics panel computations.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of records of the synthetic ledger")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs, the best one is reported")
+    args = parser.parse_args()
+
+    items = make_items(args.rows)
+    ledger = Ledger.from_items(items)
+
+    original_time, original_result = best_time(original_statistics, items, args.repeat)
+    separate_time, separate_result = best_time(separate_statistics, ledger, args.repeat, fresh_copy)
+    fused_time, fused_result = best_time(fused_statistics, ledger, args.repeat, fresh_copy)
+    parsed_time, _ = best_time(parsed_fused_statistics, items, args.repeat)
+
+    check_original(original_result, ledger)
+    if separate_result != fused_result:
+        raise SystemExit(f"Results differ:\n{separate_result}\n{fused_result}")
+
+    print(f"rows:              {args.rows}")
+    print(f"original:          {original_time * 1000:.1f} ms")
+    print(f"separate:          {separate_time * 1000:.1f} ms")
+    print(f"fused:             {fused_time * 1000:.1f} ms")
+    print(f"fused with parse:  {parsed_time * 1000:.1f} ms")
+    print(f"speedup over original:  {original_time / fused_time:.1f}x ({original_time / parsed_time:.1f}x with parse)")
+    print(f"speedup over separate:  {separate_time / fused_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
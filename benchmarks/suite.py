@@ -0,0 +1,213 @@
+"""
+Benchmark suite of loading, statistics, chart rendering and saving.
+
+For every size a synthetic ledger file is generated and the steps the application runs on it are timed: loading the
+file like the home frame does, parsing and aggregating it, every pre-processing path of charts.py, every statistics
+function of the panel, drawing every chart with the Agg backend and saving the ledger like the adding frame does.
+The results are written as JSON, and a previous result file can be compared to spot regressions. Run from the
+repository root:
+
+    python -m benchmarks.suite --rows 1000 100000 1000000 --output results.json [--compare previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+from aggregates import AggregateStore
+from benchmarks.generator import write_ledger
+from benchmarks.reference_statistics import STATISTICS
+from charts import Chart, HistogramBuilder, MoneyBalancePlotter
+from ledger import Ledger
+from ledger_cache import ledger_cache
+from ledger_statistics import compute_statistics, statistics_from_aggregates
+from ledger_stream import read_ledger, stream_statistics
+from storage import JsonStorage
+from transactions import TransactionModel
+
+def measure(function, repeat, setup=None):
+    """
+    Time a function.
+
+    Args:
+        function (callable): The timed function, called with the result of setup if it is given.
+        repeat (int): The number of timed runs.
+        setup (callable): Prepares the argument of every run, it is not timed (optional).
+
+    Returns:
+        dict: The best and the mean wall time in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        if setup is not None:
+            function(argument)
+        else:
+            function()
+        times.append(time.perf_counter() - start)
+    return {"best_seconds": min(times), "mean_seconds": sum(times) / len(times)}
+
+
+def run_size(rows, directory, repeat):
+    """
+    Run all benchmarks on a synthetic ledger.
+
+    Args:
+        rows (int): The number of records of the ledger.
+        directory (str): The directory of the generated files.
+        repeat (int): The number of timed runs of every benchmark.
+
+    Returns:
+        list: The results as dictionaries with the benchmark name, rows and times.
+    """
+    path = os.path.join(directory, f"synthetic_{rows}.json")
+    write_ledger(path, rows)
+
+    data = JsonStorage(path).load()
+    ledger = Ledger.from_file_data(data)
+    aggregates = AggregateStore.from_ledger(ledger)
+
+    # Derived columns are cached on the ledger, a fresh copy makes every run pay for them
+    def fresh():
+        return ledger.select(slice(None))
+
+    def cold_load():
+        ledger_cache.clear()
+        ledger_cache.load(path)
+
+    # Charts created without a tab view draw on off-screen Agg canvases
+    chart = Chart(None, ledger, "ALL")
+    histogram = HistogramBuilder(None, aggregates)
+    money_balance = MoneyBalancePlotter(None, aggregates)
+
+    def render(plot, *args):
+        plot.update(*args)
+        plot.canvas.draw()
+
+    benchmarks = [
+        ("load.ledger_cache", cold_load, None),
+        ("parse.ledger", lambda: Ledger.from_file_data(data), None),
+        ("parse.stream_ledger", lambda: read_ledger(path), None),
+        ("aggregate.rollups", AggregateStore.from_ledger, fresh),
+        ("pre_processing.time_plot_all", lambda copy: chart.prepare(copy, "ALL"), fresh),
+        ("pre_processing.time_plot_type", lambda copy: chart.prepare(copy, "Food"), fresh),
+        ("pre_processing.histogram", lambda: histogram.pre_processing(aggregates), None),
+        ("pre_processing.money_balance", lambda: money_balance.calculate_monthly_money_balance(aggregates), None),
+    ]
+    for function, part in STATISTICS:
+        benchmarks.append((f"statistics.{function.__name__}",
+                           lambda copy, function=function, part=part: function(getattr(copy, part)), fresh))
+    benchmarks += [
+        ("statistics.fused", compute_statistics, fresh),
+        ("statistics.rollups", lambda: statistics_from_aggregates(aggregates), None),
+        ("statistics.streamed", lambda: stream_statistics(path), None),
+        ("render.time_plot", lambda copy: render(chart, copy, "ALL"), fresh),
+        ("render.histogram", lambda: render(histogram, aggregates), None),
+        ("render.money_balance", lambda: render(money_balance, aggregates), None),
+        ("save.save_file", lambda model: JsonStorage(path + ".saved").save(model),
+         lambda: TransactionModel.from_file_data(data)),
+    ]
+
+    results = []
+    for name, function, setup in benchmarks:
+        result = {"benchmark": name, "rows": rows, "repeat": repeat}
+        result.update(measure(function, repeat, setup))
+        results.append(result)
+        print(f"{rows:>10}  {name:<45} {result['best_seconds'] * 1000:10.1f} ms")
+
+    for plot in (chart, histogram, money_balance):
+        plot.release()
+    ledger_cache.clear()
+    return results
+
+
+def environment():
+    """
+    Describe the machine and the versions the benchmarks ran with.
+
+    Returns:
+        dict: The environment of the run.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+
+
+def compare(results, previous_path, threshold=1.1):
+    """
+    Print the benchmarks which got slower than in a previous result file.
+
+    Args:
+        results (list): The current results.
+        previous_path (str): The path of the previous result file.
+        threshold (float): The ratio of the best times above which a benchmark is reported.
+
+    Returns:
+        int: The number of regressions.
+    """
+    with open(previous_path, 'r') as f:
+        previous = {(result["benchmark"], result["rows"]): result for result in json.load(f)["results"]}
+
+    regressions = 0
+    for result in results:
+        before = previous.get((result["benchmark"], result["rows"]))
+        if before is None or before["best_seconds"] == 0:
+            continue
+        ratio = result["best_seconds"] / before["best_seconds"]
+        if ratio > threshold:
+            regressions += 1
+            print(f"slower {ratio:.2f}x  {result['benchmark']} ({result['rows']} rows)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading, statistics, rendering and saving of ledgers.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000],
+                        help="numbers of records of the synthetic ledgers (1k to 10M)")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs, the best one is reported")
+    parser.add_argument("--output", default="benchmark_results.json", help="path of the JSON result file")
+    parser.add_argument("--directory", help="directory of the generated ledgers, a temporary one by default")
+    parser.add_argument("--compare", help="previous JSON result file to compare with")
+    args = parser.parse_args()
+
+    directory = args.directory or tempfile.mkdtemp(prefix="ledger_benchmark_")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        results = []
+        for rows in args.rows:
+            results += run_size(rows, directory, args.repeat)
+    finally:
+        if args.directory is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=4)
+    print(f"results written to {args.output}")
+
+    if args.compare and compare(results, args.compare):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import json
+import os
+import threading
+
+# Version of the catalog file, catalogs of another version are rebuilt (version 2 holds totals in minor units)
+CATALOG_VERSION = 2
+
+# Extensions of the ledger files, the first one wins when a ledger is stored in several formats
+LEDGER_EXTENSIONS = (".sqlite", ".ledger", ".json")
+
+# Orders of the ledgers offered by the home frame and the key and direction of each of them
+SORT_ORDERS = {
+    "Name": (lambda entry: entry["name"].lower(), False),
+    "Last modified": (lambda entry: entry.get("mtime", 0), True),
+    "Rows": (lambda entry: entry.get("rows") or 0, True),
+    "Balance": (lambda entry: (entry.get("total_income") or 0) - (entry.get("total_expenditure") or 0), True),
+}
+
+
+def catalog_path(directory):
+    """
+    Build the path of the catalog of a directory with ledgers.
+
+    The catalog is hidden, so it is not listed between the ledgers in the home frame.
+
+    Args:
+        directory (str): The directory with the ledgers.
+
+    Returns:
+        str: The path of the catalog file.
+    """
+    return os.path.join(directory, ".catalog.json")
+
+
+def scan_ledgers(directory):
+    """
+    List the ledgers of a directory together with the state of their files on disk.
+
+    Only the directory itself is read, the ledger files are never opened. The signature of a ledger is built from the
+    modification times and sizes of its file and of its journal, so it changes whenever the ledger is saved.
+
+    Args:
+        directory (str): The directory with the ledgers.
+
+    Returns:
+        dict: The base names of the ledgers mapped to their path, signature and modification time.
+    """
+    stats = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stats[entry.name] = entry.stat()
+
+    ledgers = {}
+    for filename, stat in stats.items():
+        name, extension = os.path.splitext(filename)
+        # Hidden files hold data derived from the ledgers (e.g. their rollups), they are not ledgers themselves
+        if filename.startswith('.') or extension not in LEDGER_EXTENSIONS:
+            continue
+        if name in ledgers and LEDGER_EXTENSIONS.index(ledgers[name]["extension"]) < LEDGER_EXTENSIONS.index(extension):
+            continue  # A ledger migrated to SQLite may still have its JSON file, it is listed only once
+        ledgers[name] = _ledger_state(directory, filename, stat, stats.get("." + name + ".journal.jsonl"))
+    return ledgers
+
+
+def stat_ledger(path):
+    """
+    Get the state of the files of one ledger on disk, like scan_ledgers but without listing the directory.
+
+    Args:
+        path (str): The path of the ledger file.
+
+    Returns:
+        dict or None: The path, signature and modification time of the ledger, None if the file does not exist or the
+        ledger is listed from a file with another extension.
+    """
+    directory, filename = os.path.split(path)
+    name, extension = os.path.splitext(filename)
+    if extension not in LEDGER_EXTENSIONS:
+        return None
+    for preferred in LEDGER_EXTENSIONS[:LEDGER_EXTENSIONS.index(extension)]:
+        if os.path.isfile(os.path.join(directory, name + preferred)):
+            return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    try:
+        journal = os.stat(os.path.join(directory, "." + name + ".journal.jsonl"))
+    except OSError:
+        journal = None
+    return _ledger_state(directory, filename, stat, journal)
+
+
+def _ledger_state(directory, filename, stat, journal):
+    """
+    Build the state of a ledger from the stats of its file and of its journal (None if it has none).
+    """
+    signature = [stat.st_mtime_ns, stat.st_size]
+    signature += [journal.st_mtime_ns, journal.st_size] if journal is not None else [0, 0]
+    return {
+        "extension": os.path.splitext(filename)[1],
+        "path": os.path.join(directory, filename),
+        "signature": signature,
+        "mtime": max(stat.st_mtime, journal.st_mtime if journal is not None else 0),
+    }
+
+
+def describe_ledger(data, aggregates):
+    """
+    Build the metadata of a ledger shown in the home frame.
+
+    Args:
+        data (dict): The content of the ledger file, only its header is used.
+        aggregates (AggregateStore): The rollups of the ledger.
+
+    Returns:
+        dict: The author, number of rows, first and last date (yyyy-mm-dd) and the totals of the ledger (in minor
+        units).
+    """
+    days = sorted(aggregates.daily)
+    total_income, total_expenditure, income_rows, expenditure_rows = aggregates.totals
+    return {
+        "author": data.get("author", data.get("name_of_author", "")),
+        "rows": income_rows + expenditure_rows,
+        "first_date": days[0] if days else None,
+        "last_date": days[-1] if days else None,
+        "total_income": total_income,
+        "total_expenditure": total_expenditure,
+    }
+
+
+class Catalog:
+    """
+    Index of the ledgers of a directory with their metadata.
+
+    The catalog is persisted in a hidden file next to the ledgers and keeps the author, number of rows, date range and
+    totals of every ledger together with the signature of its files. Refreshing the catalog only lists the directory
+    and compares the signatures, so hundreds of ledgers are listed and sorted without opening any of them. Ledgers which
+    are new or changed since they were described are reported as stale and described again by `index`, which is meant
+    to run in a worker thread. Ledgers saved by the application are described right away by `update`.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = catalog_path(directory)
+        self.entries = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r') as f:
+                content = json.load(f)
+            if content.get("version") == CATALOG_VERSION:
+                self.entries = content["ledgers"]
+        except (OSError, ValueError, KeyError):
+            pass  # The catalog is only an optimization, a missing or broken one is rebuilt
+
+    def refresh(self):
+        """
+        Synchronize the catalog with the ledgers on disk.
+
+        Entries of deleted ledgers are dropped, new ledgers get an entry without metadata and ledgers whose files
+        changed keep their previous metadata until they are described again.
+
+        Returns:
+            list: The paths of the ledgers which are new or changed and should be indexed.
+        """
+        ledgers = scan_ledgers(self.directory)
+        stale = []
+        with self._lock:
+            for name in list(self.entries):
+                if name not in ledgers:
+                    del self.entries[name]
+            for name, ledger in ledgers.items():
+                entry = self.entries.setdefault(name, {"name": name})
+                if entry.get("indexed") != ledger["signature"] or entry.get("path") != ledger["path"]:
+                    stale.append(ledger["path"])
+                entry.update(path=ledger["path"], extension=ledger["extension"], signature=ledger["signature"],
+                             mtime=ledger["mtime"])
+        return stale
+
+    def names(self, order="Name"):
+        """
+        List the names of the ledgers in the catalog.
+
+        Args:
+            order (str): One of SORT_ORDERS.
+
+        Returns:
+            list: The base names of the ledgers.
+        """
+        key, reverse = SORT_ORDERS[order]
+        with self._lock:
+            entries = sorted(self.entries.values(), key=key, reverse=reverse)
+        return [entry["name"] for entry in entries]
+
+    def get(self, name):
+        """
+        Return the entry of a ledger.
+
+        Args:
+            name (str): The base name of the ledger.
+
+        Returns:
+            dict or None: A copy of the entry, None if the ledger is not in the catalog.
+        """
+        with self._lock:
+            entry = self.entries.get(name)
+            return dict(entry) if entry is not None else None
+
+    def index(self, paths, job=None):
+        """
+        Describe the given ledgers and persist the catalog.
+
+        The ledgers are read past the ledger cache, so indexing many of them does not evict the opened ledger. Only
+        their headers are read; their persisted rollups are reused when they describe the current version of the
+        ledger, otherwise they are built from the typed ledger, which is streamed or queried without loading the
+        content of the file.
+
+        Args:
+            paths (list): The paths of the ledgers to be described.
+            job (Job): The job running the indexing, used for cancellation and progress (optional).
+        """
+        from aggregates import AggregateStore
+        from storage import open_storage
+
+        # The signatures are taken before loading, a ledger changed meanwhile stays stale for the next refresh
+        ledgers = scan_ledgers(self.directory)
+        try:
+            for position, path in enumerate(paths):
+                if job is not None:
+                    job.check()
+                    job.report(position / len(paths), f"Indexing {os.path.basename(path)}")
+                try:
+                    signature = ledgers[os.path.splitext(os.path.basename(path))[0]]["signature"]
+                    storage = open_storage(path)
+                    header = storage.header()
+                    aggregates = AggregateStore.load(os.path.abspath(path), storage.signature())
+                    if aggregates is None:
+                        aggregates = storage.build_aggregates(storage.typed_ledger(storage.load))
+                    metadata = describe_ledger(header, aggregates)
+                except (OSError, ValueError, KeyError):
+                    continue  # Ledgers which can not be read are listed without metadata
+                self._set(path, signature, metadata)
+        finally:
+            # Ledgers described before a cancellation are kept
+            self.save()
+
+    def update(self, path, data, aggregates):
+        """
+        Describe a ledger which was just saved by the application and persist the catalog.
+
+        Only the files of the saved ledger are looked up, the directory is not listed again.
+
+        Args:
+            path (str): The path of the ledger file.
+            data (dict): The saved content of the ledger, only its header is used.
+            aggregates (AggregateStore): The rollups of the saved ledger.
+        """
+        ledger = stat_ledger(os.path.join(self.directory, os.path.basename(path)))
+        if ledger is None:
+            return
+        self._set(path, ledger["signature"], describe_ledger(data, aggregates), mtime=ledger["mtime"])
+        self.save()
+
+    def save(self):
+        """
+        Write the catalog to its hidden file next to the ledgers.
+        """
+        with self._lock:
+            content = {"version": CATALOG_VERSION,
+                       "ledgers": {name: dict(entry) for name, entry in self.entries.items()}}
+        temporary = self.path + ".tmp"
+        try:
+            with open(temporary, 'w') as f:
+                json.dump(content, f)
+            os.replace(temporary, self.path)
+        except OSError:
+            pass  # The catalog is rebuilt on the next refresh
+
+    def _set(self, path, signature, metadata, mtime=None):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with self._lock:
+            entry = self.entries.setdefault(name, {"name": name, "path": path, "signature": signature})
+            entry.update(metadata, indexed=signature)
+            if mtime is not None:
+                entry.update(signature=signature, mtime=mtime)
+
+
+# Catalogs of the directories with ledgers, shared by the home frame and the ledger cache
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def open_catalog(directory):
+    """
+    Get the catalog of a directory with ledgers.
+
+    Args:
+        directory (str): The directory with the ledgers.
+
+    Returns:
+        Catalog: The catalog of the directory.
+    """
+    key = os.path.abspath(directory)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = Catalog(key)
+        return _catalogs[key]
@@ -1,47 +1,158 @@
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-import json
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from ledger import Ledger, group_sum
+from money import CURRENCY, to_crowns
+from perf import traced
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 vscode_blue = (0.175, 0.392, 0.785, 1.0)
 custom_mid_gray_rgba = ((0.175 + 0.1625) / 2, (0.175 + 0.1625) / 2, (0.175 + 0.1625) / 2, 1.0)
 
+# Bottom of the stems of the TimePlot chart
+STEM_BOTTOM = 1.1
+
+# Resolutions of the TimePlot chart from the finest: name of the period, label of the axis and format of the ticks
+RESOLUTIONS = (("day", "Days", "%d.%m"),
+               ("week", "Weeks", "%d.%m"),
+               ("month", "Months", "%m.%Y"),
+               ("year", "Years", "%Y"))
+
+# Pixels of the axes taken by one stem and one tick label of the TimePlot chart, and the bound of the drawn stems
+STEM_PIXELS = 4
+TICK_PIXELS = 24
+MAX_STEMS = 500
+
+
+# The figures are created without pyplot, so they are not kept alive by its global registry and are freed
+# together with the chart objects
 class Chart:
-    def __init__(self, tabview, file, expenditure):
-        
+    # Label of the axis of the amounts, it holds the period of the stems and the symbol of the shown currency
+    UNIT_LABEL = "Sum of money by {} in [{}]"
+
+    def __init__(self, tabview, ledger, expenditure, render_cache=None):
+
+        # Create a Matplotlib figure and axis, the artists are created once and updated in place
+        fig, ax = self.setup_plot()
+        self.fig, self.ax = fig, ax
+        # Key of the view shown by the chart, its rendered bitmaps are kept by the render cache (optional)
+        self.render_key = None
+        self.render_cache = render_cache
+        # The daily sums of the shown view are kept, so the resolution can be chosen again when the canvas is resized
+        self.df_pre = None
+        self.resolution = RESOLUTIONS[0]
+        self.symbol = CURRENCY
+
+        self.markerline, self.stemlines, self.baseline = ax.stem([0], [0],
+                                                                 linefmt='--',
+                                                                 markerfmt='D',
+                                                                 basefmt='white',
+                                                                 bottom=STEM_BOTTOM)
+
+        self.configure_plot(ax, fig)
+
+        # Embed the Matplotlib plot into the Tkinter GUI
+        self.embed_plot(tabview, fig)
+
+        self.update(ledger, expenditure)
+
+    def update(self, ledger, expenditure, key=None):
+        """
+        Update the chart with new data without creating a new figure.
+
+        Args:
+            ledger (Ledger): The ledger to be plotted.
+            expenditure (str): The type of expenditure to be plotted, "ALL" for all of them and None for no data.
+            key (tuple): The render key of the view, None if the view is not cached.
+        """
+        self.draw(self.prepare(ledger, expenditure), key)
+
+    @staticmethod
+    def prepare(ledger, expenditure):
+        """
+        Prepare the data of the chart.
+
+        The preparation does not touch the figure, so it can run in a worker thread, even before the chart is created.
+
+        Args:
+            ledger (Ledger): The ledger to be plotted.
+            expenditure (str): The type of expenditure to be plotted, "ALL" for all of them and None for no data.
+
+        Returns:
+            pd.DataFrame: The sums of the expenditures by day, the stems are bucketed when they are drawn.
+        """
         # Control the data that will be plotted
         if expenditure == "ALL":
-            df = pd.DataFrame(file["items"])
-            df_exp = df[df['income_expenditure'] == "0"]
-            df_pre = self.pre_processing(df_exp)
+            df_pre = Chart.pre_processing(ledger.expenditures)
         elif expenditure is None:
-            with open('/path_to_files/blank.json', 'r') as f:
-                file = json.load(f)
-                df_pre = pd.DataFrame(file["items"])
+            # An empty chart is shown before a ledger is chosen
+            df_pre = Chart.pre_processing(Ledger.empty())
         else:
-            df = pd.DataFrame(file["items"])
-            df_exp = df[df['income_expenditure'] == "0"]
-            df_exp = self.take_specific_expenditure(df_exp, expenditure)
-            df_pre = self.pre_processing(df_exp)
+            df_exp = Chart.take_specific_expenditure(ledger.expenditures, expenditure)
+            df_pre = Chart.pre_processing(df_exp)
+        return df_pre
 
-        # Create a Matplotlib figure and axis
-        fig, ax = self.setup_plot()
+    def draw(self, df_pre, key=None):
+        """
+        Set the prepared data to the artists of the chart and redraw it.
 
-        ax.stem(df_pre['date'], df_pre['price'],
-                linefmt='--',
-                markerfmt='D',
-                basefmt='white',
-                bottom=1.1,
-                use_line_collection=True)
+        Args:
+            df_pre (pd.DataFrame): The data prepared by the prepare method.
+            key (tuple): The render key of the view, None if the view is not cached.
+        """
+        if key is not None and key == self.render_key:
+            return  # The view is already shown
+        self.render_key = key
+        self.df_pre = df_pre
 
-        self.configure_plot(ax, fig)
+        self.plot()
+        self.canvas.draw_idle()
 
-        # Embed the Matplotlib plot into the Tkinter GUI
-        self.embed_plot(tabview, fig)
+    def plot(self):
+        """
+        Set the daily sums of the shown view to the artists at the resolution fitting the width of the axes.
+
+        The number of stems and tick labels is bounded by the width of the axes in pixels, whatever the length of the
+        ledger, see downsample.
+        """
+        width = self.ax.bbox.width
+        dates, sums, self.resolution = downsample(self.df_pre['date'].to_numpy(), self.df_pre['price'].to_numpy(),
+                                                  min(MAX_STEMS, max(1, int(width // STEM_PIXELS))))
+        _, axis_label, tick_format = self.resolution
+
+        # Periods are placed at integer positions, only every few of them is labeled by its date
+        x = np.arange(len(dates), dtype=float)
+        y = to_crowns(sums)
+
+        self.markerline.set_data(x, y)
+        self.stemlines.set_segments(np.stack([np.column_stack([x, np.full_like(x, STEM_BOTTOM)]),
+                                              np.column_stack([x, y])], axis=1))
+        if len(x):
+            self.baseline.set_data([x[0], x[-1]], [STEM_BOTTOM, STEM_BOTTOM])
+        else:
+            self.baseline.set_data([], [])
+        step = max(1, -(-len(x) // max(1, int(width // TICK_PIXELS))))
+        self.ax.set_xticks(x[::step], pd.DatetimeIndex(dates[::step]).strftime(tick_format))
+        self.ax.xaxis.label.set_text(axis_label)
+        self.set_currency(self.symbol)
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def on_resize(self, event):
+        """
+        Choose the resolution again for the new width of the canvas, the canvas redraws itself after the resize.
+
+        Args:
+            event (ResizeEvent): The resize event of the canvas.
+        """
+        if self.df_pre is not None:
+            self.plot()
 
     # Create a Matplotlib figure and axis
     def setup_plot(self):
-        fig, ax = plt.subplots(figsize=(2, 1))
+        fig = Figure(figsize=(2, 1))
+        ax = fig.add_subplot()
         return fig, ax
 
     # Configure the Matplotlib plot
@@ -53,8 +164,8 @@ class Chart:
 
         # Configure plot title, axes labels, and grid
         ax.set_title("Expenditure Over Time", fontdict=title_font, color='white')
-        ax.set_xlabel("Days", fontdict=label_font, color='white', labelpad=10)
-        ax.set_ylabel("Sum of money by day in [Kč]",
+        ax.set_xlabel(self.resolution[1], fontdict=label_font, color='white', labelpad=10)
+        ax.set_ylabel(self.UNIT_LABEL.format(self.resolution[0], self.symbol),
                       fontdict=label_font,
                       color='white',
                       labelpad=10,
@@ -67,8 +178,8 @@ class Chart:
         ax.tick_params(axis='both', labelsize=tick_font['size'], colors='white')
 
         # Rotate and adjust x-axis tick labels
-        plt.xticks(rotation=45)
-        plt.subplots_adjust(bottom=0.2)
+        ax.tick_params(axis='x', labelrotation=45)
+        fig.subplots_adjust(bottom=0.2)
 
         # Set background color
         ax.set_facecolor('lightgray')
@@ -78,71 +189,179 @@ class Chart:
 
     # Embed the Matplotlib plot into the Tkinter GUI
     def embed_plot(self, tabview, fig):
-        self.canvas = FigureCanvasTkAgg(fig, master=tabview.tab("TimePlot"))
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.canvas = make_canvas(fig, tabview, "TimePlot")
+        self.canvas.mpl_connect('resize_event', self.on_resize)
+        if self.render_cache is not None:
+            self.render_cache.attach(self.canvas, self, "TimePlot")
 
-    # Pre-process the data to be plotted by the Matplotlib figure 
-    def pre_processing(self, df):
+    def release(self):
+        """
+        Destroy the canvas widget and clear the figure, so the memory of the chart can be freed.
         """
-        Perform pre-processing on the input DataFrame.
+        release_canvas(self.canvas, self.fig)
 
-        This function takes a DataFrame as input and performs the following steps:
-        1. Converts the 'price' column to numeric format.
-        2. Converts the 'date' column to datetime format.
-        3. Sorts the DataFrame by date.
-        4. Groups the DataFrame by date and sums the 'price' column.
-        5. Formats the 'date' column to display month and day.
+    def set_currency(self, symbol):
+        """
+        Label the axis of the amounts with a currency, the chart is redrawn by its next update.
 
         Args:
-            df (pd.DataFrame): The input DataFrame containing financial data.
+            symbol (str): The symbol of the currency of the plotted amounts.
+        """
+        self.symbol = symbol
+        self.ax.yaxis.label.set_text(self.UNIT_LABEL.format(self.resolution[0], symbol))
+
+    # Pre-process the data to be plotted by the Matplotlib figure
+    @staticmethod
+    @traced("Chart.pre_processing")
+    def pre_processing(ledger):
+        """
+        Perform pre-processing on the input ledger.
+
+        This function takes a typed ledger as input and performs the following steps:
+        1. Skips the rows without a valid date.
+        2. Groups the rows by date (sorted) and sums the 'price' column.
+
+        The dates are kept as datetime64[D] days, they are bucketed and formatted for the tick labels when drawn.
+
+        Args:
+            ledger (Ledger): The input ledger containing financial data.
 
         Returns:
             pd.DataFrame: The pre-processed DataFrame.
         """
-        new_df = df.copy()
-        new_df = new_df.assign(price=pd.to_numeric(new_df['price'], errors='coerce'))
-        new_df['date'] = pd.to_datetime(new_df['date'], format='%d.%m.%Y')
-        new_df = new_df.sort_values(by='date')
-        new_df = new_df.groupby('date')['price'].sum().reset_index()
-        new_df['date'] = new_df['date'].dt.strftime('%d.%m')
-        return new_df
+        dated = ledger.dated
+        dates, sums = group_sum(dated.date, dated.price)
+        return pd.DataFrame({'date': dates, 'price': sums})
 
-    def take_specific_expenditure(self, df, expenditure_type):
+    @staticmethod
+    def take_specific_expenditure(ledger, expenditure_type):
         """
-        Extract specific expenditure type from the DataFrame.
+        Extract specific expenditure type from the ledger.
 
-        This function filters the input DataFrame to extract rows that match the specified expenditure type.
+        This function filters the input ledger to extract rows that match the specified expenditure type.
 
         Args:
-            df (pd.DataFrame): The input DataFrame containing financial data.
+            ledger (Ledger): The input ledger containing financial data.
             expenditure_type (str): The expenditure type to filter for.
 
         Returns:
-            pd.DataFrame: The filtered DataFrame containing specific expenditure type data.
+            Ledger: The filtered ledger containing specific expenditure type data.
         """
-        filtered_df = df[df['type'] == expenditure_type][['date', 'price']]
-        return filtered_df
+        return ledger.of_type(expenditure_type)
+
+
+def period_starts(dates, period):
+    """
+    Find the first day of the period of every date.
+
+    Args:
+        dates (np.ndarray): The datetime64[D] days.
+        period (str): The period, "day", "week" (starting on Monday), "month" or "year".
+
+    Returns:
+        np.ndarray: The datetime64[D] first days of the periods.
+    """
+    if period == "week":
+        # The first day of the epoch, 1.1.1970, was a Thursday
+        return dates - (dates.astype(np.int64) + 3) % 7
+    if period == "month":
+        return dates.astype('datetime64[M]').astype('datetime64[D]')
+    if period == "year":
+        return dates.astype('datetime64[Y]').astype('datetime64[D]')
+    return dates
+
+
+@traced("Chart.downsample")
+def downsample(dates, sums, max_stems):
+    """
+    Reduce the daily sums of the TimePlot chart to at most max_stems stems.
+
+    The finest resolution whose periods fit the bound is chosen: the sums are summed into days, weeks, months or
+    years. Only when even the years exceed the bound, the years are split into groups and the smallest and the largest
+    sum of every group are kept, so the peaks of the chart are preserved.
+
+    Args:
+        dates (np.ndarray): The sorted datetime64[D] days.
+        sums (np.ndarray): The int64 sum of every day.
+        max_stems (int): The largest number of stems to be drawn.
+
+    Returns:
+        tuple: The datetime64[D] first days of the periods, their int64 sums and the chosen resolution.
+    """
+    for resolution in RESOLUTIONS:
+        starts = period_starts(dates, resolution[0])
+        # The days are sorted, so the number of periods is one more than the number of period changes
+        if len(starts) == 0 or np.count_nonzero(starts[1:] != starts[:-1]) < max_stems:
+            break
+    periods, period_sums = group_sum(starts, sums)
+    if len(periods) <= max_stems:
+        return periods, period_sums, resolution
+
+    # Positions of the smallest and the largest sum within every group of periods, found by one sort
+    size = -(-len(periods) // max(1, max_stems // 2))
+    groups = np.arange(len(periods)) // size
+    order = np.lexsort((period_sums, groups))
+    first = np.arange(0, len(periods), size)
+    last = np.minimum(first + size, len(periods)) - 1
+    keep = np.unique(np.concatenate([order[first], order[last]]))
+    return periods[keep], period_sums[keep], resolution
 
 
 # Create the chart for histogram plot
 class HistogramBuilder:
-    def __init__(self, tabview, file):
-        df = pd.DataFrame(file["items"])
-        df_exp = df[df['income_expenditure'] == "0"]
-        df_pre = self.pre_processing(df_exp)
+    UNIT_LABEL = "Money in [{}]"
 
+    def __init__(self, tabview, aggregates, render_cache=None, key=None, symbol=CURRENCY):
         fig, ax = self.setup_plot()
-
-        ax.bar(df_pre['type'], df_pre['price'], color='grey', edgecolor=vscode_blue)
+        self.fig, self.ax = fig, ax
+        self.bars = None
+        self.types = None
+        self.render_key = None
+        self.render_cache = render_cache
 
         self.configure_plot(ax, fig)
+        self.set_currency(symbol)
 
         self.embed_plot(tabview, fig)
 
+        self.update(aggregates, key)
+
+    def update(self, aggregates, key=None):
+        """
+        Update the chart with new data without creating a new figure.
+
+        The heights of the bars are updated in place, the bars are recreated only when the categories change.
+
+        Args:
+            aggregates (AggregateStore): The rollups of the ledger.
+            key (tuple): The render key of the view, None if the view is not cached.
+        """
+        if key is not None and key == self.render_key:
+            return  # The view is already shown
+        self.render_key = key
+
+        df_pre = self.pre_processing(aggregates)
+        types = list(df_pre['type'])
+
+        if types == self.types:
+            for bar, price in zip(self.bars, to_crowns(df_pre['price'].to_numpy())):
+                bar.set_height(price)
+        else:
+            if self.bars is not None:
+                self.bars.remove()
+            self.bars = self.ax.bar(range(len(types)), to_crowns(df_pre['price'].to_numpy()), color='grey',
+                                    edgecolor=vscode_blue)
+            self.ax.set_xticks(range(len(types)), types)
+            self.types = types
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
     # Create a Matplotlib figure and axis
     def setup_plot(self):
-        fig, ax = plt.subplots(figsize=(2, 1))
+        fig = Figure(figsize=(2, 1))
+        ax = fig.add_subplot()
         return fig, ax
 
     # Configure the Matplotlib plot
@@ -154,7 +373,7 @@ class HistogramBuilder:
 
         # Configure plot title, axes labels, and grid
         ax.set_title("Total Expenditure by Category", fontdict=title_font, color='white')
-        ax.set_ylabel("Money in [Kč]", fontdict=label_font, color='white')
+        ax.set_ylabel(self.UNIT_LABEL.format(CURRENCY), fontdict=label_font, color='white')
         ax.grid(False)
 
         ax.tick_params(axis='both', labelsize=tick_font['size'], colors='white', rotation=45)
@@ -167,34 +386,77 @@ class HistogramBuilder:
 
     # Embed the Matplotlib plot into the Tkinter GUI
     def embed_plot(self, tabview, fig):
-        self.canvas = FigureCanvasTkAgg(fig, master=tabview.tab("HistogramPlot"))
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.canvas = make_canvas(fig, tabview, "HistogramPlot")
+        if self.render_cache is not None:
+            self.render_cache.attach(self.canvas, self, "HistogramPlot")
+
+    def release(self):
+        """
+        Destroy the canvas widget and clear the figure, so the memory of the chart can be freed.
+        """
+        release_canvas(self.canvas, self.fig)
+
+    def set_currency(self, symbol):
+        """
+        Label the axis of the amounts with a currency, the chart is redrawn by its next update.
+
+        Args:
+            symbol (str): The symbol of the currency of the plotted amounts.
+        """
+        self.ax.yaxis.label.set_text(self.UNIT_LABEL.format(symbol))
+
     #  Pre-process the data to be plotted by the Matplotlib figure
-    def pre_processing(self, df):
-        new_df = df.copy()
-        new_df = new_df.assign(price=pd.to_numeric(new_df['price'], errors='coerce'))  # Transform price column to integers
-        new_df = new_df.groupby('type')['price'].sum().reset_index()  # Group by expenditure type and sum the 'price' column
-        return new_df
-    
-class MoneyBalancePlotter:
-    def __init__(self, tabview, file):
-        df = pd.DataFrame(file["items"])
+    @traced("HistogramBuilder.pre_processing")
+    def pre_processing(self, aggregates):
+        types, sums = aggregates.expenditure_by_category()  # Expenditure by type taken from the rollups
+        return pd.DataFrame({'type': types, 'price': sums})
+
 
-        df_balance = self.calculate_monthly_money_balance(df)
+class MoneyBalancePlotter:
+    UNIT_LABEL = "Money Balance [{}]"
 
+    def __init__(self, tabview, aggregates, render_cache=None, key=None, symbol=CURRENCY):
         fig, ax = self.setup_plot()
+        self.fig, self.ax = fig, ax
+        self.render_key = None
+        self.render_cache = render_cache
 
-        ax.plot(df_balance['date'], df_balance['balance'], marker='x', color='grey',mec=vscode_blue, mfc=vscode_blue)
+        self.line, = ax.plot([], [], marker='x', color='grey', mec=vscode_blue, mfc=vscode_blue)
 
         self.configure_plot(ax, fig)
+        self.set_currency(symbol)
 
         self.embed_plot(tabview, fig)
 
+        self.update(aggregates, key)
+
+    def update(self, aggregates, key=None):
+        """
+        Update the chart with new data without creating a new figure.
+
+        Args:
+            aggregates (AggregateStore): The rollups of the ledger.
+            key (tuple): The render key of the view, None if the view is not cached.
+        """
+        if key is not None and key == self.render_key:
+            return  # The view is already shown
+        self.render_key = key
+
+        df_balance = self.calculate_monthly_money_balance(aggregates)
+
+        # Months are placed at integer positions and labeled by their number
+        x = np.arange(len(df_balance))
+        self.line.set_data(x, to_crowns(df_balance['balance'].to_numpy()))
+        self.ax.set_xticks(x, df_balance['date'])
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
 
     #  Create a Matplotlib figure and axis
     def setup_plot(self):
-        fig, ax = plt.subplots(figsize=(5, 2))
+        fig = Figure(figsize=(5, 2))
+        ax = fig.add_subplot()
         return fig, ax
 
     #  Configure the Matplotlib plot
@@ -205,7 +467,7 @@ class MoneyBalancePlotter:
 
         ax.set_title("Money Balance Through Time", fontdict=title_font, color='white')
         ax.set_xlabel("Month", fontdict=label_font, color='white')
-        ax.set_ylabel("Money Balance [Kč]", fontdict=label_font, color='white', labelpad=5)
+        ax.set_ylabel(self.UNIT_LABEL.format(CURRENCY), fontdict=label_font, color='white', labelpad=5)
         ax.grid(True)
 
         ax.tick_params(axis='x', labelsize=tick_font['size'], colors='white')
@@ -219,37 +481,84 @@ class MoneyBalancePlotter:
 
     #  Embed the Matplotlib plot into the Tkinter GUI
     def embed_plot(self, tabview, fig):
-        self.canvas = FigureCanvasTkAgg(fig, master=tabview.tab("MoneyBalance"))
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(fill='both', expand=True, ipadx=10, ipady=10)
+        self.canvas = make_canvas(fig, tabview, "MoneyBalance", ipadx=10, ipady=10)
+        if self.render_cache is not None:
+            self.render_cache.attach(self.canvas, self, "MoneyBalance")
+
+    def release(self):
+        """
+        Destroy the canvas widget and clear the figure, so the memory of the chart can be freed.
+        """
+        release_canvas(self.canvas, self.fig)
+
+    def set_currency(self, symbol):
+        """
+        Label the axis of the amounts with a currency, the chart is redrawn by its next update.
+
+        Args:
+            symbol (str): The symbol of the currency of the plotted amounts.
+        """
+        self.ax.yaxis.label.set_text(self.UNIT_LABEL.format(symbol))
 
     #  Pre-process the data to be plotted by the Matplotlib figure
-    def calculate_monthly_money_balance(self, df):
+    @traced("MoneyBalancePlotter.calculate_monthly_money_balance")
+    def calculate_monthly_money_balance(self, aggregates):
         """
-        Calculate monthly money balance from the input DataFrame.
+        Calculate monthly money balance from the rollups of a ledger.
 
-        This function calculates the monthly money balance by following these steps:
-        1. Convert the 'price' column to numeric format.
-        2. Convert the 'date' column to datetime format.
-        3. Create separate columns for income and expenditure based on 'income_expenditure'.
-        4. Extract month from the 'date' column.
-        5. Group the DataFrame by month and sum the income and expenditure columns.
-        6. Calculate the balance by subtracting expenditure from income.
+        The monthly rollups already hold the income and expenditure sums of every month, so the balance is
+        the income minus the expenditure of each month of the year, folded over the years.
 
         Args:
-            df (pd.DataFrame): The input DataFrame containing financial data.
+            aggregates (AggregateStore): The rollups of the ledger.
 
         Returns:
             pd.DataFrame: A DataFrame with columns 'date' and 'balance', representing the monthly money balance.
         """
-        new_df = df.copy()
-        new_df = new_df.assign(price=pd.to_numeric(new_df['price'], errors='coerce'))
-        new_df['date'] = pd.to_datetime(new_df['date'], format='%d.%m.%Y')
-        new_df['income'] = new_df[new_df['income_expenditure'] == "1"]['price']
-        new_df['expenditure'] = new_df[new_df['income_expenditure'] == "0"]['price']
-        new_df['date'] = new_df['date'].dt.strftime('%m')
-        expenditure_by_month = new_df.groupby('date')['expenditure'].sum()
-        income_by_month = new_df.groupby('date')['income'].sum()
-        balance = income_by_month - expenditure_by_month
-        return balance.reset_index().rename(columns={'index': 'date', 0: 'balance'})
-
+        months, balance = aggregates.balance_by_month_of_year()
+        return pd.DataFrame({'date': [f"{month:02d}" for month in months], 'balance': balance})
+
+
+def make_canvas(fig, tabview, tab_name, **pack_options):
+    """
+    Create the canvas of a chart.
+
+    The canvas is embedded into a tab of the tab view. Without a tab view an off-screen Agg canvas is created, which is
+    used to render the charts to files on machines without a display.
+
+    Args:
+        fig (Figure): The figure of the chart.
+        tabview (customtkinter.CTkTabview): The tab view holding the charts, None for an off-screen canvas.
+        tab_name (str): The name of the tab of the chart.
+        **pack_options: Additional options of the pack geometry manager.
+
+    Returns:
+        FigureCanvasAgg: The canvas of the chart.
+    """
+    if tabview is None:
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw = traced(f"{tab_name}.draw")(canvas.draw)
+        return canvas
+
+    # Tk is imported only when a chart is embedded, so headless reports run without it
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+    canvas = FigureCanvasTkAgg(fig, master=tabview.tab(tab_name))
+    # Redraws scheduled by draw_idle call the draw method of the instance, so they are recorded as well
+    canvas.draw = traced(f"{tab_name}.draw")(canvas.draw)
+    canvas.draw()
+    canvas.get_tk_widget().pack(fill='both', expand=True, **pack_options)
+    return canvas
+
+
+def release_canvas(canvas, fig):
+    """
+    Destroy the Tk widget of a canvas and clear its figure.
+
+    Args:
+        canvas (FigureCanvasAgg): The canvas of the figure.
+        fig (Figure): The figure of the chart.
+    """
+    if hasattr(canvas, "get_tk_widget"):
+        canvas.get_tk_widget().destroy()
+    fig.clear()
@@ -0,0 +1,264 @@
+import csv
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from aggregates import AggregateStore
+from ledger import parse_date_column
+from money import CURRENCY
+
+# Currency of the amounts stored in the ledgers
+BASE_CURRENCY = "CZK"
+
+# Symbols shown in the labels and on the axes, other currencies are shown by their code
+SYMBOLS = {BASE_CURRENCY: CURRENCY, "EUR": "€", "USD": "$", "GBP": "£"}
+
+# Name of the file with the exchange rates, it is placed next to the ledgers
+RATES_FILE = "rates.csv"
+
+
+def currency_symbol(currency):
+    """
+    Get the symbol of a currency.
+
+    Args:
+        currency (str): The code of the currency.
+
+    Returns:
+        str: The symbol of the currency, its code if it has no symbol.
+    """
+    return SYMBOLS.get(currency, currency)
+
+
+def money_key(currency, rates=None):
+    """
+    Identify the amounts of a view of a ledger.
+
+    Amounts in foreign currencies depend on the rates they were converted at, so the version of the rate table is a
+    part of their key. Views keyed by it are prepared and rendered again when the rates file changes.
+
+    Args:
+        currency (str): The code of the currency.
+        rates (RateTable): The exchange rates, not used for the base currency (optional).
+
+    Returns:
+        tuple: The currency and the version of the rates, None for the base currency.
+    """
+    if currency == BASE_CURRENCY:
+        return currency, None
+    return currency, rates.version
+
+
+def rates_path(directory):
+    """
+    Build the path of the exchange rates of a directory with ledgers.
+
+    Args:
+        directory (str): The directory with the ledgers.
+
+    Returns:
+        str: The path of the rates file.
+    """
+    return os.path.join(directory, RATES_FILE)
+
+
+class RateTable:
+    """
+    Dated exchange rates of foreign currencies, read from a local CSV file.
+
+    Every line of the file holds the day from which a rate is valid, the code of the currency, the amount of the
+    currency the rate is quoted for and the rate in crowns, like the daily rates published by the Czech National Bank:
+
+        date,currency,amount,rate
+        02.01.2024,EUR,1,24.725
+        02.01.2024,HUF,100,6.471
+
+    The rates of every currency are kept as a sorted date column and a column of crowns per unit, so the rates of a
+    whole column of transaction dates are found by one binary search (an as-of lookup: the last rate valid on the day).
+    """
+
+    def __init__(self, rates=None, version=None):
+        self.rates = rates if rates is not None else {}
+        # Signature of the file the rates were read from, it keys the conversions made with the rates
+        self.version = version
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read the rates from a CSV file.
+
+        Lines whose date or rate can not be parsed are skipped.
+
+        Args:
+            path (str): The path of the rates file.
+
+        Returns:
+            RateTable: The rates, empty if the file does not exist.
+
+        Raises:
+            ValueError: If the file lacks a column.
+        """
+        lines = {}
+        try:
+            with open(path, 'r', newline='') as f:
+                stat = os.fstat(f.fileno())
+                for line in csv.DictReader(f):
+                    columns = lines.setdefault(line["currency"].strip().upper(), ([], [], []))
+                    columns[0].append(line["date"].strip())
+                    columns[1].append(line.get("amount") or "1")
+                    columns[2].append(line["rate"])
+        except FileNotFoundError:
+            return cls()
+        except (KeyError, AttributeError):
+            raise ValueError(f"The rates file {path} needs the columns date, currency and rate.")
+
+        rates = {}
+        for currency, (dates, amounts, values) in lines.items():
+            dates = parse_date_column(dates)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                per_unit = _parse_numbers(values) / _parse_numbers(amounts)
+            valid = ~np.isnat(dates) & np.isfinite(per_unit) & (per_unit > 0)
+            order = np.argsort(dates[valid], kind='stable')
+            if currency != BASE_CURRENCY and order.size:
+                rates[currency] = (dates[valid][order], per_unit[valid][order])
+        return cls(rates, version=(path, stat.st_mtime_ns, stat.st_size))
+
+    def currencies(self):
+        """
+        List the currencies the ledgers can be shown in.
+
+        Returns:
+            list: The base currency followed by the currencies of the table in alphabetical order.
+        """
+        return [BASE_CURRENCY] + sorted(self.rates)
+
+    def rates_on(self, currency, dates):
+        """
+        Find the rates of a currency valid on the given days.
+
+        Days before the first rate take the first rate, days without a valid date (NaT) take the latest rate.
+
+        Args:
+            currency (str): The code of the currency.
+            dates (np.ndarray): The datetime64[D] days.
+
+        Returns:
+            np.ndarray: The crowns per unit of the currency on every day.
+
+        Raises:
+            KeyError: If the table has no rates of the currency.
+        """
+        rate_dates, per_unit = self.rates[currency]
+        # NaT is sorted after all dates, so undated rows fall on the latest rate
+        positions = np.searchsorted(rate_dates, dates, side='right') - 1
+        return per_unit[np.clip(positions, 0, len(per_unit) - 1)]
+
+    def convert(self, minor, dates, currency):
+        """
+        Convert a column of amounts in crowns to another currency at the rates of their days.
+
+        Args:
+            minor (np.ndarray): The int64 amounts in minor units of crowns.
+            dates (np.ndarray): The datetime64[D] day of every amount.
+            currency (str): The code of the target currency.
+
+        Returns:
+            np.ndarray: The int64 amounts in minor units of the target currency.
+        """
+        if currency == BASE_CURRENCY:
+            return minor
+        return np.rint(minor / self.rates_on(currency, dates)).astype(np.int64)
+
+
+def _parse_numbers(values):
+    """
+    Parse a list of decimal numbers, a decimal comma is accepted, unparsable numbers are NaN.
+    """
+    text = pd.Series(values, dtype=object).astype(str).str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors='coerce').to_numpy(dtype=np.float64)
+
+
+# Rate tables of the directories with ledgers
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def open_rates(directory):
+    """
+    Get the exchange rates of a directory with ledgers, the file is read again only when it changed on disk.
+
+    Args:
+        directory (str): The directory with the ledgers.
+
+    Returns:
+        RateTable: The rates, empty if the directory has no rates file.
+
+    Raises:
+        ValueError: If the rates file lacks a column.
+    """
+    path = os.path.abspath(rates_path(directory))
+    try:
+        stat = os.stat(path)
+        version = (path, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        version = None
+    with _tables_lock:
+        table = _tables.get(path)
+        if table is None or table.version != version:
+            table = _tables[path] = RateTable.load(path) if version is not None else RateTable()
+        return table
+
+
+class ConversionCache:
+    """
+    Ledgers converted to foreign currencies together with their rollups.
+
+    The price column of a ledger is converted in one vectorized step per target currency and kept, together with the
+    rollups of the converted ledger, under the version of the ledger, the currency and the rate table. The least
+    recently used conversions are evicted first.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # The conversions are made by the worker threads
+        self._lock = threading.Lock()
+
+    def convert(self, version, ledger, aggregates, currency, rates):
+        """
+        Convert a ledger and its rollups to a currency.
+
+        Args:
+            version (tuple): The version of the ledger, None if the conversion should not be cached.
+            ledger (Ledger): The typed ledger in crowns.
+            aggregates (AggregateStore): The rollups of the ledger in crowns.
+            currency (str): The code of the target currency.
+            rates (RateTable): The exchange rates.
+
+        Returns:
+            tuple: The converted ledger and its rollups, the given ones for the base currency.
+        """
+        if currency == BASE_CURRENCY:
+            return ledger, aggregates
+        key = (version, currency, rates.version)
+        with self._lock:
+            converted = self._entries.get(key) if version is not None else None
+            if converted is not None:
+                self._entries.move_to_end(key)
+                return converted
+
+        converted_ledger = ledger.with_price(rates.convert(ledger.price, ledger.date, currency))
+        converted = (converted_ledger, AggregateStore.from_ledger(converted_ledger))
+        if version is not None:
+            with self._lock:
+                self._entries[key] = converted
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return converted
+
+
+# Conversions shared by the visualization frame and the prefetch
+conversions = ConversionCache()
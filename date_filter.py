@@ -0,0 +1,66 @@
+import customtkinter
+import numpy as np
+from tkinter import messagebox
+from aggregates import parse_date
+
+
+def parse_bound(text):
+    """
+    Parse one bound of a date range entered in the format dd.mm.yyyy.
+
+    Args:
+        text (str): The entered date, an empty text means no bound.
+
+    Returns:
+        np.datetime64 or None: The parsed day, None for no bound.
+
+    Raises:
+        ValueError: If the date can not be parsed.
+    """
+    text = text.strip()
+    if text == "":
+        return None
+    parsed = parse_date(text)
+    if parsed is None:
+        raise ValueError(f"Invalid date '{text}', use the format dd.mm.yyyy.")
+    return np.datetime64(parsed.date(), 'D')
+
+
+class DateRangeFilter(customtkinter.CTkFrame):
+    """
+    A frame with the entries of a date range and a button applying it.
+
+    The range is passed to the command as a (start, end) tuple of np.datetime64 days, a missing bound is None.
+    """
+
+    def __init__(self, parent, command, width=150):
+        super().__init__(parent, fg_color="transparent")
+        self.command = command
+        self.start = None
+        self.end = None
+
+        self.start_entry = customtkinter.CTkEntry(self, width=width, placeholder_text="From (dd.mm.yyyy)")
+        self.start_entry.grid(row=0, column=0, pady=(0, 5))
+        self.end_entry = customtkinter.CTkEntry(self, width=width, placeholder_text="To (dd.mm.yyyy)")
+        self.end_entry.grid(row=1, column=0, pady=(0, 5))
+        self.filter_button = customtkinter.CTkButton(self, width=width, text="Filter dates",
+                                                     command=self.apply)
+        self.filter_button.grid(row=2, column=0)
+
+    def apply(self):
+        """
+        Parse the entered range and pass it to the command, invalid dates are reported in a message box.
+        """
+        try:
+            start = parse_bound(self.start_entry.get())
+            end = parse_bound(self.end_entry.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.start, self.end = start, end
+        self.command((start, end))
+
+    @property
+    def active(self):
+        """bool: True if at least one bound of the range is set."""
+        return self.start is not None or self.end is not None
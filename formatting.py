@@ -0,0 +1,63 @@
+from money import CURRENCY, MINOR_UNITS, format_money, format_money_column
+
+
+def format_number_with_spaces(number):
+    """
+    Format a number of whole crowns with spaces as thousands separators and add the currency symbol 'Kč'.
+
+    Args:
+        number (int or float): The number of crowns to be formatted.
+
+    Returns:
+        str: The formatted number with spaces as thousands separators and the currency symbol.
+    """
+    return format_money(round(number * MINOR_UNITS))
+
+
+def format_statistic(value, key=None, symbol=CURRENCY):
+    """
+    Format a value of the statistics panel together with the group it belongs to.
+
+    Args:
+        value (int or None): The amount of the statistic in minor units, None if it could not be computed.
+        key (str): The day, month or category the value belongs to (optional).
+        symbol (str): The symbol of the currency of the statistics (optional).
+
+    Returns:
+        str: The formatted statistic, or '-' if there is no value.
+    """
+    if value is None:
+        return "-"
+    if key is None:
+        return format_money(value, symbol)
+    return f"{format_money(value, symbol)} ({key})"
+
+
+def format_statistics(stats, symbol=CURRENCY):
+    """
+    Format all statistics of the statistics panel, the amounts are formatted in one vectorized call.
+
+    Args:
+        stats (PanelStatistics): The statistics of a ledger.
+        symbol (str): The symbol of the currency of the statistics (optional).
+
+    Returns:
+        dict: The formatted statistics by the name of their label, '-' for statistics without a value.
+    """
+    statistics = {
+        "expenditure_max_by_day": (stats.max_day_expenditure, stats.max_day),
+        "expenditure_max_by_category": (stats.max_category_expenditure, stats.max_category),
+        "expenditure_month_average": (stats.avg_month_expenditure, None),
+        "expenditure_total": (stats.total_expenditure, None),
+        "income_max_by_month": (stats.max_month_income, stats.max_month),
+        "income_month_average": (stats.avg_month_income, None),
+        "income_total": (stats.total_income, None),
+    }
+    amounts = format_money_column([value or 0 for value, _ in statistics.values()], symbol)
+    labels = {}
+    for (name, (value, key)), amount in zip(statistics.items(), amounts):
+        if value is None:
+            labels[name] = "-"
+        else:
+            labels[name] = f"{amount} ({key})" if key is not None else str(amount)
+    return labels
@@ -3,6 +3,12 @@ import os
 import json
 from datetime import datetime
 from tkinter import messagebox
+from catalog import SORT_ORDERS, open_catalog
+from money import format_money
+from perf import traced
+from prefetch import prefetch_views
+
+# The storages and the ledger cache pull in numpy and pandas, they are imported on first use to keep the start fast
 
 
 # Home frame class for the MoneySaver app
@@ -23,64 +29,138 @@ def base_file_name(file_name):
     return base_name
 
 
-def take_alive_files():
+def take_alive_files(catalog, order="Name"):
     """
     Retrieve a list of existing files.
 
     This function retrieves a list of all files that have been created and returns them in a list. The list is intended
-    to be used for the option menu.
+    to be used for the option menu. The files are listed from the catalog of the ledgers, which is synchronized with
+    the directory without opening any ledger.
+
+    Args:
+        catalog (Catalog): The catalog of the ledgers.
+        order (str): The order of the files, one of catalog.SORT_ORDERS.
 
     Returns:
         list: A list containing the names of existing files.
     """
     file_list = ["None"]  # Initialize the list with a default option
-    for filename in os.listdir('/path_to_files'):
-        if os.path.isfile(os.path.join('/path_to_files', filename)):
-            file_list.append(base_file_name(filename))
+    file_list += catalog.names(order)
     return file_list
 
+
+def describe_entry(entry):
+    """
+    Format the metadata of a ledger from the catalog for the label under the option menu.
+
+    Args:
+        entry (dict): The catalog entry of the ledger.
+
+    Returns:
+        str: The formatted metadata, empty if the ledger was not indexed yet.
+    """
+    if entry is None or "rows" not in entry:
+        return ""
+    lines = [f"Author: {entry['author']}" if entry["author"] else "No author", f"{entry['rows']} records"]
+    if entry["first_date"] is not None:
+        first, last = (datetime.strptime(day, "%Y-%m-%d").strftime("%d.%m.%Y")
+                       for day in (entry["first_date"], entry["last_date"]))
+        lines[-1] += f", {first} - {last}"
+    lines.append(f"Income: {format_money(entry['total_income'])}")
+    lines.append(f"Expenditure: {format_money(entry['total_expenditure'])}")
+    return "\n".join(lines)
+
+
+@traced("preload_ledger")
+def preload_ledger(job, path):
+    """
+    Load the typed ledger and its rollups into the ledger cache, it runs in a worker thread.
+
+    The raw content of the file is not loaded: JSON ledgers are streamed into their typed columns, the content is read
+    only when the ledger is opened in the adding frame.
+
+    Args:
+        job (Job): The job running the function.
+        path (str): The path of the ledger file.
+    """
+    from ledger_cache import ledger_cache
+
+    ledger_cache.load_ledger(path)
+    job.report(0.5, "Aggregating")
+    ledger_cache.load_aggregates(path)
+
+
+@traced("index_catalog")
+def index_catalog(job, catalog, paths):
+    """
+    Describe new and changed ledgers in the catalog, it runs in a worker thread.
+
+    Args:
+        job (Job): The job running the function.
+        catalog (Catalog): The catalog of the ledgers.
+        paths (list): The paths of the ledgers to be described.
+    """
+    catalog.index(paths, job)
+
+
 class HomeFrame(customtkinter.CTkFrame):
     def __init__(self, parent):
         super().__init__(parent, corner_radius=0, fg_color="transparent")
 
+        # Chosen ledgers are loaded by the worker pool of the application
+        self.workers = parent.workers
+
         # Set the weight of the rows and columns
         self.rowconfigure(0, weight=1)
         self.columnconfigure(0, weight=1)
 
         # Set the current files
         # function upload all already created files and shown them in option menu
-        self.current_files = take_alive_files()
+        self.catalog = open_catalog('/path_to_files')
+        self.index_stale()
+        self.current_files = take_alive_files(self.catalog)
 
         # create frame which holds all widgets in smaller rectangle
         self.frame = customtkinter.CTkFrame(self)
         self.frame.grid(row=0, column=0)
 
         # Set the weight of the rows and columns
-        self.frame.rowconfigure((1,8), weight=1)
+        self.frame.rowconfigure((1,10), weight=1)
         self.frame.grid_columnconfigure(0, weight=1)
 
         # Create the widgets
         self.choose_file = customtkinter.CTkLabel(self.frame, text="Choose file:")
         self.choose_file.grid(row=1, column=0, padx=20, pady=(30, 0), sticky="s")
         self.choose_file_opener = customtkinter.CTkOptionMenu(self.frame, width=180,
-                                                              values=self.current_files, command=self.select_file)
+                                                              values=self.current_files, command=self.preload_file)
         self.choose_file_opener.grid(row=2, column=0, padx=20, pady=5)
+        self.sort_menu = customtkinter.CTkOptionMenu(self.frame, width=180, values=list(SORT_ORDERS),
+                                                     command=lambda order: self.refresh_values(rescan=False))
+        self.sort_menu.grid(row=3, column=0, padx=20, pady=5)
+        self.metadata_label = customtkinter.CTkLabel(self.frame, text="", justify="left")
+        self.metadata_label.grid(row=4, column=0, padx=20, pady=5)
         self.label = customtkinter.CTkLabel(self.frame, text="or")
-        self.label.grid(row=3, column=0, padx=40, pady=5)
+        self.label.grid(row=5, column=0, padx=40, pady=5)
         self.entry = customtkinter.CTkEntry(self.frame, width=180, placeholder_text="Author name")
-        self.entry.grid(row=4, column=0, padx=40, pady=5)
+        self.entry.grid(row=6, column=0, padx=40, pady=5)
         self.entry2 = customtkinter.CTkEntry(self.frame, width=180, placeholder_text="File name")
-        self.entry2.grid(row=5, column=0, padx=40, pady=10)
+        self.entry2.grid(row=7, column=0, padx=40, pady=10)
+        self.storage_menu = customtkinter.CTkOptionMenu(self.frame, width=180,
+                                                        values=["JSON", "Journal", "SQLite", "Partitioned"])
+        self.storage_menu.grid(row=8, column=0, padx=40, pady=5)
         self.create_button = customtkinter.CTkButton(self.frame, width=180,
                                                      text="Create file", anchor="center", command=self.click_on_create)
-        self.create_button.grid(row=6, column=0, padx=40, pady=(10, 40))
+        self.create_button.grid(row=9, column=0, padx=40, pady=(10, 40))
 
     def click_on_create(self):
         """
         Create a new file when the 'Create' button is clicked.
 
         Reads author name and file name from entry widgets, creates a new file using the provided data template,
-        and saves it with the given name. Refreshes values, clears the entry widgets, and displays a success message.
+        and saves it with the given name. The storage mode chosen in the storage menu is stored in the file, ledgers
+        in the journal mode append their changes to a journal instead of rewriting the file on every save, SQLite
+        ledgers are kept in an indexed database and partitioned ledgers keep every month in its own shard. Refreshes
+        values, clears the entry widgets, and displays a success message.
 
         Args:
             None
@@ -88,6 +168,10 @@ class HomeFrame(customtkinter.CTkFrame):
         Returns:
             None
         """
+        from partitioned_storage import PartitionedStorage
+        from sqlite_storage import SqliteStorage
+        from storage import JOURNAL_MODE
+
         # Get author and file name from entry widgets
         author = self.entry.get()
         file_name = self.entry2.get()
@@ -109,11 +193,18 @@ class HomeFrame(customtkinter.CTkFrame):
                 "income_expenditure": [],
             }
         }
+        if self.storage_menu.get() == "Journal":
+            data["storage"] = JOURNAL_MODE
 
         # Create a new file and save data
-        file_name = os.path.join("/path_to_files", file_name + '.json')
-        with open(file_name, 'w') as f:
-            json.dump(data, f, indent=4)
+        if self.storage_menu.get() == "SQLite":
+            SqliteStorage.create(os.path.join("/path_to_files", file_name + '.sqlite'), data)
+        elif self.storage_menu.get() == "Partitioned":
+            PartitionedStorage.create(os.path.join("/path_to_files", file_name + '.ledger'), data)
+        else:
+            file_name = os.path.join("/path_to_files", file_name + '.json')
+            with open(file_name, 'w') as f:
+                json.dump(data, f, indent=4)
 
         # Refresh values, clear entry widgets, and show success message
         self.refresh_values()
@@ -123,44 +214,77 @@ class HomeFrame(customtkinter.CTkFrame):
         log_message = "The file was created successfully"
         messagebox.showinfo("Info", log_message)
 
-    def select_file(self, name=None):
+    def preload_file(self, name):
         """
-        Retrieve data from the selected file.
+        Start loading the file selected in the option menu in the background.
 
-        This function is triggered when a file is selected from the option menu or when the 'Adding' button in
-        the navigation frame is clicked. The selected file's data is stored in the self.data variable for use in
-        other frames.
+        The ledger is loaded into the ledger cache by a worker thread, so the window does not freeze and opening the
+        ledger in the other frames is fast. Once it is loaded, the views of the visualization frame are prepared by a
+        low priority job, which gives way to any other work. Choosing another file cancels the loading and the
+        preparation of the previous one.
 
         Args:
-            name (str): The name of the selected file (optional).
+            name (str): The name of the selected file.
+        """
+        self.show_metadata()
+        self.workers.cancel("prefetch")
+        if name == "None":
+            self.workers.cancel("preload")
+            return
+        path = self.selected_path()
+        self.workers.submit("preload", preload_ledger, path, text="Loading ledger",
+                            on_done=lambda result: self.workers.submit("prefetch", prefetch_views, path,
+                                                                       text="Preparing charts", low_priority=True))
+
+    def selected_path(self):
+        """
+        Build the path of the file chosen in the option menu.
 
         Returns:
-            tuple: A tuple containing the loaded data from the file and a boolean status indicating if data were upload.
+            str: The path of the selected file.
         """
-        # If name is not provided as an argument, use the name from the option menu
         name = self.choose_file_opener.get()
-
-        # Load data from the selected file
-        with open('/path_to_files/' + name + ".json", 'r') as f:
-            data = json.load(f)
-            status = True  # Indicates success
-
-        return data, status
-
-    def refresh_values(self):
+        # Ledgers migrated to SQLite are opened from their database, partitioned ledgers from their manifest
+        if os.path.exists('/path_to_files/' + name + ".sqlite"):
+            return '/path_to_files/' + name + ".sqlite"
+        if os.path.exists('/path_to_files/' + name + ".ledger"):
+            return '/path_to_files/' + name + ".ledger"
+        return '/path_to_files/' + name + ".json"
+
+    def refresh_values(self, rescan=True):
         """
         Refresh the values in the option menu.
 
-        This function updates the values displayed in the option menu with the updated list of existing files.
+        This function updates the values displayed in the option menu with the updated list of existing files, sorted
+        in the order chosen in the sort menu.
 
         Args:
-            None
+            rescan (bool): Synchronize the catalog with the directory and index new and changed ledgers first.
 
         Returns:
             None
         """
-        updated_files = take_alive_files()
+        if rescan:
+            self.index_stale()
+        updated_files = take_alive_files(self.catalog, self.sort_menu.get())
 
         # Update the values of the option menu
         self.choose_file_opener.configure(values=updated_files)
+        self.show_metadata()
+
+    def index_stale(self):
+        """
+        Synchronize the catalog with the directory and describe new and changed ledgers in the background.
 
+        The ledgers are listed right away, their metadata appear in the catalog once the worker described them.
+        """
+        stale = self.catalog.refresh()
+        if stale:
+            self.workers.submit("catalog", index_catalog, self.catalog, stale, text="Indexing ledgers",
+                                on_done=lambda result: self.refresh_values(rescan=False))
+
+    def show_metadata(self):
+        """
+        Show the metadata of the selected file from the catalog under the option menu.
+        """
+        self.metadata_label.configure(text=describe_entry(self.catalog.get(self.choose_file_opener.get())))
@@ -0,0 +1,419 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from money import MAX_MINOR, MINOR_UNITS
+
+
+def group_sum(keys, values):
+    """
+    Sum values grouped by keys.
+
+    Args:
+        keys (np.ndarray): The group key of every value.
+        values (np.ndarray): The values to be summed.
+
+    Returns:
+        tuple: Sorted unique keys and the int64 sum of values for each of them.
+    """
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    sums = np.zeros(len(unique_keys), dtype=np.int64)
+    np.add.at(sums, inverse, values)
+    return unique_keys, sums
+
+
+def code_sums(codes, values, size):
+    """
+    Sum values grouped by small integer codes, e.g. the category codes of a ledger.
+
+    The sums are exact integer sums into one slot per code, the rows of every code are counted with np.bincount. No
+    keys are sorted or hashed, so the cost is one pass over the rows whatever the number of groups.
+
+    Args:
+        codes (np.ndarray): The code (0 to size - 1) of every value.
+        values (np.ndarray): The int64 values to be summed.
+        size (int): The number of codes.
+
+    Returns:
+        tuple: The int64 sum and the number of values of every code.
+    """
+    codes = np.asarray(codes, dtype=np.intp)
+    sums = np.zeros(size, dtype=np.int64)
+    np.add.at(sums, codes, values)
+    counts = np.bincount(codes, minlength=size)
+    return sums, counts
+
+
+def date_range_bounds(sorted_dates, start=None, end=None):
+    """
+    Find the rows of a sorted date column falling into a date range with two binary searches.
+
+    Args:
+        sorted_dates (np.ndarray): The sorted datetime64[D] column, NaT values (sorted last) are never selected.
+        start (np.datetime64): The first day of the range, None for no lower bound.
+        end (np.datetime64): The last day of the range (inclusive), None for no upper bound.
+
+    Returns:
+        tuple: The first and the past-the-end position of the rows in the range.
+    """
+    if start is None:
+        lo = 0
+    else:
+        lo = int(np.searchsorted(sorted_dates, np.datetime64(start, 'D'), side='left'))
+    if end is None:
+        # NaT values are sorted after all dates, so the range ends at the first of them
+        hi = int(np.searchsorted(sorted_dates, np.datetime64('NaT', 'D'), side='left'))
+    else:
+        hi = int(np.searchsorted(sorted_dates, np.datetime64(end, 'D'), side='right'))
+    return lo, max(lo, hi)
+
+
+def parse_date_column(values):
+    """
+    Parse dates stored in the format dd.mm.yyyy.
+
+    Args:
+        values (list): The dates as stored in the ledger file.
+
+    Returns:
+        np.ndarray: The datetime64[D] dates, NaT for dates which can not be parsed.
+    """
+    date = pd.to_datetime(pd.Series(values, dtype=object), format='%d.%m.%Y', errors='coerce')
+    return date.to_numpy(dtype='datetime64[D]')
+
+
+def parse_price_column(values):
+    """
+    Parse prices into minor units, unparsable prices count as 0.
+
+    The prices are parsed only here, when the ledger is built; all sums over them are exact integer sums.
+
+    Args:
+        values (list): The prices in crowns as stored in the ledger file.
+
+    Returns:
+        np.ndarray: The int64 prices in minor units (haléře).
+    """
+    price = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64) * MINOR_UNITS
+    price = np.where(np.isfinite(price) & (np.abs(price) < MAX_MINOR), price, 0)
+    return np.rint(price).astype(np.int64)
+
+
+def parse_flag_column(values):
+    """
+    Parse the income/expenditure flags.
+
+    Args:
+        values (list): The flags as stored in the ledger file, "1" for income.
+
+    Returns:
+        np.ndarray: The boolean income flags.
+    """
+    return np.asarray(values, dtype=object) == "1"
+
+
+def parse_type_column(values):
+    """
+    Dictionary-encode the types of the records.
+
+    Args:
+        values (list): The types as stored in the ledger file.
+
+    Returns:
+        tuple: The int32 code of every record and the distinct types (object array) in the order of their first record.
+    """
+    codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    return codes.astype(np.int32), np.asarray(categories, dtype=object)
+
+
+def encode_categories(items):
+    """
+    Dictionary-encode the "type" column of the "items" dictionary of a ledger file for writing.
+
+    The distinct types are stored once in a "categories" list placed right before the "type" column, which then holds
+    the position of the type of every record in that list. Readers get the dictionary before the codes, so even the
+    streaming reader decodes the codes as they arrive.
+
+    Args:
+        items (dict): The column lists with the types as strings.
+
+    Returns:
+        dict: A copy of items with the encoded "type" column, the column lists themselves are shared.
+    """
+    codes = {}
+    type_codes = [codes.setdefault(value, len(codes)) for value in items["type"]]
+    encoded = {}
+    for name, values in items.items():
+        if name == "type":
+            encoded["categories"] = list(codes)
+            values = type_codes
+        encoded[name] = values
+    return encoded
+
+
+def decode_categories(items):
+    """
+    Decode the "type" column of the "items" dictionary of a ledger file in place.
+
+    Files written before the types were encoded have no "categories" list and are left as they are.
+
+    Args:
+        items (dict): The column lists as stored in the ledger file.
+
+    Returns:
+        dict: items with the types as strings.
+    """
+    categories = items.pop("categories", None)
+    if categories is not None:
+        items["type"] = [categories[code] for code in items["type"]]
+    return items
+
+
+class Ledger:
+    """
+    Typed, column oriented view of a ledger file.
+
+    The string lists stored in the "items" dictionary of a ledger file are parsed only once, when the ledger is built.
+    Dates are held as a datetime64[D] column (NaT for dates which can not be parsed), prices as an int64 column of
+    minor units (haléře, unparsable prices count as 0) and the income/expenditure flag as a boolean column. Types are
+    dictionary encoded: every row holds the int32 code of its type in the small per-ledger array of categories, so
+    grouping by type is a bincount over the codes. Derived columns such as the day, month and year-month are computed
+    on first use and cached, so charts and statistics never parse strings again.
+    """
+
+    def __init__(self, date, codes, categories, price, is_income):
+        self.date = date
+        self.codes = codes
+        self.categories = categories
+        self.price = price
+        self.is_income = is_income
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Build a ledger from the "items" dictionary of a ledger file.
+
+        Args:
+            items (dict): The column lists with keys "date", "type", "price" and "income_expenditure", the types are
+                either strings or codes into the "categories" list written by encode_categories.
+
+        Returns:
+            Ledger: The parsed ledger.
+        """
+        if "categories" in items:
+            codes = np.asarray(items["type"], dtype=np.int32)
+            categories = np.array(items["categories"], dtype=object)
+        else:
+            codes, categories = parse_type_column(items["type"])
+        return cls(date=parse_date_column(items["date"]), codes=codes, categories=categories,
+                   price=parse_price_column(items["price"]),
+                   is_income=parse_flag_column(items["income_expenditure"]))
+
+    @classmethod
+    def from_types(cls, date, types, price, is_income):
+        """
+        Build a ledger from typed columns with the types as strings.
+
+        Args:
+            date (np.ndarray): The datetime64[D] dates.
+            types (list): The types of the rows.
+            price (np.ndarray): The int64 prices in minor units.
+            is_income (np.ndarray): The boolean income flags.
+
+        Returns:
+            Ledger: The ledger with dictionary-encoded types.
+        """
+        codes, categories = parse_type_column(types)
+        return cls(date=date, codes=codes, categories=categories, price=price, is_income=is_income)
+
+    @classmethod
+    def from_file_data(cls, data):
+        """
+        Build a ledger from the loaded content of a ledger file.
+
+        Args:
+            data (dict): The loaded ledger file.
+
+        Returns:
+            Ledger: The parsed ledger.
+        """
+        return cls.from_items(data["items"])
+
+    @classmethod
+    def empty(cls):
+        """
+        Build a ledger without rows.
+
+        Returns:
+            Ledger: The empty ledger.
+        """
+        return cls(date=np.array([], dtype='datetime64[D]'), codes=np.array([], dtype=np.int32),
+                   categories=np.array([], dtype=object), price=np.array([], dtype=np.int64),
+                   is_income=np.array([], dtype=bool))
+
+    @classmethod
+    def concat(cls, ledgers):
+        """
+        Join ledgers into one, keeping the order of the ledgers and of their rows.
+
+        The categories of the joined ledger are the union of the categories of the ledgers, the codes of every ledger
+        are translated into it with one lookup per row.
+
+        Args:
+            ledgers (list): The ledgers to be joined.
+
+        Returns:
+            Ledger: The joined ledger.
+        """
+        if not ledgers:
+            return cls.empty()
+        if len(ledgers) == 1:
+            return ledgers[0]
+
+        positions = {}
+        codes = []
+        for ledger in ledgers:
+            remap = np.array([positions.setdefault(category, len(positions)) for category in ledger.categories],
+                             dtype=np.int32)
+            codes.append(remap[ledger.codes])
+        return cls(date=np.concatenate([ledger.date for ledger in ledgers]),
+                   codes=np.concatenate(codes),
+                   categories=np.array(list(positions), dtype=object),
+                   price=np.concatenate([ledger.price for ledger in ledgers]),
+                   is_income=np.concatenate([ledger.is_income for ledger in ledgers]))
+
+    def __len__(self):
+        return len(self.price)
+
+    @cached_property
+    def type(self):
+        """np.ndarray: The type of every row as an object array, decoded from the codes on first use."""
+        return self.categories[self.codes]
+
+    def select(self, mask):
+        """
+        Select a subset of the rows.
+
+        Args:
+            mask (np.ndarray): A boolean mask or an array of row positions.
+
+        Returns:
+            Ledger: A new ledger with the selected rows, sharing the categories of this ledger.
+        """
+        return Ledger(self.date[mask], self.codes[mask], self.categories, self.price[mask], self.is_income[mask])
+
+    def slice(self, start, stop):
+        """
+        Select a contiguous range of rows.
+
+        Args:
+            start (int): The position of the first row.
+            stop (int): The position after the last row.
+
+        Returns:
+            Ledger: A ledger whose columns are views of the columns of this ledger, no data are copied.
+        """
+        return Ledger(self.date[start:stop], self.codes[start:stop], self.categories, self.price[start:stop],
+                      self.is_income[start:stop])
+
+    def with_price(self, price):
+        """
+        Replace the prices of the rows, e.g. by the prices converted to another currency.
+
+        Args:
+            price (np.ndarray): The int64 price of every row in minor units.
+
+        Returns:
+            Ledger: A ledger sharing the other columns with this ledger.
+        """
+        return Ledger(self.date, self.codes, self.categories, price, self.is_income)
+
+    def between(self, start=None, end=None):
+        """
+        Select the rows dated within a date range.
+
+        The range is found by binary searches in the date index, so a query costs O(log n) plus the size of the
+        selected range, and the selected rows are a zero-copy view of the index. Rows without a valid date are never
+        selected.
+
+        Args:
+            start (np.datetime64): The first day of the range, None for no lower bound.
+            end (np.datetime64): The last day of the range (inclusive), None for no upper bound.
+
+        Returns:
+            Ledger: The rows of the range sorted by date.
+        """
+        index = self.by_date
+        return index.slice(*date_range_bounds(index.date, start, end))
+
+    @cached_property
+    def expenditures(self):
+        """Ledger: The expenditure rows."""
+        return self.select(~self.is_income)
+
+    @cached_property
+    def incomes(self):
+        """Ledger: The income rows."""
+        return self.select(self.is_income)
+
+    def of_type(self, expenditure_type):
+        """
+        Select the rows of one type of expenditure or income.
+
+        Args:
+            expenditure_type (str): The type to filter for.
+
+        Returns:
+            Ledger: A new ledger with the rows of the given type.
+        """
+        matches = np.flatnonzero(self.categories == expenditure_type)
+        if len(matches) == 0:
+            return self.select(np.zeros(len(self), dtype=bool))
+        return self.select(self.codes == matches[0])
+
+    def category_sums(self):
+        """
+        Sum the prices of the rows by type.
+
+        Returns:
+            tuple: The categories which have at least one row, the int64 sum of their prices and their numbers of rows.
+        """
+        sums, counts = code_sums(self.codes, self.price, len(self.categories))
+        present = counts > 0
+        return self.categories[present], sums[present], counts[present]
+
+    @cached_property
+    def has_date(self):
+        """np.ndarray: Boolean mask of the rows with a valid date."""
+        return ~np.isnat(self.date)
+
+    @cached_property
+    def dated(self):
+        """Ledger: The rows with a valid date, rows without one are skipped by every date based grouping."""
+        if self.has_date.all():
+            return self
+        return self.select(self.has_date)
+
+    @cached_property
+    def by_date(self):
+        """Ledger: The date index, rows with a valid date sorted by date (rows of one day keep their order)."""
+        dated = self.dated
+        if (dated.date[1:] >= dated.date[:-1]).all():
+            return dated  # Ledgers are mostly appended in date order, so they are already sorted
+        return dated.select(np.argsort(dated.date, kind='stable'))
+
+    @cached_property
+    def year_month(self):
+        """np.ndarray: The year and month of every row as datetime64[M]."""
+        return self.date.astype('datetime64[M]')
+
+    @cached_property
+    def month(self):
+        """np.ndarray: The month of the year (1-12) of every row."""
+        return (self.year_month.astype(np.int64) % 12 + 1).astype(np.int8)
+
+    @cached_property
+    def day(self):
+        """np.ndarray: The day of the month (1-31) of every row."""
+        return ((self.date - self.year_month).astype(np.int64) + 1).astype(np.int8)
@@ -0,0 +1,301 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aggregates import AggregateStore
+from catalog import open_catalog
+from perf import traced
+from storage import apply_entry, open_storage
+
+
+class LedgerCache:
+    """
+    Process-wide in-memory cache of loaded ledger files.
+
+    Every entry is keyed by the absolute path of the ledger and validated against the signature of its storage
+    (modification times and sizes of the files holding the ledger), so a ledger is parsed again only when it has
+    actually changed on disk. The cache is bounded both by the number of ledgers and by the summed size of their files;
+    when a bound is exceeded, the least recently used ledger is evicted.
+    """
+
+    def __init__(self, max_entries=4, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        # Background compactions of journaled ledgers update the cache from their own threads
+        self._lock = threading.RLock()
+        # The rollups and the catalog of saved ledgers are written by one thread in the order of the saves, its
+        # pending writes are finished before the interpreter exits
+        self._writer = ThreadPoolExecutor(max_workers=1)
+
+    @traced("LedgerCache.load")
+    def load(self, path):
+        """
+        Return the data of a ledger file, reading it from disk only when needed.
+
+        The whole ledger is loaded, it is used by the adding frame and the statement import whose model is saved back
+        over the ledger. Views of a period read only the records of the period through the typed ledger (see
+        load_ledger).
+
+        Args:
+            path (str): The path of the ledger file.
+
+        Returns:
+            dict: The loaded ledger data.
+        """
+        with self._lock:
+            entry = self._entry(path)
+            if entry["data"] is None:
+                entry["data"] = open_storage(path).load()
+            return entry["data"]
+
+    @traced("LedgerCache.load_ledger")
+    def load_ledger(self, path):
+        """
+        Return the typed ledger of a ledger file.
+
+        The ledger is built once per version of the file and kept next to its raw data in the cache. JSON ledgers whose
+        data are not loaded are streamed into their typed columns, ledgers kept in a SQLite database are not loaded at
+        all, their typed view queries the database.
+
+        Args:
+            path (str): The path of the ledger file.
+
+        Returns:
+            Ledger or SqliteLedger: The typed ledger.
+        """
+        with self._lock:
+            entry = self._entry(path)
+            if entry.get("ledger") is None:
+                entry["ledger"] = open_storage(path).typed_ledger(lambda: self.load(path), loaded=entry["data"])
+            return entry["ledger"]
+
+    def version(self, path):
+        """
+        Return the version of a cached ledger, which identifies its content in the render cache of the charts.
+
+        Args:
+            path (str): The path of the ledger file.
+
+        Returns:
+            tuple or None: The absolute path and the signature of the cached ledger, None if it is not cached.
+        """
+        with self._lock:
+            key = os.path.abspath(path)
+            entry = self._entries.get(key)
+            return (key, entry["signature"]) if entry is not None else None
+
+    @traced("LedgerCache.load_aggregates")
+    def load_aggregates(self, path, persist=True):
+        """
+        Return the rollups of a ledger file.
+
+        The rollups persisted next to the ledger are used when they describe the current version of the file,
+        otherwise they are rebuilt by the storage of the ledger and persisted again unless persist is False.
+
+        Args:
+            path (str): The path of the ledger file.
+            persist (bool): Whether rebuilt rollups are written next to the ledger.
+
+        Returns:
+            AggregateStore: The rollups of the ledger.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entry(key)
+            if entry.get("aggregates") is None:
+                store = AggregateStore.load(key, entry["signature"])
+                if store is None:
+                    store = open_storage(key).build_aggregates(self.load_ledger(key))
+                    if persist:
+                        try:
+                            store.save(key, entry["signature"])
+                        except OSError:
+                            pass  # The rollups are only an optimization, they are rebuilt on the next load
+                entry["aggregates"] = store
+            return entry["aggregates"]
+
+    @traced("LedgerCache.save")
+    def save(self, path, model):
+        """
+        Save a transaction model through the storage of the ledger and register the result in the cache.
+
+        Storages which write only the changes of the model do not return the content of the whole ledger; the changes
+        are then applied to the cached content, so the cost of the save does not grow with the size of the ledger.
+
+        Args:
+            path (str): The path of the ledger file.
+            model (TransactionModel): The model of the ledger.
+        """
+        key = os.path.abspath(path)
+        storage = open_storage(key)
+        changes = list(model.changes)
+        before = storage.signature()
+        data = storage.save(model, on_compacted=lambda compacted: self.revalidate(key, compacted))
+        if data is not None:
+            self.store(key, data, model.aggregates)
+        else:
+            self.apply(key, before, changes, model)
+
+    def apply(self, path, before, changes, model):
+        """
+        Register the changes of a ledger which were just appended to its storage.
+
+        The changes are applied to the cached content of the ledger only if the entry describes the ledger as it was
+        before the save, otherwise the entry is dropped and the ledger is loaded again when needed. The typed ledger
+        derived from the content is dropped and built again on its next use.
+
+        Args:
+            path (str): The path of the ledger file.
+            before (tuple): The signature of the storage before the save.
+            changes (list): The saved changes as (operation, index, record).
+            model (TransactionModel): The saved model, its rollups describe the ledger after the save.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["signature"] != before:
+                self.invalidate(key)
+                return
+            data = entry["data"]
+            if data is not None:
+                items = data["items"]
+                for op, index, record in changes:
+                    apply_entry(items, {"op": op, "index": index, "record": record})
+                    if op == "add":
+                        items["index"].append(len(items["index"]))
+                    elif op == "delete":
+                        items["index"].pop()
+                data["journal_seq"] = model.journal_seq
+            signature = open_storage(key).signature()
+            self._total_bytes += storage_bytes(signature) - storage_bytes(entry["signature"])
+            entry.update(signature=signature, ledger=None, aggregates=model.aggregates)
+        if model.aggregates is not None:
+            self._persist(key, signature, {"author": model.author}, model.aggregates)
+
+    def store(self, path, data, aggregates=None):
+        """
+        Register data which were just written to a ledger file.
+
+        This is used after saving, so the following load of the same file does not have to parse it again.
+        The rollups maintained while editing the ledger are persisted next to it and the ledger is described in the
+        catalog of its directory, so the home frame lists it without reading it again.
+
+        Args:
+            path (str): The path of the written ledger file.
+            data (dict): The data written to the file.
+            aggregates (AggregateStore): The rollups of the written data (optional).
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            signature = open_storage(key).signature()
+            self._put(key, signature, data)
+            if aggregates is not None:
+                self._entries[key]["aggregates"] = aggregates
+        if aggregates is not None:
+            self._persist(key, signature, data, aggregates)
+
+    def _persist(self, path, signature, header, aggregates):
+        """
+        Write the rollups of a saved ledger next to it and describe it in the catalog, off the path of the save.
+
+        Args:
+            path (str): The absolute path of the ledger file.
+            signature (tuple): The signature of the saved ledger.
+            header (dict): The content of the ledger file, only its header is used.
+            aggregates (AggregateStore): The rollups of the saved ledger, they are not changed after the save.
+        """
+        def write():
+            try:
+                aggregates.save(path, signature)
+            except OSError:
+                pass  # The rollups are only an optimization, they are rebuilt on the next load
+            open_catalog(os.path.dirname(path)).update(path, header, aggregates)
+
+        self._writer.submit(write)
+
+    def revalidate(self, path, data):
+        """
+        Accept the new signature of a ledger whose files were rewritten without changing its content.
+
+        This is called after a journal was compacted into a new snapshot. The entry is kept only if it still holds the
+        compacted data, otherwise it describes a newer version and is validated on the next load as usual.
+
+        Args:
+            path (str): The path of the ledger file.
+            data (dict): The data which were compacted.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["data"] is not data:
+                return
+            signature = open_storage(key).signature()
+            self._total_bytes += storage_bytes(signature) - storage_bytes(entry["signature"])
+            entry["signature"] = signature
+            if entry.get("aggregates") is not None:
+                entry["aggregates"].save(key, signature)
+                open_catalog(os.path.dirname(key)).update(key, data, entry["aggregates"])
+
+    def invalidate(self, path):
+        """
+        Drop a ledger from the cache.
+
+        Args:
+            path (str): The path of the ledger file.
+        """
+        with self._lock:
+            entry = self._entries.pop(os.path.abspath(path), None)
+            if entry is not None:
+                self._total_bytes -= storage_bytes(entry["signature"])
+
+    def clear(self):
+        """
+        Drop all ledgers from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _entry(self, path):
+        """
+        Return the entry of a ledger, replacing it by an empty one if the ledger changed on disk.
+        """
+        key = os.path.abspath(path)
+        signature = open_storage(key).signature()
+        entry = self._entries.get(key)
+        if entry is not None and entry["signature"] == signature:
+            # The file did not change since it was loaded, mark the entry as recently used
+            self._entries.move_to_end(key)
+            return entry
+        self._put(key, signature, None)
+        return self._entries[key]
+
+    def _put(self, key, signature, data):
+        self.invalidate(key)
+        self._entries[key] = {"signature": signature, "data": data}
+        self._total_bytes += storage_bytes(signature)
+
+        # Evict the least recently used ledgers, the newest one is always kept
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= storage_bytes(evicted["signature"])
+
+
+def storage_bytes(signature):
+    """
+    Sum the sizes of the files described by a storage signature of (modification time, size) pairs.
+
+    Args:
+        signature (tuple): The signature of the storage of a ledger.
+
+    Returns:
+        int: The number of bytes the ledger takes on disk.
+    """
+    return sum(signature[1::2])
+
+
+# Cache shared by all frames of the application
+ledger_cache = LedgerCache()
@@ -0,0 +1,206 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from aggregates import EXPENDITURE, INCOME
+from ledger import code_sums
+
+# Number of slots used for the month of the year in the combined group keys (months are 1-12)
+MONTH_SLOTS = 13
+
+
+@dataclass(frozen=True)
+class PanelStatistics:
+    """
+    Statistics shown in the statistics panel of the visualization frame.
+
+    Amounts of money are in minor units (haléře). Values of statistics which can not be computed (for example the
+    maximum of an empty ledger) are None.
+    """
+
+    max_day_expenditure: Optional[int]
+    max_day: Optional[str]
+    max_category_expenditure: Optional[int]
+    max_category: Optional[str]
+    avg_month_expenditure: Optional[int]
+    total_expenditure: int
+    max_month_income: Optional[int]
+    max_month: Optional[str]
+    avg_month_income: Optional[int]
+    total_income: int
+
+
+def compute_statistics(ledger):
+    """
+    Compute all statistics of the statistics panel in one vectorized pass over the ledger.
+
+    The typed columns of the ledger are combined into small integer group keys, so every grouping used by the panel
+    (by day, by month, by category and by income/expenditure) is a single exact integer group sum over the ledger
+    instead of a copy, a parse and a groupby per statistic. The panel itself reads its statistics from the rollups of
+    the ledger (see statistics_from_aggregates), this kernel computes them from the rows and is used by the benchmarks.
+
+    Args:
+        ledger (Ledger): The ledger to be described.
+
+    Returns:
+        PanelStatistics: The statistics of the ledger.
+    """
+    accumulator = StatisticsAccumulator()
+    accumulator.add(ledger)
+    return accumulator.result()
+
+
+class StatisticsAccumulator:
+    """
+    Running sums behind the statistics of the statistics panel.
+
+    Rows are added in chunks of any size and only the fixed-size group sums are kept between the chunks, so the
+    statistics of a ledger read in a stream are computed without holding all of its rows.
+    """
+
+    def __init__(self):
+        self.totals = np.zeros(2, dtype=np.int64)
+        self.month_sums = np.zeros(2 * MONTH_SLOTS, dtype=np.int64)
+        self.month_counts = np.zeros(2 * MONTH_SLOTS, dtype=np.int64)
+        self.day_sums = np.zeros(32 * MONTH_SLOTS, dtype=np.int64)
+        self.day_counts = np.zeros(32 * MONTH_SLOTS, dtype=np.int64)
+        self.categories = {}
+
+    def add(self, ledger):
+        """
+        Add a chunk of rows.
+
+        Args:
+            ledger (Ledger): The rows to be added.
+        """
+        price = ledger.price
+        is_income = ledger.is_income
+        is_expenditure = ~is_income
+
+        # Totals of income and expenditure include rows without a valid date
+        self.totals += code_sums(is_income.astype(np.intp), price, 2)[0]
+
+        # Month sums of both income and expenditure, keyed by flag * 13 + month of the year
+        dated = ledger.has_date
+        month = ledger.month.astype(np.intp)
+        month_keys = is_income[dated].astype(np.intp) * MONTH_SLOTS + month[dated]
+        sums, counts = code_sums(month_keys, price[dated], 2 * MONTH_SLOTS)
+        self.month_sums += sums
+        self.month_counts += counts
+
+        # Expenditure sums by day and month, keyed by day * 13 + month which keeps the order of the 'dd.mm' labels
+        dated_expenditure = dated & is_expenditure
+        day_keys = ledger.day[dated_expenditure].astype(np.intp) * MONTH_SLOTS + month[dated_expenditure]
+        sums, counts = code_sums(day_keys, price[dated_expenditure], 32 * MONTH_SLOTS)
+        self.day_sums += sums
+        self.day_counts += counts
+
+        # Expenditure sums by category code, merged by category into the sums of the previous chunks
+        sums, counts = code_sums(ledger.codes[is_expenditure], price[is_expenditure], len(ledger.categories))
+        for category, category_sum, category_count in zip(ledger.categories.tolist(), sums.tolist(), counts.tolist()):
+            if not category_count:
+                continue
+            group = self.categories.setdefault(category, [0, 0])
+            group[0] += category_sum
+            group[1] += category_count
+
+    def result(self):
+        """
+        Compute the statistics of all rows added so far.
+
+        Returns:
+            PanelStatistics: The statistics of the rows.
+        """
+        # Categories are sorted so ties resolve like a sorted groupby
+        categories = sorted(self.categories)
+        category_sums = np.array([self.categories[category][0] for category in categories], dtype=np.int64)
+        category_counts = np.array([self.categories[category][1] for category in categories], dtype=np.int64)
+
+        max_day_expenditure, max_day = _max_group(self.day_sums, self.day_counts)
+        max_category_expenditure, max_category = _max_group(category_sums, category_counts)
+        month_sums, month_counts = self.month_sums, self.month_counts
+        max_month_income, max_month = _max_group(month_sums[MONTH_SLOTS:], month_counts[MONTH_SLOTS:])
+
+        return PanelStatistics(
+            max_day_expenditure=max_day_expenditure,
+            max_day=None if max_day is None else f"{max_day // MONTH_SLOTS:02d}.{max_day % MONTH_SLOTS:02d}",
+            max_category_expenditure=max_category_expenditure,
+            max_category=None if max_category is None else str(categories[max_category]),
+            avg_month_expenditure=_mean_group(month_sums[:MONTH_SLOTS], month_counts[:MONTH_SLOTS]),
+            total_expenditure=int(self.totals[0]),
+            max_month_income=max_month_income,
+            max_month=None if max_month is None else f"{max_month:02d}",
+            avg_month_income=_mean_group(month_sums[MONTH_SLOTS:], month_counts[MONTH_SLOTS:]),
+            total_income=int(self.totals[1]),
+        )
+
+
+def statistics_from_aggregates(store):
+    """
+    Compute all statistics of the statistics panel from precomputed rollups.
+
+    Only the groups of the rollups are walked, so the cost does not depend on the number of records in the ledger.
+
+    Args:
+        store (AggregateStore): The rollups of the ledger.
+
+    Returns:
+        PanelStatistics: The statistics of the ledger.
+    """
+    days = store.expenditure_by_day_of_year()
+    # Days are ordered like the 'dd.mm' labels, so ties resolve like a sorted groupby
+    max_day = max(sorted(days), key=days.get, default=None)
+
+    categories, category_sums = store.expenditure_by_category()
+    max_category = categories[category_sums.index(max(category_sums))] if categories else None
+
+    expenditure_months = store.by_month_of_year(EXPENDITURE)
+    income_months = store.by_month_of_year(INCOME)
+    max_month = max(sorted(income_months), key=lambda month: income_months[month][0], default=None)
+
+    return PanelStatistics(
+        max_day_expenditure=None if max_day is None else days[max_day],
+        max_day=None if max_day is None else f"{max_day[0]:02d}.{max_day[1]:02d}",
+        max_category_expenditure=max(category_sums) if categories else None,
+        max_category=max_category,
+        avg_month_expenditure=_mean_months(expenditure_months),
+        total_expenditure=store.totals[EXPENDITURE],
+        max_month_income=None if max_month is None else income_months[max_month][0],
+        max_month=None if max_month is None else f"{max_month:02d}",
+        avg_month_income=_mean_months(income_months),
+        total_income=store.totals[INCOME],
+    )
+
+
+def _mean_months(months):
+    """
+    Average the sums of the months folded from the rollups, rounded to an integer.
+    """
+    if not months:
+        return None
+    return round(np.mean([month[0] for month in months.values()]))
+
+
+def _max_group(sums, counts):
+    """
+    Find the group with the highest sum among the groups which contain at least one row.
+
+    Returns:
+        tuple: The highest sum and the key of its group, or (None, None) if all groups are empty.
+    """
+    present = np.flatnonzero(counts)
+    if len(present) == 0:
+        return None, None
+    key = present[sums[present].argmax()]
+    return int(sums[key]), int(key)
+
+
+def _mean_group(sums, counts):
+    """
+    Average the sums of the groups which contain at least one row, rounded to an integer.
+    """
+    present = counts > 0
+    if not present.any():
+        return None
+    return round(sums[present].mean())
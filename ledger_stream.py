@@ -0,0 +1,364 @@
+"""
+Streaming reader of ledger files.
+
+`json.load` holds the whole document and the Python lists of all columns at once, which takes several times the size
+of the file. The reader below parses the "items" columns of a ledger file in chunks of bounded size and converts every
+chunk right away into the typed columns used by `Ledger`, so only the compact typed columns are ever held. Consumers
+which only need aggregates fold the rows into running sums as soon as they are complete and drop them.
+"""
+import json
+import re
+from collections import deque
+
+import numpy as np
+
+from ledger import Ledger, parse_date_column, parse_flag_column, parse_price_column
+from ledger_statistics import StatisticsAccumulator
+
+# Number of characters read from the file at once, it bounds the number of values parsed in one chunk
+CHUNK_CHARS = 1 << 20
+
+# Columns of the "items" dictionary held by the typed ledger and their typed form, types are held as integer codes.
+# The "index" column is derived from the positions of the rows, the "categories" list of an encoded file is the
+# dictionary of the codes stored in its "type" column.
+COLUMNS = {"date": 'datetime64[D]', "type": np.int32, "price": np.int64, "income_expenditure": bool}
+
+_WHITESPACE = re.compile(r'\s*')
+_VALUE = r'(?:"(?:[^"\\]|\\.)*"|-?[0-9][0-9.eE+-]*|true|false|null)'
+# Run of complete values each followed by a comma, and the last value of an array followed by the closing bracket
+_VALUES = re.compile(r'(?:\s*' + _VALUE + r'\s*,)+')
+_LAST_VALUE = re.compile(r'\s*(' + _VALUE + r')?\s*\]')
+
+
+class _Buffer:
+    """
+    Window of the text of a file, refilled when the parser reaches its end.
+    """
+
+    def __init__(self, f, chunk_chars):
+        self.f = f
+        self.chunk_chars = chunk_chars
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Drop the parsed text and read the next chunk of the file.
+
+        Returns:
+            bool: False at the end of the file.
+        """
+        if self.eof:
+            return False
+        more = self.f.read(self.chunk_chars)
+        self.eof = not more
+        self.text = self.text[self.pos:] + more
+        self.pos = 0
+        return bool(more)
+
+    def skip_whitespace(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.fill():
+                return
+
+    def next_char(self):
+        """
+        Consume the next character which is not whitespace.
+
+        Returns:
+            str: The character, empty at the end of the file.
+        """
+        self.skip_whitespace()
+        if self.pos >= len(self.text):
+            return ""
+        self.pos += 1
+        return self.text[self.pos - 1]
+
+    def expect(self, chars):
+        char = self.next_char()
+        if char not in chars or not char:
+            raise ValueError(f"Unexpected {char!r} in the ledger file, expected one of {chars!r}")
+        return char
+
+    def value(self):
+        """
+        Decode the next JSON value, reading more of the file until the value is complete.
+
+        Returns:
+            object: The decoded value.
+        """
+        decoder = json.JSONDecoder()
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the window may continue in the next chunk
+            if end < len(self.text) or not self.fill():
+                self.pos = end
+                return value
+
+
+def iter_ledger_file(path, chunk_chars=CHUNK_CHARS):
+    """
+    Read a ledger file as a stream of header values and chunks of column values.
+
+    Args:
+        path (str): The path of the ledger file.
+        chunk_chars (int): The number of characters read at once.
+
+    Yields:
+        tuple: ("header", key, value) for every key outside of "items" and ("column", name, values) for every chunk
+        of the values of a column of "items", in the order of the file.
+    """
+    with open(path, 'r') as f:
+        buffer = _Buffer(f, chunk_chars)
+        buffer.expect("{")
+        if buffer.expect('"}') == "}":
+            return
+        buffer.pos -= 1
+        while True:
+            key = buffer.value()
+            buffer.expect(":")
+            if key != "items":
+                yield "header", key, buffer.value()
+            else:
+                yield from _iter_items(buffer)
+            if buffer.expect(",}") == "}":
+                return
+
+
+def _iter_items(buffer):
+    """
+    Yield the chunks of the column values of the "items" dictionary.
+    """
+    buffer.expect("{")
+    if buffer.expect('"}') == "}":
+        return
+    buffer.pos -= 1
+    while True:
+        name = buffer.value()
+        buffer.expect(":")
+        buffer.expect("[")
+        while True:
+            # The values up to the closing bracket or to the last comma in the window are decoded at once by the C
+            # decoder. A cut inside of a string always leaves the string open and fails to decode, such windows are
+            # split value by value instead.
+            text, pos = buffer.text, buffer.pos
+            end = text.find("]", pos)
+            cut = end if end >= 0 else text.rfind(",", pos)
+            values = None
+            if cut > pos or end == pos:
+                try:
+                    values = json.loads("[" + text[pos:cut] + "]")
+                except ValueError:
+                    pass
+            if values is not None:
+                buffer.pos = cut + 1
+                ended = end >= 0
+            else:
+                values, ended = _split_values(buffer)
+            if values is not None:
+                # The last chunk of a column is yielded even when it is empty, so empty columns are reported too
+                yield "column", name, values
+            if ended:
+                break
+            if not buffer.fill():
+                raise ValueError(f"The column {name!r} of the ledger file is not complete")
+        if buffer.expect(",}") == "}":
+            return
+
+
+def _split_values(buffer):
+    """
+    Decode the complete values at the start of the window one by one.
+
+    Returns:
+        tuple: The decoded values (None if the window holds no complete value) and whether the column ended.
+    """
+    values = None
+    run = _VALUES.match(buffer.text, buffer.pos)
+    if run is not None:
+        values = json.loads("[" + buffer.text[buffer.pos:run.end() - 1] + "]")
+        buffer.pos = run.end()
+    last = _LAST_VALUE.match(buffer.text, buffer.pos)
+    if last is None:
+        return values, False
+    values = values or []
+    if last.group(1) is not None:
+        values.append(json.loads(last.group(1)))
+    buffer.pos = last.end()
+    return values, True
+
+
+class TypedColumns:
+    """
+    Typed columns of a ledger filled chunk by chunk.
+
+    Every chunk of values is parsed into its typed form when it is appended. Types are kept as integer codes into the
+    list of distinct types, so every row of a type shares one string. The codes of a file with encoded types are
+    translated into that list through the "categories" of the file, which precede the "type" column. Rows whose values
+    arrived in all columns can be taken out as a ledger, which releases them from the columns.
+    """
+
+    def __init__(self):
+        self.chunks = {name: deque() for name in COLUMNS}
+        self.lengths = dict.fromkeys(COLUMNS, 0)
+        self.types = []
+        self._codes = {}
+        # Codes of the categories of the file in the list of types, None while the file has shown no categories
+        self._remap = None
+
+    def append(self, name, values):
+        """
+        Parse and append a chunk of the values of a column.
+
+        Args:
+            name (str): The name of the column in the ledger file, other columns than COLUMNS are skipped.
+            values (list): The values as stored in the ledger file.
+        """
+        if name == "date":
+            chunk = parse_date_column(values)
+        elif name == "categories":
+            self._remap = (self._remap or []) + [self._code(value) for value in values]
+            return
+        elif name == "type" and self._remap is not None:
+            chunk = np.array(self._remap, dtype=np.int32)[np.asarray(values, dtype=np.intp)]
+        elif name == "type":
+            chunk = np.fromiter((self._code(value) for value in values), dtype=np.int32, count=len(values))
+        elif name == "price":
+            chunk = parse_price_column(values)
+        elif name == "income_expenditure":
+            chunk = parse_flag_column(values)
+        else:
+            return
+        self.chunks[name].append(chunk)
+        self.lengths[name] += len(chunk)
+
+    def complete_rows(self):
+        """
+        Count the rows whose values arrived in all columns.
+
+        Returns:
+            int: The number of complete rows.
+        """
+        return min(self.lengths.values())
+
+    def take(self, rows):
+        """
+        Take the first rows out of the columns.
+
+        Args:
+            rows (int): The number of rows, at most complete_rows().
+
+        Returns:
+            Ledger: The typed rows.
+        """
+        columns = {name: _pop_rows(self.chunks[name], rows, dtype) for name, dtype in COLUMNS.items()}
+        for name in COLUMNS:
+            self.lengths[name] -= rows
+        return Ledger(date=columns["date"], codes=columns["type"], categories=np.array(self.types, dtype=object),
+                      price=columns["price"], is_income=columns["income_expenditure"])
+
+    def _code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.types)
+            self.types.append(value)
+        return code
+
+
+def _pop_rows(chunks, rows, dtype):
+    """
+    Remove the first rows from a column held as a deque of chunks and return them as one array.
+    """
+    taken = []
+    while rows > 0:
+        chunk = chunks[0]
+        if len(chunk) <= rows:
+            taken.append(chunks.popleft())
+            rows -= len(chunk)
+        else:
+            taken.append(chunk[:rows])
+            chunks[0] = chunk[rows:]
+            rows = 0
+    if not taken:
+        return np.empty(0, dtype=dtype)
+    return np.concatenate(taken) if len(taken) > 1 else taken[0]
+
+
+def read_header(path, chunk_chars=1 << 12):
+    """
+    Read the header of a ledger file, the file is read only up to its "items".
+
+    Args:
+        path (str): The path of the ledger file.
+        chunk_chars (int): The number of characters read at once.
+
+    Returns:
+        dict: The keys preceding "items" in the file (the author, file name and datetime of the ledger files).
+    """
+    header = {}
+    for kind, key, value in iter_ledger_file(path, chunk_chars):
+        if kind != "header":
+            break
+        header[key] = value
+    return header
+
+
+def read_ledger(path, chunk_chars=CHUNK_CHARS):
+    """
+    Read the typed ledger of a ledger file without loading the file.
+
+    Args:
+        path (str): The path of the ledger file.
+        chunk_chars (int): The number of characters read at once.
+
+    Returns:
+        tuple: The header of the file (every key except "items") and the typed ledger.
+    """
+    header = {}
+    columns = TypedColumns()
+    seen = set()
+    for kind, key, value in iter_ledger_file(path, chunk_chars):
+        if kind == "header":
+            header[key] = value
+        else:
+            seen.add(key)
+            columns.append(key, value)
+
+    for name in COLUMNS:
+        if name not in seen:
+            raise KeyError(name)
+    return header, columns.take(columns.complete_rows())
+
+
+def stream_statistics(path, chunk_chars=CHUNK_CHARS):
+    """
+    Compute the statistics of the statistics panel in one streaming pass over a ledger file.
+
+    Rows are folded into running sums as soon as their values arrived in all columns and are dropped right after.
+    The columns of a ledger file are stored one after another, so the typed values of the first columns are held until
+    the last column arrives, but the file itself and the Python lists of its values never are.
+
+    Args:
+        path (str): The path of the ledger file.
+        chunk_chars (int): The number of characters read at once.
+
+    Returns:
+        PanelStatistics: The statistics of the ledger.
+    """
+    columns = TypedColumns()
+    accumulator = StatisticsAccumulator()
+    for kind, key, value in iter_ledger_file(path, chunk_chars):
+        if kind == "column":
+            columns.append(key, value)
+            rows = columns.complete_rows()
+            if rows:
+                accumulator.add(columns.take(rows))
+    return accumulator.result()
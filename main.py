@@ -1,8 +1,60 @@
-import third_frame
+import os
+import time
+
+# Start of the application, the time to the first window is measured from here
+STARTED = time.perf_counter_ns()
+
 import customtkinter
 import home_frame
 import navigation_frame
-import second_frame
+from perf import recorder, traced
+from workers import WorkerPool
+
+# The adding and visualization frames, the ledger cache, pandas and Matplotlib are imported when they are first needed,
+# so the window appears before they are loaded
+
+
+@traced("load_for_adding")
+def load_for_adding(job, path):
+    """
+    Load the data and rollups of a ledger for the adding frame, it runs in a worker thread.
+
+    Args:
+        job (Job): The job running the function.
+        path (str): The path of the ledger file.
+
+    Returns:
+        tuple: The loaded data and a copy of the rollups of the ledger.
+    """
+    from ledger_cache import ledger_cache
+
+    data = ledger_cache.load(path)
+    job.report(0.5, "Aggregating")
+    # The adding frame updates its own copy of the rollups, the shared one changes only on save
+    return data, ledger_cache.load_aggregates(path).copy()
+
+
+@traced("load_for_visualization")
+def load_for_visualization(job, path):
+    """
+    Load the typed ledger and rollups of a ledger for the visualization frame, it runs in a worker thread.
+
+    The typed views of partitioned and SQLite ledgers are not loaded whole, a chart of a period reads only the shards
+    overlapping it or queries only its rows.
+
+    Args:
+        job (Job): The job running the function.
+        path (str): The path of the ledger file.
+
+    Returns:
+        tuple: The typed ledger, the rollups and the version of the ledger.
+    """
+    from ledger_cache import ledger_cache
+
+    ledger = ledger_cache.load_ledger(path)
+    job.report(0.5, "Aggregating")
+    aggregates = ledger_cache.load_aggregates(path)
+    return ledger, aggregates, ledger_cache.version(path)
 
 
 class App(customtkinter.CTk):
@@ -12,28 +64,36 @@ class App(customtkinter.CTk):
         # Set the window properties
         self.status = None
         self.data = None
+        self.ledger = None
+        self.aggregates = None
+        self.startup_seconds = None
         self.title("MoneySaver")
         self.geometry(f"{1200}x{680}")
 
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=1)
 
+        # Loading and aggregation run in worker threads, so the window does not freeze on big ledgers
+        self.workers = WorkerPool(self)
+
         # Create the frames
         self.home = home_frame.HomeFrame(self)
         self.home.grid(row=0, column=0)
 
-        self.second_frame = second_frame.SecondFrame(self)
-        self.second_frame.grid(row=0, column=0, sticky="nsew")
-
-        self.third_frame = third_frame.ThirdFrame(self)
-        self.third_frame.grid(row=0, column=0, sticky="nsew")
+        # The adding and visualization frames are created on first navigation
+        self.second_frame = None
+        self.third_frame = None
 
         self.navigation = navigation_frame.NavigationFrame(self, self.select_frame_by_name)
         self.navigation.grid(row=0, column=0, sticky="nsew")
+        self.workers.on_progress = self.navigation.show_progress
 
         # Set the default frame
         self.select_frame_by_name("home")
 
+        # Measure the time to the first window
+        self.bind("<Map>", self.on_first_map, add="+")
+
     def select_frame_by_name(self, name):
         """
         Control the displayed frame based on button clicks for home, adding, or visualization.
@@ -48,9 +108,9 @@ class App(customtkinter.CTk):
         self.navigation.set_button_color(name)
 
         # Hide all frames
-        self.home.grid_forget()
-        self.second_frame.grid_forget()
-        self.third_frame.grid_forget()
+        for frame in (self.home, self.second_frame, self.third_frame):
+            if frame is not None:
+                frame.grid_forget()
 
         # Display the selected frame
         if name == "home":
@@ -58,25 +118,105 @@ class App(customtkinter.CTk):
             self.home.grid(row=0, column=1, sticky="nsew")
         elif name == "frame_2":
             # Display the adding frame (second frame)
-            # Also, data is uploaded from the chosen file in the home frame
+            # Also, data is uploaded from the chosen file in the home frame by a worker thread
             # The uploaded data is saved in self.data
             # The status variable indicates if data has already been uploaded
             # The reload method is used to refresh the data in the treeview shown in the second frame
-            self.second_frame.grid(row=0, column=1, sticky="nsew")
-            self.data, self.status = self.home.select_file()
-            self.second_frame.data = self.data
-            self.second_frame.status = self.status
-            self.second_frame.reload()
+            self.create_second_frame().grid(row=0, column=1, sticky="nsew")
+            path = self.home.selected_path()
+            # Opening another frame supersedes the loading of this one
+            self.workers.submit("open", load_for_adding, path, text="Loading ledger",
+                                on_done=lambda result: self.show_adding(path, *result))
         elif name == "frame_3":
             # Display the visualization frame (third frame)
-            # Data is also uploaded from the chosen file in the home frame
-            # The uploaded data is saved in self.data
+            # The typed ledger of the chosen file in the home frame is taken from the ledger cache by a worker thread
+            # The ledger is saved in self.ledger
             # The create_chart method is used to generate a chart in the third frame,
-            # visualizing the data uploaded from the home frame
-            self.third_frame.grid(row=0, column=1, sticky="nsew")
-            self.data, _ = self.home.select_file()
-            self.third_frame.data = self.data
-            self.third_frame.create_chart("ALL")
+            # visualizing the ledger uploaded from the home frame
+            self.create_third_frame().grid(row=0, column=1, sticky="nsew")
+            path = self.home.selected_path()
+            self.workers.submit("open", load_for_visualization, path, text="Loading ledger",
+                                on_done=lambda result: self.show_visualization(*result))
+
+    def create_second_frame(self):
+        """
+        Create the adding frame on first navigation.
+
+        Returns:
+            SecondFrame: The adding frame.
+        """
+        if self.second_frame is None:
+            import second_frame
+
+            self.second_frame = second_frame.SecondFrame(self)
+        return self.second_frame
+
+    def create_third_frame(self):
+        """
+        Create the visualization frame on first navigation, it imports pandas and Matplotlib.
+
+        Returns:
+            ThirdFrame: The visualization frame.
+        """
+        if self.third_frame is None:
+            import third_frame
+
+            self.third_frame = third_frame.ThirdFrame(self)
+        return self.third_frame
+
+    def on_first_map(self, event):
+        """
+        Measure the time from the start of the application to the first window.
+
+        The time is recorded as the "startup" span. With the MONEYSAVER_STARTUP_EXIT environment variable set, it is
+        printed and the application quits, which is used by the startup benchmark.
+        """
+        if event.widget is not self or self.startup_seconds is not None:
+            return
+        finished = time.perf_counter_ns()
+        self.startup_seconds = (finished - STARTED) / 1e9
+        if recorder.enabled:
+            recorder.record("startup", STARTED, finished)
+        if os.environ.get("MONEYSAVER_STARTUP_EXIT"):
+            print(f"startup_seconds={self.startup_seconds:.4f}")
+            self.after_idle(self.destroy)
+
+    def show_adding(self, path, data, aggregates):
+        """
+        Show a loaded ledger in the adding frame, called on the main loop when the loading finished.
+
+        Args:
+            path (str): The path of the ledger file.
+            data (dict): The loaded ledger data.
+            aggregates (AggregateStore): The copy of the rollups updated by the adding frame.
+        """
+        self.data, self.status = data, True
+        self.second_frame.data = self.data
+        self.second_frame.status = self.status
+        self.second_frame.path = path
+        self.second_frame.aggregates = aggregates
+        self.second_frame.reload()
+
+    def show_visualization(self, ledger, aggregates, version):
+        """
+        Show a loaded ledger in the visualization frame, called on the main loop when the loading finished.
+
+        Args:
+            ledger (Ledger): The typed ledger.
+            aggregates (AggregateStore): The rollups of the ledger.
+            version (tuple): The version of the ledger, it keys the rendered charts of the ledger.
+        """
+        self.ledger = ledger
+        self.aggregates = aggregates
+        self.third_frame.ledger = self.ledger
+        self.third_frame.aggregates = self.aggregates
+        self.third_frame.version = version
+        self.third_frame.create_chart("ALL")
+
+    def destroy(self):
+        # Stop the worker threads together with the window
+        self.workers.shutdown()
+        super().destroy()
 
 
 if __name__ == "__main__":
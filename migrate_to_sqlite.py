@@ -0,0 +1,55 @@
+"""
+One-shot migration of JSON ledgers to SQLite databases.
+
+Every ledger file (*.json) in the directory is converted to a database with the same name and the .sqlite extension,
+journaled changes are applied before the conversion. The JSON files are kept; the home frame opens the database of a
+ledger when both exist. Run:
+
+    python migrate_to_sqlite.py [directory] [--force]
+"""
+import argparse
+import glob
+import os
+
+from sqlite_storage import SqliteStorage
+from storage import JsonStorage
+
+
+def migrate(path, force=False):
+    """
+    Convert one JSON ledger to a SQLite database.
+
+    Args:
+        path (str): The path of the JSON ledger.
+        force (bool): Replace an existing database.
+
+    Returns:
+        str or None: The path of the created database, None if it already existed.
+    """
+    target = os.path.splitext(path)[0] + ".sqlite"
+    if os.path.exists(target):
+        if not force:
+            return None
+        os.remove(target)
+
+    data = JsonStorage(path).load()
+    SqliteStorage.create(target, data)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSON ledgers to SQLite databases.")
+    parser.add_argument("directory", nargs="?", default="/path_to_files", help="directory with the ledger files")
+    parser.add_argument("--force", action="store_true", help="replace existing databases")
+    args = parser.parse_args()
+
+    for path in sorted(glob.glob(os.path.join(args.directory, "*.json"))):
+        target = migrate(path, args.force)
+        if target is None:
+            print(f"skipped {path}, the database already exists")
+        else:
+            print(f"migrated {path} -> {target}")
+
+
+if __name__ == "__main__":
+    main()
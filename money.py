@@ -0,0 +1,131 @@
+import math
+import re
+
+# Money is held as integer numbers of minor units (haléře), one crown has 100 of them
+MINOR_UNITS = 100
+
+CURRENCY = "Kč"
+
+# Prices accepted by pandas.to_numeric, which parses the price column of the typed ledger: ASCII digits with an optional
+# sign, decimal point and exponent between ASCII whitespace, pandas also skips whitespace after the "e" of the exponent.
+# float() alone would also take underscores, digits of other scripts and Unicode spaces.
+_SPACE = r'[ \t\n\r\f\v]*'
+PRICE_PATTERN = re.compile(_SPACE + r'[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE]' + _SPACE + r'[+-]?[0-9]+)?' + _SPACE)
+
+# Prices whose minor units do not fit a 64-bit integer column are not parsable either
+MAX_MINOR = 2 ** 63
+
+
+def parse_minor(value):
+    """
+    Parse a price as stored in the ledger file into minor units.
+
+    The price is parsed the same way as the price column of the typed ledger (see PRICE_PATTERN), so the rollups
+    updated record by record always agree with the rollups built from the whole ledger. This is the only place a price
+    is a float, all sums over the parsed prices are exact integer sums.
+
+    Args:
+        value (str): The price in crowns as stored in the ledger file.
+
+    Returns:
+        int: The price in minor units, 0 if the price can not be parsed.
+    """
+    if isinstance(value, str):
+        if PRICE_PATTERN.fullmatch(value) is None:
+            return 0
+        # Whitespace is left only around the number and after the "e" of its exponent
+        value = "".join(value.split())
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return 0
+    minor = price * MINOR_UNITS
+    return round(minor) if math.isfinite(minor) and abs(minor) < MAX_MINOR else 0
+
+
+def to_crowns(minor):
+    """
+    Convert minor units to crowns for plotting.
+
+    Args:
+        minor (int or np.ndarray): The amount in minor units.
+
+    Returns:
+        float or np.ndarray: The amount in crowns.
+    """
+    return minor / MINOR_UNITS
+
+
+def format_money(minor, symbol=CURRENCY):
+    """
+    Format an amount of money with spaces as thousands separators and the currency symbol.
+
+    Whole crowns are shown without decimals, other amounts with the haléře after a decimal comma.
+
+    Args:
+        minor (int): The amount in minor units.
+        symbol (str): The symbol of the currency of the amount (optional).
+
+    Returns:
+        str: The formatted amount, e.g. '1 234 Kč' or '-12,50 Kč'.
+    """
+    crowns, haler = divmod(abs(int(minor)), MINOR_UNITS)
+    text = f"{crowns:,}".replace(",", " ")
+    if haler:
+        text += f",{haler:02d}"
+    return f"{'-' if minor < 0 else ''}{text} {symbol}"
+
+
+def format_money_column(minor, symbol=CURRENCY):
+    """
+    Format many amounts of money at once, like format_money.
+
+    The characters of all amounts are computed with integer array arithmetic into a matrix of code points, one row per
+    amount, which is then viewed as an array of strings. No Python code runs per amount.
+
+    Args:
+        minor (np.ndarray): The int64 amounts in minor units.
+        symbol (str): The symbol of the currency of the amounts (optional).
+
+    Returns:
+        np.ndarray: The formatted amounts.
+    """
+    # numpy is imported on first use, the scalar helpers are used by the home frame before numpy is loaded
+    import numpy as np
+
+    minor = np.asarray(minor, dtype=np.int64).ravel()
+    if minor.size == 0:
+        return np.array([], dtype=str)
+    crowns, haler = np.divmod(np.abs(minor), MINOR_UNITS)
+    negative = minor < 0
+
+    # Number of digits of every amount and the width of the crowns written with separators
+    max_digits = len(str(int(crowns.max())))
+    digits = np.ones(len(minor), dtype=np.int64)
+    for power in range(1, max_digits):
+        digits += crowns >= 10 ** power
+    field = max_digits + (max_digits - 1) // 3
+
+    # Row layout: sign, crowns aligned to the right, ",hh" and " Kč"
+    suffix = " " + symbol
+    width = 1 + field + 3 + len(suffix)
+    body = np.zeros((len(minor), width), dtype=np.uint32)
+    for position in range(max_digits):
+        column = field - position - position // 3
+        body[:, column] = ord("0") + crowns // 10 ** position % 10
+        if position and position % 3 == 0:
+            body[:, column + 1] = ord(" ")
+    body[:, field + 1] = ord(",")
+    body[:, field + 2] = ord("0") + haler // 10
+    body[:, field + 3] = ord("0") + haler % 10
+    body[:, field + 4:] = [ord(char) for char in suffix]
+
+    # The text of an amount starts at its sign or its highest digit, rows of whole crowns skip the ",hh" columns
+    start = field + 1 - digits - (digits - 1) // 3 - negative
+    rows = np.arange(len(minor))
+    body[rows[negative], start[negative]] = ord("-")
+    source = start[:, None] + np.arange(width)
+    source += np.where((haler == 0)[:, None] & (source > field), 3, 0)
+    text = np.take_along_axis(body, np.minimum(source, width - 1), axis=1)
+    text[source >= width] = 0
+    return text.view(f"<U{width}").ravel()
@@ -1,4 +1,12 @@
 import customtkinter
+from tkinter import filedialog, messagebox
+from perf import recorder
+
+# Interval in milliseconds in which the performance overlay is refreshed
+OVERLAY_INTERVAL = 500
+
+# Number of spans shown in the performance overlay
+OVERLAY_SPANS = 8
 
 
 def change_appearance_mode_event(new_appearance_mode: str):
@@ -48,10 +56,25 @@ class NavigationFrame(customtkinter.CTkFrame):
                                                       anchor="w", command=self.frame_3_button_event)
         self.frame_3_button.grid(row=2, column=0, sticky="ew")
 
+        # Progress of the jobs running in the background, shown only while a job is running
+        self.progress_label = customtkinter.CTkLabel(self, text="", font=("Helvetica", 10))
+        self.progress_bar = customtkinter.CTkProgressBar(self, width=140)
+
         self.appearance_mode_menu = customtkinter.CTkOptionMenu(self, values=["Dark", "Light"],
                                                                 command=change_appearance_mode_event)
         self.appearance_mode_menu.grid(row=4, column=0, padx=20, pady=20, sticky="s")
 
+        # Timing spans of the hot paths, recorded only while the switch is on
+        self.performance_switch = customtkinter.CTkSwitch(self, text="Performance", command=self.toggle_performance)
+        self.performance_switch.grid(row=5, column=0, padx=20, pady=(0, 10), sticky="w")
+        self.overlay_label = customtkinter.CTkLabel(self, text="", font=("Courier", 9), justify="left", anchor="w")
+        self.export_button = customtkinter.CTkButton(self, width=140, text="Export trace", command=self.export_trace)
+        # Id of the pending refresh of the overlay, None when it is not scheduled
+        self.overlay_job = None
+        if recorder.enabled:
+            self.performance_switch.select()
+            self.toggle_performance()
+
     def home_button_event(self):
         """
         Event handler for the Home button click.
@@ -80,3 +103,63 @@ class NavigationFrame(customtkinter.CTkFrame):
         self.home_button.configure(fg_color=("gray75", "gray25") if name == "home" else "transparent")
         self.frame_2_button.configure(fg_color=("gray75", "gray25") if name == "frame_2" else "transparent")
         self.frame_3_button.configure(fg_color=("gray75", "gray25") if name == "frame_3" else "transparent")
+
+    def show_progress(self, fraction, text):
+        """
+        Show the progress of the background jobs.
+
+        Args:
+            fraction (float): The finished part of the running job between 0 and 1, None hides the progress.
+            text (str): The description of the running job.
+        """
+        if fraction is None:
+            self.progress_label.grid_forget()
+            self.progress_bar.grid_forget()
+            return
+        self.progress_label.configure(text=text)
+        self.progress_label.grid(row=3, column=0, padx=20, pady=(0, 40), sticky="s")
+        self.progress_bar.set(fraction)
+        self.progress_bar.grid(row=3, column=0, padx=20, pady=(0, 20), sticky="s")
+
+    def toggle_performance(self):
+        """
+        Turn the recording of timing spans and the performance overlay on or off.
+        """
+        recorder.enabled = self.performance_switch.get() == 1
+        # A pending refresh is dropped, so turning the recording off and on again does not start a second loop
+        if self.overlay_job is not None:
+            self.after_cancel(self.overlay_job)
+            self.overlay_job = None
+        if recorder.enabled:
+            self.overlay_label.grid(row=6, column=0, padx=10, pady=(0, 5), sticky="w")
+            self.export_button.grid(row=7, column=0, padx=20, pady=(0, 20))
+            self.update_overlay()
+        else:
+            self.overlay_label.grid_forget()
+            self.export_button.grid_forget()
+
+    def update_overlay(self):
+        """
+        Show the last and longest durations of the slowest recorded spans, refreshed while recording.
+        """
+        self.overlay_job = None
+        if not recorder.enabled:
+            return
+        summary = sorted(recorder.summary().items(), key=lambda item: item[1]["last_ms"], reverse=True)
+        lines = [f"{name[:28]:<28} {span['last_ms']:8.1f} ms (max {span['max_ms']:.1f}, {span['count']}x)"
+                 for name, span in summary[:OVERLAY_SPANS]]
+        self.overlay_label.configure(text="\n".join(lines) or "No spans recorded yet")
+        self.overlay_job = self.after(OVERLAY_INTERVAL, self.update_overlay)
+
+    def export_trace(self):
+        """
+        Export the recorded spans to a Chrome trace JSON file chosen by the user.
+        """
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Chrome trace", "*.json")])
+        if not path:
+            return
+        try:
+            recorder.export_chrome_trace(path)
+            messagebox.showinfo("Info", f"The trace was exported to {path}")
+        except OSError as e:
+            messagebox.showerror("Error", f"An error occurred while exporting the trace: {e}")
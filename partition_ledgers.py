@@ -0,0 +1,57 @@
+"""
+One-shot conversion of JSON ledgers to ledgers partitioned by month.
+
+Every ledger file (*.json) in the directory is converted to a manifest with the same name and the .ledger extension
+and one shard per month, journaled changes are applied before the conversion. The JSON files are kept; the home frame
+opens the manifest of a ledger when both exist. Run:
+
+    python partition_ledgers.py [directory] [--force]
+"""
+import argparse
+import glob
+import os
+import shutil
+
+from partitioned_storage import PartitionedStorage, shards_path
+from storage import JsonStorage
+
+
+def partition(path, force=False):
+    """
+    Convert one JSON ledger to a partitioned ledger.
+
+    Args:
+        path (str): The path of the JSON ledger.
+        force (bool): Replace an existing partitioned ledger.
+
+    Returns:
+        str or None: The path of the created manifest, None if it already existed.
+    """
+    target = os.path.splitext(path)[0] + ".ledger"
+    if os.path.exists(target):
+        if not force:
+            return None
+        os.remove(target)
+        shutil.rmtree(shards_path(target), ignore_errors=True)
+
+    data = JsonStorage(path).load()
+    PartitionedStorage.create(target, data)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSON ledgers to ledgers partitioned by month.")
+    parser.add_argument("directory", nargs="?", default="/path_to_files", help="directory with the ledger files")
+    parser.add_argument("--force", action="store_true", help="replace existing partitioned ledgers")
+    args = parser.parse_args()
+
+    for path in sorted(glob.glob(os.path.join(args.directory, "*.json"))):
+        target = partition(path, args.force)
+        if target is None:
+            print(f"skipped {path}, the partitioned ledger already exists")
+        else:
+            print(f"partitioned {path} -> {target}")
+
+
+if __name__ == "__main__":
+    main()
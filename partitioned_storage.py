@@ -0,0 +1,355 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from aggregates import AggregateStore, month_key, parse_date
+from ledger import Ledger, date_range_bounds, decode_categories, encode_categories
+
+# Storage mode of ledgers split into one shard per month
+PARTITIONED_MODE = "partitioned"
+
+# Partition of the records whose date can not be parsed
+UNDATED = "undated"
+
+COLUMNS = ("date", "type", "price", "income_expenditure")
+
+
+def partition_key(date):
+    """
+    Get the partition of a record.
+
+    Args:
+        date (str): The date of the record in the format dd.mm.yyyy.
+
+    Returns:
+        str: The year and month of the record as YYYY-MM, or "undated" if the date can not be parsed.
+    """
+    parsed = parse_date(date)
+    return month_key(parsed) if parsed is not None else UNDATED
+
+
+def partition_bounds(key):
+    """
+    Get the first and last day of a partition.
+
+    Args:
+        key (str): The partition as YYYY-MM.
+
+    Returns:
+        tuple: The first and last day of the month as np.datetime64.
+    """
+    month = np.datetime64(key, 'M')
+    return month.astype('datetime64[D]'), (month + 1).astype('datetime64[D]') - 1
+
+
+def shards_path(path):
+    """
+    Build the path of the directory holding the shards of a partitioned ledger.
+
+    The directory is hidden and placed next to the manifest, so it is not listed between the ledgers in the home frame.
+
+    Args:
+        path (str): The path of the manifest.
+
+    Returns:
+        str: The path of the directory of the shards.
+    """
+    directory, file_name = os.path.split(path)
+    return os.path.join(directory, "." + os.path.splitext(file_name)[0] + ".partitions")
+
+
+def _write_json(path, data, indent=None):
+    temporary = path + ".tmp"
+    with open(temporary, 'w') as f:
+        json.dump(data, f, indent=indent)
+    os.replace(temporary, path)
+
+
+class PartitionedStorage:
+    """
+    Storage of a ledger split into one shard per year-month.
+
+    The manifest (the .ledger file) holds the header of the ledger and the list of its partitions with their numbers
+    of rows, every partition is a small JSON shard in a hidden directory next to the manifest. Viewing a period loads
+    only the shards overlapping it and a save rewrites only the shards whose records changed, followed by the
+    manifest. The records of a loaded ledger are ordered by partition, records without a valid date come last.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.shards_path = shards_path(path)
+        self._lock = threading.Lock()
+        self._manifest = None
+
+    @classmethod
+    def create(cls, path, data):
+        """
+        Create a partitioned ledger holding the content of a ledger file.
+
+        Args:
+            path (str): The path of the new manifest.
+            data (dict): The content of the ledger file.
+
+        Returns:
+            PartitionedStorage: The storage of the new ledger.
+        """
+        storage = cls(path)
+        items = data["items"]
+        partitions = {}
+        for record in zip(*(items[name] for name in COLUMNS)):
+            columns = partitions.setdefault(partition_key(record[0]), {name: [] for name in COLUMNS})
+            for name, value in zip(COLUMNS, record):
+                columns[name].append(value)
+
+        manifest = {
+            "author": data.get("author", data.get("name_of_author", "")),
+            "file_name": data["file_name"],
+            "datetime": data["datetime"],
+            "storage": PARTITIONED_MODE,
+            "partitions": {},
+        }
+        with storage._lock:
+            os.makedirs(storage.shards_path, exist_ok=True)
+            for key, columns in partitions.items():
+                storage._write_shard(manifest, key, columns)
+            _write_json(path, manifest, indent=4)
+        return storage
+
+    def signature(self):
+        """
+        Build the signature used to detect changes of the ledger, every save rewrites the manifest.
+
+        Returns:
+            tuple: Modification time and size of the manifest.
+        """
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def manifest(self):
+        """
+        Read the manifest of the ledger, it is read again only when it changed on disk.
+
+        Returns:
+            dict: The manifest.
+        """
+        signature = self.signature()
+        if self._manifest is None or self._manifest[0] != signature:
+            with open(self.path, 'r') as f:
+                self._manifest = (signature, json.load(f))
+        return self._manifest[1]
+
+    def partitions(self, start=None, end=None):
+        """
+        List the partitions overlapping a date range, in the order of the records.
+
+        Args:
+            start (np.datetime64): The first day of the range, None for no lower bound.
+            end (np.datetime64): The last day of the range (inclusive), None for no upper bound.
+
+        Returns:
+            list: The keys of the partitions, the undated partition is listed only if the range is unbounded.
+        """
+        keys = sorted(self.manifest()["partitions"])
+        if start is None and end is None:
+            return keys
+        selected = []
+        for key in keys:
+            if key == UNDATED:
+                continue
+            first, last = partition_bounds(key)
+            if (start is None or last >= start) and (end is None or first <= end):
+                selected.append(key)
+        return selected
+
+    def read_shard(self, key):
+        """
+        Read the columns of one partition.
+
+        Args:
+            key (str): The partition.
+
+        Returns:
+            dict: The column lists of the records of the partition as stored in the shard, with the types dictionary
+            encoded (see encode_categories).
+        """
+        with open(os.path.join(self.shards_path, key + ".json"), 'r') as f:
+            return json.load(f)["items"]
+
+    def load(self, start=None, end=None):
+        """
+        Load the ledger in the format of the ledger files.
+
+        Args:
+            start (np.datetime64): Load only partitions ending on or after this day (optional).
+            end (np.datetime64): Load only partitions starting on or before this day (optional).
+
+        Returns:
+            dict: The content of the loaded partitions.
+        """
+        manifest = self.manifest()
+        items = {name: [] for name in COLUMNS}
+        for key in self.partitions(start, end):
+            shard = decode_categories(self.read_shard(key))
+            for name in COLUMNS:
+                items[name].extend(shard[name])
+        items["index"] = list(range(len(items["date"])))
+
+        return {
+            "author": manifest["author"],
+            "file_name": manifest["file_name"],
+            "datetime": manifest["datetime"],
+            "storage": PARTITIONED_MODE,
+            "items": items,
+        }
+
+    def header(self):
+        """
+        Read the header of the ledger from the manifest.
+
+        Returns:
+            dict: The author, file name and datetime of the ledger.
+        """
+        manifest = self.manifest()
+        return {key: manifest[key] for key in ("author", "file_name", "datetime")}
+
+    def save(self, model, on_compacted=None):
+        """
+        Rewrite the partitions touched by the changes of a transaction model and then the manifest.
+
+        The records of a touched partition are found by binary searches in the date index of the model, which the model
+        keeps up to date while it is edited, so a save neither parses the dates again nor builds the content of the
+        whole ledger.
+
+        Args:
+            model (TransactionModel): The model of the ledger.
+            on_compacted (callable): Unused, partitioned ledgers are not compacted.
+
+        Returns:
+            None: Only the changes of the model are written, see LedgerCache.save.
+        """
+        touched = {partition_key(date) for date in model.touched_dates}
+        dates, order = model.date_index()
+
+        manifest = dict(self.manifest(), author=model.author, file_name=model.file_name, datetime=model.datetime)
+        manifest["partitions"] = dict(manifest["partitions"])
+        with self._lock:
+            os.makedirs(self.shards_path, exist_ok=True)
+            for key in touched:
+                if key == UNDATED:
+                    # Records without a valid date are sorted after all dated records
+                    lo, hi = date_range_bounds(dates)[1], len(dates)
+                else:
+                    lo, hi = date_range_bounds(dates, *partition_bounds(key))
+                indices = np.sort(order[lo:hi])
+                columns = {name: [model.columns[name][index] for index in indices] for name in COLUMNS}
+                self._write_shard(manifest, key, columns)
+            _write_json(self.path, manifest, indent=4)
+
+        model.mark_saved()
+        return None
+
+    def typed_ledger(self, load_data, loaded=None):
+        """
+        Return the typed view of the ledger used by charts and statistics.
+
+        Args:
+            load_data (callable): Unused, the view reads the shards it needs by itself.
+            loaded (dict): Unused.
+
+        Returns:
+            PartitionedLedger: A view of the ledger which parses only the partitions it needs.
+        """
+        return PartitionedLedger(self)
+
+    def build_aggregates(self, ledger):
+        """
+        Build the rollups of the ledger.
+
+        Args:
+            ledger (PartitionedLedger): The typed view of the ledger.
+
+        Returns:
+            AggregateStore: The rollups of the ledger.
+        """
+        return AggregateStore.from_ledger(ledger.materialize())
+
+    def _write_shard(self, manifest, key, columns):
+        """
+        Write one partition and register it in the manifest, an empty partition is removed.
+        """
+        path = os.path.join(self.shards_path, key + ".json")
+        rows = len(columns["date"])
+        if rows:
+            _write_json(path, {"items": encode_categories(columns)})
+            manifest["partitions"][key] = {"rows": rows}
+        else:
+            manifest["partitions"].pop(key, None)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class PartitionedLedger:
+    """
+    Typed view of a partitioned ledger.
+
+    Every partition is parsed to a typed Ledger on first use and kept, so a date range query parses only the
+    partitions overlapping it. Other attributes are taken from the typed ledger of all partitions, which is built
+    the first time one of them is needed.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._shards = {}
+        self._ledger = None
+        self._lock = threading.Lock()
+
+    def shard(self, key):
+        """
+        Get the typed ledger of one partition.
+
+        Args:
+            key (str): The partition.
+
+        Returns:
+            Ledger: The typed ledger of the partition.
+        """
+        with self._lock:
+            if key not in self._shards:
+                self._shards[key] = Ledger.from_items(self.storage.read_shard(key))
+            return self._shards[key]
+
+    def between(self, start=None, end=None):
+        """
+        Select the rows dated within a date range, parsing only the partitions overlapping it.
+
+        Args:
+            start (np.datetime64): The first day of the range, None for no lower bound.
+            end (np.datetime64): The last day of the range (inclusive), None for no upper bound.
+
+        Returns:
+            Ledger: The rows of the range sorted by date.
+        """
+        keys = self.storage.partitions(start, end)
+        return Ledger.concat([self.shard(key) for key in keys]).between(start, end)
+
+    def materialize(self):
+        """
+        Parse all partitions.
+
+        Returns:
+            Ledger: The typed ledger of all records.
+        """
+        if self._ledger is None:
+            self._ledger = Ledger.concat([self.shard(key) for key in self.storage.partitions()])
+        return self._ledger
+
+    def __len__(self):
+        return len(self.materialize())
+
+    def __getattr__(self, name):
+        # Columns and filters are taken from the ledger of all partitions
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
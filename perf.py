@@ -0,0 +1,123 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Maximum number of spans kept for the trace export, the oldest spans are dropped first
+MAX_SPANS = 100_000
+
+
+class Recorder:
+    """
+    In-process recorder of timing spans around the hot paths of the application.
+
+    The recorder is off by default; a disabled recorder costs one attribute check per instrumented call. When it is
+    enabled, every span is kept in a bounded buffer together with the thread it ran in, and running totals per span
+    name feed the performance overlay of the navigation frame. The buffer is exported in the Chrome trace event format,
+    which can be opened in chrome://tracing or Perfetto.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.spans = deque(maxlen=MAX_SPANS)
+        self.totals = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    @contextmanager
+    def span(self, name):
+        """
+        Time the enclosed block as a span.
+
+        Args:
+            name (str): The name of the span.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter_ns())
+
+    def record(self, name, start, end):
+        """
+        Record a finished span.
+
+        Args:
+            name (str): The name of the span.
+            start (int): The start of the span in nanoseconds of time.perf_counter_ns.
+            end (int): The end of the span in nanoseconds of time.perf_counter_ns.
+        """
+        duration = end - start
+        with self._lock:
+            self.spans.append((name, start, duration, threading.get_ident()))
+            count, total, _, longest = self.totals.get(name, (0, 0, 0, 0))
+            self.totals[name] = (count + 1, total + duration, duration, max(longest, duration))
+
+    def summary(self):
+        """
+        Summarize the recorded spans by name.
+
+        Returns:
+            dict: The number of spans, total, last and longest duration in milliseconds by span name.
+        """
+        with self._lock:
+            totals = dict(self.totals)
+        return {name: {"count": count, "total_ms": total / 1e6, "last_ms": last / 1e6, "max_ms": longest / 1e6}
+                for name, (count, total, last, longest) in totals.items()}
+
+    def clear(self):
+        """
+        Drop all recorded spans.
+        """
+        with self._lock:
+            self.spans.clear()
+            self.totals.clear()
+
+    def export_chrome_trace(self, path):
+        """
+        Write the recorded spans as a Chrome trace JSON file.
+
+        Args:
+            path (str): The path of the trace file.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "ts": (start - self._origin) / 1000, "dur": duration / 1000,
+                   "pid": pid, "tid": thread} for name, start, duration, thread in spans]
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+# Recorder shared by the whole application, it is enabled by the MONEYSAVER_PERF environment variable or the overlay
+recorder = Recorder(enabled=os.environ.get("MONEYSAVER_PERF", "") not in ("", "0"))
+
+
+def traced(name):
+    """
+    Decorate a function, so every call is recorded as a span when the recorder is enabled.
+
+    Args:
+        name (str): The name of the span.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not recorder.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                recorder.record(name, start, time.perf_counter_ns())
+        return wrapper
+    return decorator
@@ -0,0 +1,97 @@
+import threading
+from collections import OrderedDict
+
+from perf import traced
+
+# Types of expenditure offered by the type menu of the visualization frame
+EXPENDITURE_TYPES = ["ALL", "Food", "Clothes", "Party", "Fuel", "Rent", "Sport"]
+
+# Date range of the visualization frame when no filter is set
+UNFILTERED = (None, None)
+
+
+class ViewCache:
+    """
+    Prepared data of the views of the visualization frame.
+
+    A view is keyed by the version of the ledger, the currency with the version of the rates it was converted at, the
+    date range and the type of expenditure, and holds the data of the time plot, the statistics and the rollups of the
+    shown rows (the histogram and money balance are derived from the rollups). The views are filled by the
+    visualization frame and speculatively by the prefetch started when a ledger is chosen in the home frame. The cache
+    is bounded by the number of views; the least recently used view is evicted first.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # The prefetch fills the cache from its own thread
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return a prepared view.
+
+        Args:
+            key (tuple): The version of the ledger, the currency and its rates, the date range and the type of
+                expenditure.
+
+        Returns:
+            tuple or None: The data of the time plot, the statistics and the rollups, None if not prepared.
+        """
+        with self._lock:
+            view = self._entries.get(key)
+            if view is not None:
+                self._entries.move_to_end(key)
+            return view
+
+    def put(self, key, view):
+        """
+        Keep a prepared view.
+
+        Args:
+            key (tuple): The version of the ledger, the currency and its rates, the date range and the type of
+                expenditure.
+            view (tuple): The data of the time plot, the statistics and the rollups.
+        """
+        with self._lock:
+            self._entries[key] = view
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+@traced("prefetch_views")
+def prefetch_views(job, path):
+    """
+    Prepare the views of the visualization frame of a ledger ahead of time, it runs as a low priority job.
+
+    The typed ledger and the rollups are loaded into the ledger cache and the unfiltered time plot of every type of
+    the type menu is prepared in crowns together with the statistics, so opening the visualization frame and switching
+    its tabs and types does not wait for them.
+
+    Args:
+        job (Job): The job running the function.
+        path (str): The path of the ledger file.
+    """
+    # The ledger cache and the charts pull in numpy, pandas and Matplotlib, the prefetch runs after the start
+    from charts import Chart
+    from currency import BASE_CURRENCY, money_key
+    from ledger_cache import ledger_cache
+    from ledger_statistics import statistics_from_aggregates
+
+    ledger = ledger_cache.load_ledger(path)
+    job.check()
+    aggregates = ledger_cache.load_aggregates(path)
+    version = ledger_cache.version(path)
+    if version is None:
+        return  # Evicted meanwhile by other ledgers
+    stats = statistics_from_aggregates(aggregates)
+    for expenditure in EXPENDITURE_TYPES:
+        job.check()
+        key = (version, money_key(BASE_CURRENCY), UNFILTERED, expenditure)
+        if view_cache.get(key) is None:
+            view_cache.put(key, (Chart.prepare(ledger, expenditure), stats, aggregates))
+
+
+# Views shared by the home frame and the visualization frame
+view_cache = ViewCache()
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+
+from perf import recorder
+
+# Bytes of rendered bitmaps kept by a render cache, a chart filling the window takes a few megabytes
+MAX_RENDER_BYTES = 64 * 1024 * 1024
+
+
+class RenderCache:
+    """
+    LRU cache of the rendered bitmaps of charts.
+
+    A chart shows a view identified by its render key (the version of the ledger, the date range, the tab, the type of
+    expenditure and the appearance mode). When the canvas of a chart is drawn, the key is completed by the size of the
+    canvas in pixels and the bitmap rendered by Matplotlib is kept under it. Drawing the same view again copies the
+    kept bitmap back into the canvas and blits it instead of rendering the figure. The cache is bounded by the summed
+    size of its bitmaps; when the bound is exceeded, the least recently used bitmaps are evicted.
+    """
+
+    def __init__(self, max_bytes=MAX_RENDER_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+
+    def get(self, key):
+        """
+        Return the bitmap rendered for a key.
+
+        Args:
+            key (tuple): The render key completed by the size of the canvas.
+
+        Returns:
+            BufferRegion or None: The bitmap of the whole figure, None if it is not cached.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, region, size):
+        """
+        Keep the bitmap rendered for a key.
+
+        Args:
+            key (tuple): The render key completed by the size of the canvas.
+            region (BufferRegion): The bitmap of the whole figure.
+            size (int): The number of bytes of the bitmap.
+        """
+        if key in self._entries:
+            self._total_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (region, size)
+        self._total_bytes += size
+
+        # Evict the least recently used bitmaps, the newest one is always kept
+        while len(self._entries) > 1 and self._total_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_size
+
+    def clear(self):
+        """
+        Drop all bitmaps.
+        """
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def attach(self, canvas, chart, name):
+        """
+        Route the draws of the canvas of a chart through the cache.
+
+        Draws of a chart without a render key (e.g. an empty chart) are not cached.
+
+        Args:
+            canvas (FigureCanvasAgg): The canvas of the chart.
+            chart (object): The chart, its render_key attribute identifies the view shown by the canvas.
+            name (str): The name of the chart used for the timing spans.
+        """
+        draw = canvas.draw
+
+        def cached_draw():
+            if chart.render_key is None:
+                return draw()
+            width, height = canvas.get_width_height(physical=True)
+            key = chart.render_key + (width, height)
+            region = self.get(key)
+            if region is not None:
+                with recorder.span(f"{name}.blit"):
+                    canvas.restore_region(region)
+                    canvas.blit()
+                return
+            draw()
+            self.put(key, canvas.copy_from_bbox(canvas.figure.bbox), width * height * 4)
+
+        canvas.draw = cached_draw
@@ -0,0 +1,147 @@
+"""
+Headless batch report of ledgers.
+
+For every ledger the statistics of the visualization frame are computed and the TimePlot, histogram and money balance
+charts are rendered to image files with the Agg backend, so no display and no Tk are needed. Nothing is written next
+to the ledgers, rollups which are not persisted yet are built in memory. Ledgers are processed in parallel worker
+processes and a JSON summary of all of them is written to the output directory, its statistics hold amounts in minor
+units (haléře) next to the formatted labels. Run:
+
+    python report.py [ledger or directory ...] [--output reports] [--format png|svg] [--workers 4]
+
+Without ledgers, all ledgers in /path_to_files are reported.
+"""
+import argparse
+import dataclasses
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Charts created without a tab view draw on off-screen Agg canvases, Tk is never imported
+from catalog import LEDGER_EXTENSIONS
+from charts import Chart, HistogramBuilder, MoneyBalancePlotter
+from formatting import format_statistics
+from ledger_cache import ledger_cache
+from ledger_statistics import statistics_from_aggregates
+
+
+def find_ledgers(paths):
+    """
+    Collect the ledger files to be reported.
+
+    Directories are searched for ledgers the same way the home frame lists them: hidden files are skipped and a ledger
+    stored in several formats is reported once, from its SQLite database or partitioned manifest if there is one.
+
+    Args:
+        paths (list): Paths of ledger files or of directories with ledger files.
+
+    Returns:
+        list: The paths of the ledger files.
+    """
+    ledgers = []
+    for path in paths:
+        if not os.path.isdir(path):
+            ledgers.append(path)
+            continue
+        names = {}
+        for filename in sorted(os.listdir(path)):
+            base, extension = os.path.splitext(filename)
+            if filename.startswith('.') or extension not in LEDGER_EXTENSIONS:
+                continue
+            if base not in names or LEDGER_EXTENSIONS.index(extension) < LEDGER_EXTENSIONS.index(names[base]):
+                names[base] = extension
+        ledgers.extend(os.path.join(path, base + extension) for base, extension in sorted(names.items()))
+    return ledgers
+
+
+def render_charts(ledger, aggregates, output, name, image_format, expenditure="ALL", dpi=300):
+    """
+    Render the charts of the visualization frame to image files.
+
+    Args:
+        ledger (Ledger): The typed ledger.
+        aggregates (AggregateStore): The rollups of the ledger.
+        output (str): The directory of the images.
+        name (str): The name of the ledger, used as the prefix of the image files.
+        image_format (str): "png" or "svg".
+        expenditure (str): The type of expenditure of the TimePlot chart, "ALL" for all of them.
+        dpi (int): The resolution of raster images.
+
+    Returns:
+        dict: The paths of the images by chart.
+    """
+    charts = {
+        "time_plot": Chart(None, ledger, expenditure),
+        "histogram": HistogramBuilder(None, aggregates),
+        "money_balance": MoneyBalancePlotter(None, aggregates),
+    }
+    images = {}
+    for chart_name, chart in charts.items():
+        path = os.path.join(output, f"{name}_{chart_name}.{image_format}")
+        chart.fig.savefig(path, dpi=dpi, facecolor=chart.fig.get_facecolor())
+        chart.release()
+        images[chart_name] = path
+    return images
+
+
+def report_ledger(path, output, image_format, expenditure="ALL"):
+    """
+    Report one ledger, it runs in a worker process.
+
+    Args:
+        path (str): The path of the ledger file.
+        output (str): The directory of the images.
+        image_format (str): "png" or "svg".
+        expenditure (str): The type of expenditure of the TimePlot chart.
+
+    Returns:
+        dict: The summary of the ledger, with the error message if the ledger could not be reported.
+    """
+    started = time.perf_counter()
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        ledger = ledger_cache.load_ledger(path)
+        # The report only reads the ledgers, no rollups are written into their directories
+        aggregates = ledger_cache.load_aggregates(path, persist=False)
+        stats = statistics_from_aggregates(aggregates)
+        images = render_charts(ledger, aggregates, output, name, image_format, expenditure)
+    except (OSError, ValueError, KeyError) as e:
+        return {"ledger": path, "error": f"{type(e).__name__}: {e}"}
+
+    return {
+        "ledger": path,
+        "rows": len(ledger),
+        "statistics": dataclasses.asdict(stats),
+        "labels": format_statistics(stats),
+        "charts": images,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the statistics and charts of ledgers without a display.")
+    parser.add_argument("paths", nargs="*", default=["/path_to_files"], help="ledger files or directories")
+    parser.add_argument("--output", default="reports", help="directory of the images and of the summary")
+    parser.add_argument("--format", choices=["png", "svg"], default="png", help="format of the images")
+    parser.add_argument("--type", default="ALL", help="type of expenditure of the TimePlot chart")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    ledgers = find_ledgers(args.paths)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(report_ledger, path, args.output, args.format, args.type) for path in ledgers]
+        summaries = [future.result() for future in futures]
+
+    summary_path = os.path.join(args.output, "summary.json")
+    with open(summary_path, 'w') as f:
+        json.dump({"generated": time.strftime("%d.%m.%Y %H:%M:%S"), "ledgers": summaries}, f, indent=4, default=int)
+
+    failed = sum("error" in summary for summary in summaries)
+    print(f"reported {len(summaries) - failed} ledgers ({failed} failed), summary written to {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
+import os
 import customtkinter
-from tkinter import ttk
 from datetime import datetime
-from tkinter import messagebox
-import os
-import json
+from tkinter import filedialog, messagebox
+from bank_import import ImportIndex, ImportProfile, profile_path, read_statement
+from ledger_cache import ledger_cache
+from date_filter import DateRangeFilter
+from perf import traced
+from transactions import TransactionModel
+from virtual_treeview import VirtualTreeview
 
 
 def get_current_date():
@@ -31,6 +35,19 @@ class SecondFrame(customtkinter.CTkFrame):
         # Place for data from home frame
         self.data = None
         self.status = None
+        self.aggregates = None
+        self.path = None
+
+        # In-memory model of the records, the treeview is a view over it
+        self.model = None
+
+        # Indices of the records within the filtered date range, None if the list is not filtered
+        self.visible = None
+
+        # Hashes of the bank statement rows imported into the ledger, the index is written when the ledger is saved
+        self.workers = parent.workers
+        self.import_index = None
+        self.imported = False
 
         # Create the widgets
         self.in_or_ex_button = customtkinter.CTkOptionMenu(self,
@@ -52,13 +69,17 @@ class SecondFrame(customtkinter.CTkFrame):
         self.sidebar_button_1 = customtkinter.CTkButton(self, width=150, text="Add", command=self.create_record)
         self.sidebar_button_1.grid(row=4, column=0, padx=20, pady=5)
 
+        self.date_filter = DateRangeFilter(self, command=self.filter_dates)
+        self.date_filter.grid(row=5, column=0, padx=20, pady=(20, 5))
+
+        self.import_button = customtkinter.CTkButton(self, width=150, text="Import CSV", command=self.import_statement)
+        self.import_button.grid(row=7, column=0, padx=20, pady=5)
+
         self.button_3 = customtkinter.CTkButton(self, width=150, text="Save", command=self.save_file)
         self.button_3.grid(row=8, column=0, padx=20, pady=(5, 20))
 
-        # Create the treeview
-        self.view = ttk.Treeview(self,
-                                 columns=("index", "date_time", "expenditure_or_income", "price", "note"),
-                                 show="headings")
+        # Create the treeview, only the rows in its viewport are materialized
+        self.view = VirtualTreeview(self, columns=("index", "date_time", "expenditure_or_income", "price", "note"))
         self.view.grid(row=0, column=1, rowspan=10, padx=20, pady=20, sticky="nsew")
 
         # Configure the treeview
@@ -81,7 +102,8 @@ class SecondFrame(customtkinter.CTkFrame):
 
         Notes:
             - If the "Income" button is clicked, the type of expenditures is disabled.
-            - If the "Expenditure" button is clicked, the type of expenditures is enabled with a default selection of "None".
+            - If the "Expenditure" button is clicked, the type of expenditures is enabled with a default selection
+              of "None".
         """
         if status == "Income":
             self.type_menu.configure(state="disabled")
@@ -90,44 +112,69 @@ class SecondFrame(customtkinter.CTkFrame):
             self.type_menu.configure(state="normal")
             self.type_menu.set("None")
 
+    @traced("SecondFrame.reload")
     def reload(self):
         """
         Reload data in the treeview displayed in the second frame.
 
         Notes:
-            - If there is no data, the treeview remains empty.
-            - If data are present and have not been loaded before, they are loaded into the treeview.
-              - The data is inserted in reverse order for better orientation.
+            - The loaded data are turned into a transaction model, the treeview is a virtual view over the model and
+              reads only the rows in its viewport, so reloading costs the same for small and large ledgers.
+            - The rows are shown in reverse order (newest first) for better orientation.
+            - Records added but not saved are dropped on reload.
             - The `status` attribute is used to indicate whether data have been previously uploaded.
             - After data loading, the `status` is set to False to avoid redundant loading in subsequent clicks.
         """
-        data = self.data
-
-        if not data["items"]["index"]:
-            pass
+        if self.status:
+            # A statement read for the previous model is not added to the new one
+            self.workers.cancel("import")
+            self.model = TransactionModel.from_file_data(self.data, self.aggregates)
+            self.import_index = None
+            self.imported = False
+            self.update_visible()
+            self.view.set_source(self.row_count, self.display_row)
+            self.status = False
         else:
-            if self.status:
-                for item in self.view.get_children():
-                    self.view.delete(item)
+            log_message = "Data are already uploaded."
+            messagebox.showinfo("Info", log_message)
 
-                for i in data["items"]["index"]:
-                    self.view.insert(parent="", index=0, values=(
-                        i, data["items"]["date"][i], data["items"]["type"][i], data["items"]["price"][i],
-                        data["items"]["income_expenditure"][i]))
+    def row_count(self):
+        """
+        Count the records shown in the treeview.
 
-                self.status = False
-            else:
-                log_message = "Data are already uploaded."
-                messagebox.showinfo("Info", log_message)
+        Returns:
+            int: The number of records in the model, or within the filtered date range.
+        """
+        if self.visible is not None:
+            return len(self.visible)
+        return len(self.model)
 
+    def display_row(self, position):
+        """
+        Get the values of a row of the treeview, the newest record is shown at the top.
+
+        Args:
+            position (int): The position of the row in the treeview.
+
+        Returns:
+            tuple: The index, date, type, price and income/expenditure flag of the record.
+        """
+        if self.visible is not None:
+            index = int(self.visible[len(self.visible) - 1 - position])
+        else:
+            index = len(self.model) - 1 - position
+        return (index,) + self.model.record(index)
+
+    @traced("SecondFrame.create_record")
     def create_record(self):
         """
         Create a new record based on the provided inputs and insert it into the treeview.
 
         If the date entry is empty, the current date is used. Otherwise, the date from the entry is used.
-        The highest index is used for the index in the treeview.
+        The index of the record is given by the transaction model.
         The income or expenditure type and corresponding name are determined based on the button selection.
-        The new record is inserted into the treeview.
+        The new record is added to the transaction model, which updates the rollups of the ledger, and the treeview
+        is refreshed.
 
         Notes:
             - The `view` attribute refers to the treeview widget.
@@ -143,7 +190,6 @@ class SecondFrame(customtkinter.CTkFrame):
             datetime_str = self.date_entry.get()
 
         price = self.entry.get()
-        highest_index = len(self.view.get_children())
 
         if self.in_or_ex_button.get() == "Income":
             in_or_ex = "1"
@@ -152,9 +198,102 @@ class SecondFrame(customtkinter.CTkFrame):
             in_or_ex = "0"
             type_of_ex_in = self.name
 
-        self.view.insert(parent="", index=0, values=(highest_index, datetime_str, type_of_ex_in, price, in_or_ex))
+        self.model.add(datetime_str, type_of_ex_in, price, in_or_ex)  # Also updates the rollups in O(1)
+        self.update_visible()
+        self.view.refresh()
         self.entry.delete(0, 10)
 
+    def import_statement(self):
+        """
+        Import a bank statement export (CSV) chosen by the user into the shown ledger.
+
+        The statement is read by a worker thread in the layout given by the import profile next to the ledgers. The rows
+        already imported into the ledger are skipped, the new ones are added as records like the records created by
+        hand and are written when the ledger is saved.
+        """
+        if self.model is None:
+            return
+        path = filedialog.askopenfilename(title="Import bank statement",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            profile = ImportProfile.load(profile_path(os.path.dirname(self.path)))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if self.import_index is None:
+            self.import_index = ImportIndex.load(self.path)
+
+        # The worker adds the read rows to its own index, the index of the frame is replaced when the import is shown
+        # The open ledger is captured, the statement is dropped if another ledger is opened meanwhile
+        index = ImportIndex(self.import_index.hashes)
+        ledger_path, model = self.path, self.model
+        self.workers.submit("import", self.read_statement, path, profile, index, text="Importing statement",
+                            on_done=lambda statement: self.show_import(statement, index, ledger_path, model))
+
+    @staticmethod
+    def read_statement(job, path, profile, index):
+        """
+        Read the new rows of a bank statement, it runs in a worker thread.
+
+        Args:
+            job (Job): The job running the method.
+            path (str): The path of the statement.
+            profile (ImportProfile): The layout of the statement.
+            index (ImportIndex): The hashes of the rows already imported into the ledger.
+
+        Returns:
+            StatementImport: The new records and the counts of the read rows.
+        """
+        return read_statement(path, profile, index, job)
+
+    @traced("SecondFrame.show_import")
+    def show_import(self, statement, index, ledger_path, model):
+        """
+        Add the records of an imported statement to the transaction model, called on the main loop.
+
+        Args:
+            statement (StatementImport): The new records of the statement.
+            index (ImportIndex): The import index updated with the rows of the statement.
+            ledger_path (str): The path of the ledger the statement was imported into.
+            model (TransactionModel): The model of the ledger the statement was imported into.
+        """
+        if ledger_path != self.path or model is not self.model:
+            return  # Another ledger was opened while the statement was read
+        self.model.extend(statement.records())  # Also updates the rollups
+        self.import_index = index
+        self.imported = self.imported or len(statement) > 0
+        self.update_visible()
+        self.view.refresh()
+        log_message = (f"Imported {len(statement)} of {statement.rows} rows, skipped {statement.duplicates} "
+                       f"already imported and {statement.invalid} invalid rows.")
+        messagebox.showinfo("Info", log_message)
+
+    def filter_dates(self, date_range):
+        """
+        Show only the records dated within a date range, called by the date filter.
+
+        Args:
+            date_range (tuple): The first and last day of the range, a missing bound is None.
+        """
+        if self.model is None:
+            return
+        self.update_visible()
+        self.view.refresh()
+
+    def update_visible(self):
+        """
+        Find the records within the date range of the date filter.
+
+        The records are found by binary searches in the date index of the model, which is rebuilt only after the
+        records change.
+        """
+        if self.date_filter.active:
+            self.visible = self.model.between(self.date_filter.start, self.date_filter.end)
+        else:
+            self.visible = None
+
     def get_expenditure(self, name):
         """
         Set the selected type of expenditure based on the provided name.
@@ -167,63 +306,28 @@ class SecondFrame(customtkinter.CTkFrame):
         """
         self.name = name
 
+    @traced("SecondFrame.save_file")
     def save_file(self):
         """
-        Save the current data to a JSON file.
+        Save the current data to the ledger file.
 
-        This function saves the data currently displayed in the treeview to a JSON file. It extracts data from the treeview's
-        values and saves them in reverse order to match the automatic reversal performed by the treeview.
+        This function saves the transaction model, which holds the records displayed in the treeview, through the
+        storage of the ledger. No data are read back from the treeview widget. Ledgers in the journal mode only append
+        the changes since the last save, other ledgers are rewritten as a whole.
 
         Raises:
             OSError: If there is an issue with the file writing process.
         """
-        data = self.data
-        author = data["author"]
-        file_name = data["file_name"]
-        datetime_str = data["datetime"]
-
-        # Initialize lists to hold data from the treeview
-        box1 = []
-        box2 = []
-        box3 = []
-        box4 = []
-
-        for item in self.view.get_children():
-            # Extract values from the treeview item
-            values = self.view.item(item, "values")
-            date_time = values[1]
-            expenditure = values[2]
-            price = values[3]
-            in_or_ex = values[4]
-
-            # Append values to corresponding boxes
-            box1.append(date_time)
-            box2.append(expenditure)
-            box3.append(price)
-            box4.append(in_or_ex)
-
-        index = list(range(0, len(box1)))
-
-        # Create a data dictionary to save in JSON format
-        data = {
-            "author": author,
-            "file_name": file_name,
-            "datetime": datetime_str,
-            "items": {
-                "index": index,
-                "date": box1[::-1],
-                "type": box2[::-1],
-                "price": box3[::-1],
-                "income_expenditure": box4[::-1]
-            }
-        }
-
-        file_name = os.path.join("/Users/matous/PycharmProjects/Cash_Managment_App/files", file_name + '.json')
         try:
-            with open(file_name, 'w') as f:
-                json.dump(data, f, indent=4)
-                log_message = "Data are successfully saved."
-                messagebox.showinfo("Info", log_message)
+            # The shared cache is kept in sync, so the next navigation does not parse the saved file again
+            # The rollups are persisted with the file, further records are added to a copy of them
+            ledger_cache.save(self.path, self.model)
+            self.model.aggregates = self.model.aggregates.copy()
+            if self.imported:
+                # The index is written after the ledger, so the rows of an unsaved import are imported again
+                self.import_index.save(self.path)
+                self.imported = False
+            log_message = "Data are successfully saved."
+            messagebox.showinfo("Info", log_message)
         except OSError as e:
             messagebox.showerror("Error", f"An error occurred while saving the data: {e}")
-
@@ -0,0 +1,371 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import numpy as np
+
+from aggregates import AggregateStore, EXPENDITURE, EXPENDITURE_ROWS, INCOME, INCOME_ROWS, day_key, parse_date
+from ledger import Ledger
+from money import parse_minor
+
+# Storage mode of ledgers kept in a SQLite database
+SQLITE_MODE = "sqlite"
+
+# Unit of the amount column stored in the meta table, databases without it hold whole crowns and are converted
+AMOUNT_UNIT = "minor"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    date TEXT,
+    day TEXT,
+    type TEXT,
+    price TEXT,
+    amount INTEGER,
+    income_expenditure TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_day ON transactions (day);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (type);
+CREATE INDEX IF NOT EXISTS idx_transactions_income_expenditure ON transactions (income_expenditure, type, day);
+"""
+
+
+def to_row(date, type_of_ex_in, price, in_or_ex):
+    """
+    Convert a record to a row of the transactions table.
+
+    Besides the values stored in the ledger files, the row holds the ISO date (NULL if the date can not be parsed) and
+    the price in minor units, which are used by the indexes and by the aggregations.
+    """
+    parsed = parse_date(date)
+    day = day_key(parsed) if parsed is not None else None
+    return date, day, type_of_ex_in, price, parse_minor(price), in_or_ex
+
+
+class SqliteStorage:
+    """
+    Storage of a ledger in a SQLite database.
+
+    The records are kept in a transactions table indexed on the date, the type and the income/expenditure flag, so
+    filtered views of the ledger and its rollups are computed by indexed SQL queries instead of scanning the whole
+    ledger in memory. A save applies only the changes recorded by the transaction model, addressing the rows by the
+    ids kept for the positions of the records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._migrated = False
+        # Ids of the rows in the order of the records as (signature of the database, ids), kept up to date by saves
+        self._row_ids = None
+
+    @classmethod
+    def create(cls, path, data):
+        """
+        Create a database holding the content of a ledger file.
+
+        Args:
+            path (str): The path of the new database.
+            data (dict): The content of the ledger file.
+
+        Returns:
+            SqliteStorage: The storage of the new database.
+        """
+        storage = cls(path)
+        items = data["items"]
+        rows = (to_row(*record) for record in
+                zip(items["date"], items["type"], items["price"], items["income_expenditure"]))
+        author = data.get("author", data.get("name_of_author", ""))
+
+        with storage.connect() as connection:
+            connection.executescript(SCHEMA)
+            connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                   [("author", author), ("file_name", data["file_name"]),
+                                    ("datetime", data["datetime"]), ("amount_unit", AMOUNT_UNIT)])
+            connection.executemany("INSERT INTO transactions (date, day, type, price, amount, income_expenditure) "
+                                   "VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return storage
+
+    @contextmanager
+    def connect(self):
+        """
+        Open a connection to the database for one transaction, which is committed or rolled back on exit.
+        """
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                if not self._migrated:
+                    self._migrate(connection)
+                yield connection
+        finally:
+            connection.close()
+
+    def _migrate(self, connection):
+        """
+        Convert the amounts of a database created when they were kept in whole crowns to minor units.
+
+        The amounts are parsed again from the prices stored as text, so no haléře are lost by the conversion.
+        """
+        self._migrated = True
+        if connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'").fetchone() is None:
+            return  # A new database, it is created with amounts in minor units
+        if connection.execute("SELECT 1 FROM meta WHERE key = 'amount_unit' AND value = ?", (AMOUNT_UNIT,)).fetchone():
+            return
+        prices = connection.execute("SELECT id, price FROM transactions").fetchall()
+        connection.executemany("UPDATE transactions SET amount = ? WHERE id = ?",
+                               [(parse_minor(price), row_id) for row_id, price in prices])
+        connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('amount_unit', ?)", (AMOUNT_UNIT,))
+
+    def signature(self):
+        """
+        Build the signature used to detect changes of the database.
+
+        Returns:
+            tuple: Modification time and size of the database file.
+        """
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """
+        Load the whole ledger in the format of the ledger files.
+
+        Returns:
+            dict: The content of the ledger.
+        """
+        signature = self.signature()
+        with self.connect() as connection:
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+            rows = connection.execute("SELECT id, date, type, price, income_expenditure FROM transactions ORDER BY id")
+            columns = [list(column) for column in zip(*rows)] or [[], [], [], [], []]
+        self._row_ids = (signature, columns[0])
+        columns = columns[1:]
+
+        return {
+            "author": meta.get("author", ""),
+            "file_name": meta.get("file_name", ""),
+            "datetime": meta.get("datetime", ""),
+            "storage": SQLITE_MODE,
+            "items": {
+                "index": list(range(len(columns[0]))),
+                "date": columns[0],
+                "type": columns[1],
+                "price": columns[2],
+                "income_expenditure": columns[3],
+            }
+        }
+
+    def header(self):
+        """
+        Read the header of the ledger from the meta table.
+
+        Returns:
+            dict: The author, file name and datetime of the ledger.
+        """
+        with self.connect() as connection:
+            return dict(connection.execute("SELECT key, value FROM meta WHERE key IN ('author', 'file_name', "
+                                           "'datetime')"))
+
+    def save(self, model, on_compacted=None):
+        """
+        Apply the changes of a transaction model to the database in one transaction.
+
+        Args:
+            model (TransactionModel): The model of the ledger.
+            on_compacted (callable): Unused, databases are not compacted.
+
+        Returns:
+            None: Only the changes of the model are written, see LedgerCache.save.
+        """
+        ids = self.row_ids()
+        try:
+            with self.connect() as connection:
+                for op, index, record in model.changes:
+                    if op == "add":
+                        cursor = connection.execute("INSERT INTO transactions (date, day, type, price, amount, "
+                                                    "income_expenditure) VALUES (?, ?, ?, ?, ?, ?)", to_row(*record))
+                        ids.append(cursor.lastrowid)
+                    elif op == "edit":
+                        connection.execute("UPDATE transactions SET date = ?, day = ?, type = ?, price = ?, "
+                                           "amount = ?, income_expenditure = ? WHERE id = ?",
+                                           to_row(*record) + (ids[index],))
+                    elif op == "delete":
+                        connection.execute("DELETE FROM transactions WHERE id = ?", (ids.pop(index),))
+        except BaseException:
+            # The transaction was rolled back, the ids are read again on the next save
+            self._row_ids = None
+            raise
+        self._row_ids = (self.signature(), ids)
+        model.mark_saved()
+        return None
+
+    def row_ids(self):
+        """
+        Get the ids of the rows in the order of the records, they are read again only when the database changed.
+
+        Returns:
+            list: The id of the row of every record, indexed by the position of the record.
+        """
+        signature = self.signature()
+        if self._row_ids is None or self._row_ids[0] != signature:
+            with self.connect() as connection:
+                ids = [row_id for row_id, in connection.execute("SELECT id FROM transactions ORDER BY id")]
+            self._row_ids = (signature, ids)
+        return self._row_ids[1]
+
+    def typed_ledger(self, load_data, loaded=None):
+        """
+        Return the typed view of the ledger used by charts and statistics.
+
+        Args:
+            load_data (callable): Unused, the view queries the database instead of the loaded data.
+            loaded (dict): Unused.
+
+        Returns:
+            SqliteLedger: A view of the ledger whose filters run as indexed SQL queries.
+        """
+        return SqliteLedger(self)
+
+    def build_aggregates(self, ledger):
+        """
+        Build the rollups of the ledger with indexed SQL aggregations.
+
+        Args:
+            ledger (SqliteLedger): Unused, the rollups are aggregated by the database.
+
+        Returns:
+            AggregateStore: The rollups of the ledger.
+        """
+        store = AggregateStore()
+        with self.connect() as connection:
+            for rollup, key in ((store.daily, "day"), (store.monthly, "substr(day, 1, 7)")):
+                rows = connection.execute(f"SELECT {key}, income_expenditure = '1', SUM(amount), COUNT(*) "
+                                          f"FROM transactions WHERE day IS NOT NULL GROUP BY 1, 2")
+                _fill(rollup, rows)
+            _fill(store.categories, connection.execute("SELECT type, income_expenditure = '1', SUM(amount), COUNT(*) "
+                                                       "FROM transactions GROUP BY 1, 2"))
+            for is_income, amount, count in connection.execute("SELECT income_expenditure = '1', SUM(amount), "
+                                                               "COUNT(*) FROM transactions GROUP BY 1"):
+                store.totals[INCOME if is_income else EXPENDITURE] = amount
+                store.totals[INCOME_ROWS if is_income else EXPENDITURE_ROWS] = count
+        return store
+
+
+def _fill(rollup, rows):
+    """
+    Fill a rollup from rows of (key, is_income, sum, count).
+    """
+    for key, is_income, amount, count in rows:
+        group = rollup.setdefault(str(key), [0, 0, 0, 0])
+        group[INCOME if is_income else EXPENDITURE] = amount
+        group[INCOME_ROWS if is_income else EXPENDITURE_ROWS] = count
+
+
+class SqliteLedger:
+    """
+    Typed view of a ledger stored in a SQLite database.
+
+    The view offers the same filters as Ledger (expenditures, incomes, of_type, dated and between), but every filter
+    only adds a condition to a SQL query. The rows are fetched from the database, using its indexes, when a column of
+    the view is accessed for the first time; from then on the view behaves like the typed Ledger of the selected rows.
+    """
+
+    def __init__(self, storage, conditions=(), parameters=()):
+        self.storage = storage
+        self.conditions = conditions
+        self.parameters = parameters
+        self._ledger = None
+        self._views = {}
+
+    def where(self, condition, *parameters):
+        """
+        Narrow the view by a SQL condition.
+
+        Args:
+            condition (str): The condition with '?' placeholders.
+            *parameters: The values of the placeholders.
+
+        Returns:
+            SqliteLedger: The narrowed view.
+        """
+        key = (condition,) + parameters
+        if key not in self._views:
+            self._views[key] = SqliteLedger(self.storage, self.conditions + (condition,),
+                                            self.parameters + parameters)
+        return self._views[key]
+
+    @property
+    def expenditures(self):
+        """SqliteLedger: The expenditure rows."""
+        return self.where("income_expenditure != '1'")
+
+    @property
+    def incomes(self):
+        """SqliteLedger: The income rows."""
+        return self.where("income_expenditure = '1'")
+
+    @property
+    def dated(self):
+        """SqliteLedger: The rows with a valid date."""
+        return self.where("day IS NOT NULL")
+
+    def of_type(self, expenditure_type):
+        """
+        Select the rows of one type of expenditure or income with an indexed query.
+
+        Args:
+            expenditure_type (str): The type to filter for.
+
+        Returns:
+            SqliteLedger: The rows of the given type.
+        """
+        return self.where("type = ?", expenditure_type)
+
+    def between(self, start=None, end=None):
+        """
+        Select the rows dated within a date range with a range scan of the date index.
+
+        Args:
+            start (np.datetime64): The first day of the range, None for no lower bound.
+            end (np.datetime64): The last day of the range (inclusive), None for no upper bound.
+
+        Returns:
+            SqliteLedger: The rows of the range.
+        """
+        view = self.dated
+        if start is not None:
+            view = view.where("day >= ?", str(np.datetime64(start, 'D')))
+        if end is not None:
+            view = view.where("day <= ?", str(np.datetime64(end, 'D')))
+        return view
+
+    def materialize(self):
+        """
+        Fetch the rows of the view from the database.
+
+        Returns:
+            Ledger: The typed ledger of the selected rows.
+        """
+        if self._ledger is None:
+            query = "SELECT day, type, amount, income_expenditure FROM transactions"
+            if self.conditions:
+                query += " WHERE " + " AND ".join(self.conditions)
+            with self.storage.connect() as connection:
+                rows = connection.execute(query + " ORDER BY id", self.parameters).fetchall()
+            days, types, amounts, flags = zip(*rows) if rows else ((), (), (), ())
+            self._ledger = Ledger.from_types(date=np.array(days, dtype='datetime64[D]'), types=types,
+                                             price=np.array(amounts, dtype=np.int64),
+                                             is_income=np.array(flags, dtype=object) == "1")
+        return self._ledger
+
+    def __len__(self):
+        return len(self.materialize())
+
+    def __getattr__(self, name):
+        # Columns and derived columns are taken from the fetched rows
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
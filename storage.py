@@ -0,0 +1,301 @@
+import json
+import os
+import threading
+
+from aggregates import AggregateStore
+from ledger import Ledger, decode_categories, encode_categories
+from ledger_stream import read_header, read_ledger
+from partitioned_storage import PartitionedStorage
+from sqlite_storage import SqliteStorage
+
+# Number of journal entries after which the journal is folded into a new snapshot
+COMPACT_THRESHOLD = 1000
+
+# Storage modes of a ledger, stored under the "storage" key of the ledger file
+JSON_MODE = "json"
+JOURNAL_MODE = "journal"
+
+
+def journal_path(path):
+    """
+    Build the path of the append-only journal of a ledger.
+
+    The journal is hidden and placed next to the ledger, so it is not listed between the ledgers in the home frame.
+
+    Args:
+        path (str): The path of the ledger file.
+
+    Returns:
+        str: The path of the journal.
+    """
+    directory, file_name = os.path.split(path)
+    return os.path.join(directory, "." + os.path.splitext(file_name)[0] + ".journal.jsonl")
+
+
+def write_json_atomic(path, data, indent=None):
+    """
+    Write a JSON file through a temporary file, so readers never see a half written file.
+    """
+    temporary = path + ".tmp"
+    with open(temporary, 'w') as f:
+        json.dump(data, f, indent=indent)
+    os.replace(temporary, path)
+
+
+class JsonStorage:
+    """
+    Storage of a ledger in a JSON snapshot with an optional append-only journal.
+
+    In the default "json" mode every save rewrites the whole snapshot. In the "journal" mode a save only appends the
+    records changed since the previous save to a journal next to the snapshot, so its cost is proportional to the
+    change. Loading replays the journal on top of the snapshot, and once the journal grows long it is folded into a new
+    snapshot by a background thread. Every journal entry carries a sequence number and the snapshot remembers the last
+    folded one, so entries appended during a compaction are never lost or applied twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = journal_path(path)
+        self._lock = threading.Lock()
+        self._compacting = False
+
+        # Last journal entry folded into the snapshot on disk
+        self.snapshot_seq = 0
+
+    def signature(self):
+        """
+        Build the signature used to detect changes of the stored ledger.
+
+        Returns:
+            tuple: Modification time and size of the snapshot followed by those of the journal (0 if missing).
+        """
+        snapshot = os.stat(self.path)
+        try:
+            journal = os.stat(self.journal_path)
+            journal_signature = (journal.st_mtime_ns, journal.st_size)
+        except FileNotFoundError:
+            journal_signature = (0, 0)
+        return (snapshot.st_mtime_ns, snapshot.st_size) + journal_signature
+
+    def load(self):
+        """
+        Load the ledger, replaying the journal on top of the snapshot.
+
+        Returns:
+            dict: The content of the ledger file with all journaled changes applied.
+        """
+        with self._lock:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            entries = self._read_journal()
+
+        items = decode_categories(data["items"])
+        seq = self.snapshot_seq = data.get("journal_seq", 0)
+        for entry in entries:
+            if entry["seq"] <= seq:
+                continue  # Already folded into the snapshot
+            apply_entry(items, entry)
+            seq = entry["seq"]
+
+        items["index"] = list(range(len(items["date"])))
+        data["journal_seq"] = seq
+        return data
+
+    def save(self, model, on_compacted=None):
+        """
+        Save the changes of a transaction model.
+
+        Args:
+            model (TransactionModel): The model of the ledger.
+            on_compacted (callable): Called with the compacted data after a background compaction (optional).
+
+        Returns:
+            dict or None: The content of the ledger file after the save, None if only the changes were appended to
+            the journal.
+        """
+        if model.storage == JOURNAL_MODE and os.path.exists(self.path):
+            entries = []
+            for op, index, record in model.changes:
+                model.journal_seq += 1
+                entries.append({"seq": model.journal_seq, "op": op, "index": index, "record": record})
+
+            with self._lock:
+                with open(self.journal_path, 'a') as f:
+                    for entry in entries:
+                        f.write(json.dumps(entry) + "\n")
+            model.mark_saved()
+
+            # The content of the whole ledger is materialized only when the journal is folded into a new snapshot
+            with self._lock:
+                compacting = self._compacting
+            if model.journal_seq - self.snapshot_seq < COMPACT_THRESHOLD or compacting:
+                return None
+            data = model.to_file_data()
+            self.compact_in_background(data, on_compacted)
+            return data
+
+        data = model.to_file_data()
+        with self._lock:
+            write_json_atomic(self.path, to_snapshot(data), indent=4)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.snapshot_seq = model.journal_seq
+        model.mark_saved()
+        return data
+
+    def header(self):
+        """
+        Read the header of the ledger without reading its records.
+
+        Returns:
+            dict: The author, file name and datetime of the ledger.
+        """
+        return read_header(self.path)
+
+    def typed_ledger(self, load_data, loaded=None):
+        """
+        Return the typed view of the ledger used by charts and statistics.
+
+        A ledger whose content is not loaded yet and which has no journal to replay is read by the streaming reader,
+        which builds the typed columns without holding the whole file in memory.
+
+        Args:
+            load_data (callable): Returns the loaded content of the ledger file.
+            loaded (dict): The content of the ledger file if it is already loaded (optional).
+
+        Returns:
+            Ledger: The typed ledger.
+        """
+        if loaded is not None:
+            return Ledger.from_file_data(loaded)
+        if not os.path.exists(self.journal_path) or os.path.getsize(self.journal_path) == 0:
+            return read_ledger(self.path)[1]
+        return Ledger.from_file_data(load_data())
+
+    def build_aggregates(self, ledger):
+        """
+        Build the rollups of the ledger.
+
+        Args:
+            ledger (Ledger): The typed ledger.
+
+        Returns:
+            AggregateStore: The rollups of the ledger.
+        """
+        return AggregateStore.from_ledger(ledger)
+
+    def compact_in_background(self, data, on_done=None):
+        """
+        Fold the journal into a new snapshot in a background thread.
+
+        The thread writes a private copy of the column lists taken before it starts, so data may be changed by the
+        following saves (e.g. in the ledger cache) while the snapshot is being written.
+
+        Args:
+            data (dict): The content of the ledger file up to the journal entry data["journal_seq"].
+            on_done (callable): Called with data from the background thread after the compaction (optional).
+        """
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        snapshot = dict(data, items={name: list(values) for name, values in data["items"].items()})
+
+        def run():
+            try:
+                self.compact(snapshot)
+                if on_done is not None:
+                    on_done(data)
+            finally:
+                with self._lock:
+                    self._compacting = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def compact(self, data):
+        """
+        Fold the journal into a new snapshot.
+
+        The snapshot is written first and the journal is then trimmed to the entries appended after data was taken.
+
+        Args:
+            data (dict): The content of the ledger file up to the journal entry data["journal_seq"].
+        """
+        temporary = self.path + ".compact.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(to_snapshot(data), f, indent=4)
+
+        with self._lock:
+            os.replace(temporary, self.path)
+            self.snapshot_seq = data["journal_seq"]
+            remaining = [entry for entry in self._read_journal() if entry["seq"] > data["journal_seq"]]
+            with open(self.journal_path + ".tmp", 'w') as f:
+                for entry in remaining:
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(self.journal_path + ".tmp", self.journal_path)
+
+    def _read_journal(self):
+        try:
+            with open(self.journal_path, 'r') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+
+def to_snapshot(data):
+    """
+    Build the content of the snapshot file of a ledger, the types of its records are stored dictionary encoded.
+
+    Args:
+        data (dict): The content of the ledger file with the types as strings.
+
+    Returns:
+        dict: The content to be written.
+    """
+    return dict(data, items=encode_categories(data["items"]))
+
+
+def apply_entry(items, entry):
+    """
+    Apply one journal entry to the column lists of a ledger.
+
+    Args:
+        items (dict): The column lists of the ledger.
+        entry (dict): The journal entry with the operation ("add", "edit" or "delete"), index and record.
+    """
+    columns = ("date", "type", "price", "income_expenditure")
+    if entry["op"] == "add":
+        for name, value in zip(columns, entry["record"]):
+            items[name].append(value)
+    elif entry["op"] == "edit":
+        for name, value in zip(columns, entry["record"]):
+            items[name][entry["index"]] = value
+    elif entry["op"] == "delete":
+        for name in columns:
+            del items[name][entry["index"]]
+
+
+# Storages are shared, so the journal of one ledger is always guarded by the same lock
+_storages = {}
+
+
+def open_storage(path):
+    """
+    Get the storage of a ledger file, ledgers with the .sqlite extension are kept in a SQLite database and ledgers
+    with the .ledger extension are manifests of ledgers partitioned by month.
+
+    Args:
+        path (str): The path of the ledger file.
+
+    Returns:
+        JsonStorage, SqliteStorage or PartitionedStorage: The storage of the ledger.
+    """
+    key = os.path.abspath(path)
+    if key not in _storages:
+        if key.endswith(".sqlite"):
+            _storages[key] = SqliteStorage(key)
+        elif key.endswith(".ledger"):
+            _storages[key] = PartitionedStorage(key)
+        else:
+            _storages[key] = JsonStorage(key)
+    return _storages[key]
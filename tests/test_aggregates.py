@@ -0,0 +1,36 @@
+import unittest
+
+from aggregates import AggregateStore
+from ledger import Ledger
+from partitioned_storage import partition_key
+
+# Years below 1000 are written with leading zeros by the datetime64 columns of the typed ledger
+RECORDS = [
+    ("05.05.0023", "Food", "10", "0"),
+    ("06.05.0999", "Rent", "20", "0"),
+    ("07.06.2023", "Income", "30", "1"),
+    ("not a date", "Fuel", "40", "0"),
+]
+
+
+class AggregateKeysTest(unittest.TestCase):
+    def test_added_records_match_ledger_rollups(self):
+        columns = list(zip(*RECORDS))
+        ledger = Ledger.from_items({"index": list(range(len(RECORDS))), "date": list(columns[0]),
+                                    "type": list(columns[1]), "price": list(columns[2]),
+                                    "income_expenditure": list(columns[3])})
+        expected = AggregateStore.from_ledger(ledger)
+        store = AggregateStore()
+        for record in RECORDS:
+            store.add(*record)
+        self.assertEqual(store.daily, expected.daily)
+        self.assertEqual(store.monthly, expected.monthly)
+        self.assertIn("0023-05-05", store.daily)
+
+    def test_partition_key_is_zero_padded(self):
+        self.assertEqual(partition_key("05.05.0023"), "0023-05")
+        self.assertEqual(partition_key("not a date"), "undated")
+
+
+if __name__ == "__main__":
+    unittest.main()
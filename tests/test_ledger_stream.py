@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ledger import Ledger, encode_categories
+from ledger_stream import read_header, read_ledger
+
+# Types with the characters the streaming reader must not take for the structure of the file
+TYPES = ["Food", 'Fo"od, [x]', "Café ]", "a\\b", "{}", "Rent", "", "Income"]
+
+
+def make_items(rows):
+    """
+    Build the "items" of a ledger file with invalid dates and prices and types full of JSON syntax.
+    """
+    rng = np.random.default_rng(rows)
+    dates = [f"{day:02d}.{month:02d}.2023" for day, month in zip(rng.integers(1, 29, rows), rng.integers(1, 13, rows))]
+    dates[::7] = ["not a date"] * len(dates[::7])
+    prices = [f"{price / 100:.2f}" for price in rng.integers(0, 1000000, rows)]
+    prices[::11] = ["x"] * len(prices[::11])
+    return {
+        "index": list(range(rows)),
+        "date": dates,
+        "type": [TYPES[code] for code in rng.integers(0, len(TYPES), rows)],
+        "price": prices,
+        "income_expenditure": [str(flag) for flag in rng.integers(0, 2, rows)],
+    }
+
+
+class ReadLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "ledger.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, items, indent=4):
+        with open(self.path, 'w') as f:
+            json.dump({"name_of_author": 'A "quoted" author', "file_name": "ledger", "datetime": "1",
+                       "items": items}, f, indent=indent)
+
+    def assert_same(self, streamed, expected):
+        self.assertEqual(len(streamed), len(expected))
+        np.testing.assert_array_equal(streamed.date, expected.date)
+        np.testing.assert_array_equal(streamed.type, expected.type)
+        np.testing.assert_array_equal(streamed.price, expected.price)
+        np.testing.assert_array_equal(streamed.is_income, expected.is_income)
+
+    def test_matches_from_items_at_every_chunk_boundary(self):
+        items = make_items(60)
+        self.write(items)
+        expected = Ledger.from_items(items)
+        # Chunks of a few characters end inside strings, escapes and numbers of the file
+        for chunk_chars in list(range(1, 40)) + [97, 1 << 20]:
+            with self.subTest(chunk_chars=chunk_chars):
+                header, streamed = read_ledger(self.path, chunk_chars)
+                self.assertEqual(header["name_of_author"], 'A "quoted" author')
+                self.assert_same(streamed, expected)
+
+    def test_compact_file(self):
+        items = make_items(500)
+        self.write(items, indent=None)
+        expected = Ledger.from_items(items)
+        for chunk_chars in (5, 64, 1 << 20):
+            with self.subTest(chunk_chars=chunk_chars):
+                self.assert_same(read_ledger(self.path, chunk_chars)[1], expected)
+
+    def test_encoded_categories(self):
+        items = make_items(200)
+        expected = Ledger.from_items(items)
+        self.write(encode_categories(items))
+        for chunk_chars in (3, 17, 1 << 20):
+            with self.subTest(chunk_chars=chunk_chars):
+                self.assert_same(read_ledger(self.path, chunk_chars)[1], expected)
+
+    def test_header(self):
+        self.write(make_items(100))
+        for chunk_chars in (1, 7, 1 << 12):
+            with self.subTest(chunk_chars=chunk_chars):
+                self.assertEqual(read_header(self.path, chunk_chars),
+                                 {"name_of_author": 'A "quoted" author', "file_name": "ledger", "datetime": "1"})
+
+    def test_empty_ledger(self):
+        self.write({"index": [], "date": [], "type": [], "price": [], "income_expenditure": []})
+        self.assertEqual(len(read_ledger(self.path, 4)[1]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
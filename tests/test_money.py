@@ -0,0 +1,28 @@
+import random
+import unittest
+
+from ledger import parse_price_column
+from money import parse_minor
+
+# Prices which float() and pandas.to_numeric do not read alike, and ordinary ones
+PRICES = [" 12", "12 ", "+12", "-12", "1e3", "1E+3", "1e-2", "9e\t0", "1E -2", ".5", "5.", "-.5", "+.5e1", "1,5",
+          "inf", "-inf", "nan", "Infinity", "0x10", "1_000", "١٢", "٣.٥", "１２", "12\xa0", "\xa012", "\t12\n", "", " ",
+          "1.2.3", "--1", "+-1", "1e", "e1", "1d3", "12.345", "0.005", "0.015", "1e400", "9e20", "00012", "1 000",
+          "\x0c12", "12.", "+", ".", "5e+", 12, 12.5, None]
+
+
+class ParseMinorTest(unittest.TestCase):
+    def assert_same(self, values):
+        self.assertEqual([parse_minor(value) for value in values], parse_price_column(values).tolist())
+
+    def test_matches_price_column(self):
+        self.assert_same(PRICES)
+
+    def test_matches_price_column_on_random_text(self):
+        rng = random.Random(0)
+        alphabet = "0123456789+-.eE _,\t\xa0١"
+        self.assert_same(["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6))) for _ in range(5000)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from aggregates import AggregateStore
+from benchmarks.reference_statistics import separate_statistics
+from formatting import format_statistics
+from ledger import Ledger
+from ledger_statistics import compute_statistics, statistics_from_aggregates
+
+RECORDS = [
+    ("01.02.2023", "Food", "120.50", "0"),
+    ("01.02.2023", "Rent", "9000", "0"),
+    ("15.03.2023", "Food", "80", "0"),
+    ("not a date", "Fuel", "300", "0"),
+    ("01.02.2023", "Income", "25000", "1"),
+    ("20.05.2024", "Income", "26000.40", "1"),
+]
+
+
+def make_ledger(records):
+    columns = list(zip(*records)) or [(), (), (), ()]
+    return Ledger.from_items({
+        "index": list(range(len(records))),
+        "date": list(columns[0]),
+        "type": list(columns[1]),
+        "price": list(columns[2]),
+        "income_expenditure": list(columns[3]),
+    })
+
+
+class PanelStatisticsTest(unittest.TestCase):
+    def test_all_paths_agree(self):
+        cases = {
+            "mixed": RECORDS,
+            "expenditures only": [record for record in RECORDS if record[3] == "0"],
+            "incomes only": [record for record in RECORDS if record[3] == "1"],
+            "empty": [],
+        }
+        for name, records in cases.items():
+            with self.subTest(name):
+                ledger = make_ledger(records)
+                # The labels are formatted in the order of the panel
+                fused = list(format_statistics(compute_statistics(ledger)).values())
+                rollups = statistics_from_aggregates(AggregateStore.from_ledger(ledger))
+                rollups = list(format_statistics(rollups).values())
+                self.assertEqual(separate_statistics(ledger), fused)
+                self.assertEqual(rollups, fused)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from storage import JOURNAL_MODE, JsonStorage
+from transactions import COLUMNS
+
+
+class HeldStorage(JsonStorage):
+    """
+    Storage whose background compaction waits until it is released.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.release = threading.Event()
+        self.done = threading.Event()
+
+    def compact(self, data):
+        self.release.wait()
+        try:
+            super().compact(data)
+        finally:
+            self.done.set()
+
+
+class CompactionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "ledger.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_snapshot_is_not_changed_by_later_saves(self):
+        items = {"index": [0, 1], "date": ["01.01.2023", "02.01.2023"], "type": ["Food", "Rent"],
+                 "price": ["1", "2"], "income_expenditure": ["0", "0"]}
+        data = {"author": "A", "file_name": "ledger", "datetime": "1", "storage": JOURNAL_MODE, "items": items,
+                "journal_seq": 0}
+        with open(self.path, 'w') as f:
+            json.dump(data, f)
+        storage = HeldStorage(self.path)
+        storage.compact_in_background(data)
+
+        # Changes applied to the data while the compaction runs, like the ledger cache applies the following saves
+        for name, value in zip(COLUMNS, ("03.01.2023", "Fuel", "3", "1")):
+            items[name].append(value)
+        del items["type"][0]
+        data["journal_seq"] = 5
+        storage.release.set()
+        self.assertTrue(storage.done.wait(10))
+
+        with open(self.path, 'r') as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot["journal_seq"], 0)
+        self.assertEqual({name: len(snapshot["items"][name]) for name in COLUMNS}, dict.fromkeys(COLUMNS, 2))
+        self.assertEqual(JsonStorage(self.path).load()["items"]["type"], ["Food", "Rent"])
+
+
+if __name__ == "__main__":
+    unittest.main()
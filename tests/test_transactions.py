@@ -0,0 +1,47 @@
+import random
+import unittest
+
+import numpy as np
+
+from transactions import COLUMNS, TransactionModel
+
+# Dates with single digits, spaces, impossible days and garbage, several of them on the same day
+DATES = ["01.02.2023", "1.2.2023", "31.02.2023", "x", "", " 05.05.2023", "05.05.2023", "28.12.2022", "07.07.2024"]
+
+
+def random_record(rng):
+    return rng.choice(DATES), "Food", str(rng.randint(0, 100)), str(rng.randint(0, 1))
+
+
+class DateIndexTest(unittest.TestCase):
+    def assert_rebuilt(self, model):
+        dates, order = model.date_index()
+        model._date_index = None
+        rebuilt_dates, rebuilt_order = model.date_index()
+        # NaT is not equal to itself, so the days are compared as integers
+        np.testing.assert_array_equal(dates.view('i8'), rebuilt_dates.view('i8'))
+        np.testing.assert_array_equal(order, rebuilt_order)
+
+    def test_updates_match_a_rebuilt_index(self):
+        rng = random.Random(0)
+        model = TransactionModel("author", "ledger", "1", {name: [] for name in COLUMNS})
+        model.extend(random_record(rng) for _ in range(50))
+        model.date_index()
+        for step in range(1000):
+            action = rng.random()
+            if action < 0.4 or len(model) < 5:
+                model.add(*random_record(rng))
+            elif action < 0.7:
+                model.edit(rng.randrange(len(model)), *random_record(rng))
+            elif action < 0.95:
+                model.delete(rng.randrange(len(model)))
+            else:
+                model.extend(random_record(rng) for _ in range(rng.randint(0, 20)))
+            if step % 25 == 0:
+                with self.subTest(step=step):
+                    self.assert_rebuilt(model)
+        self.assert_rebuilt(model)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,177 +1,24 @@
+import os
+from tkinter import messagebox
+
 import customtkinter
-import pandas as pd
+from aggregates import AggregateStore
+from date_filter import DateRangeFilter
+from formatting import format_statistics
+from ledger_statistics import statistics_from_aggregates
+from perf import traced
 from charts import Chart, HistogramBuilder, MoneyBalancePlotter
-
-
-def prepare_data(df):
-    """
-    Prepare the data by converting columns to appropriate data types.
-
-    Args:
-        df (DataFrame): DataFrame containing expenditure or income data.
-
-    Returns:
-        DataFrame: A new DataFrame with the prepared data.
-    """
-    new = df.copy()
-    new['price'] = pd.to_numeric(new['price'], errors='coerce')
-    new['date'] = pd.to_datetime(new['date'], format='%d.%m.%Y')
-    return new
-
-
-def format_number_with_spaces(number):
-    """
-    Format a number with spaces as thousands separators and add the currency symbol 'Kč'.
-
-    Args:
-        number (int or float): The number to be formatted.
-
-    Returns:
-        str: The formatted number with spaces as thousands separators and the currency symbol.
-    """
-    # Convert the number to a string and reverse it
-    num_str = str(number)[::-1]
-
-    # Create a list to hold the formatted parts
-    formatted_parts = []
-
-    # Iterate through the string in chunks of 3 characters
-    for i in range(0, len(num_str), 3):
-        chunk = num_str[i:i + 3][::-1]  # Get the reversed chunk of 3 characters
-        formatted_parts.append(chunk)
-
-    # Reverse the formatted parts and join them with spaces
-    formatted_number = " ".join(formatted_parts[::-1])
-
-    # Add the currency symbol at the end
-    formatted_number += " Kč"
-
-    return formatted_number
-
-
-def max_expenditure_per_day(df):
-    """
-    Calculate the maximum expenditure in a single day.
-
-    Args:
-        df (DataFrame): DataFrame containing expenditure data.
-
-    Returns:
-        str: A formatted string indicating the maximum expenditure and the corresponding day.
-    """
-    df = prepare_data(df)
-    df['date'] = df['date'].dt.strftime('%d.%m')
-    max_expenditure = df.groupby('date')['price'].sum()
-    max_day = max_expenditure.idxmax()
-    max_value = max_expenditure.max()
-    return f"{format_number_with_spaces(max_value)} ({max_day})"
-
-
-def max_expenditure_by_category(df):
-    """
-    Calculate the maximum expenditure by category.
-
-    Args:
-        df (DataFrame): DataFrame containing expenditure data.
-
-    Returns:
-        str: A formatted string indicating the maximum expenditure and the corresponding category.
-    """
-    df = prepare_data(df)
-    max_expenditure = df.groupby('type')['price'].sum()
-    max_category = max_expenditure.idxmax()
-    max_value = max_expenditure.max()
-    return f"{format_number_with_spaces(max_value)} ({max_category})"
-
-
-def avg_expenditure_per_month(df):
-    """
-    Calculate the average expenditure per month.
-
-    Args:
-        df (DataFrame): DataFrame containing expenditure data.
-
-    Returns:
-        str: A formatted string indicating the average expenditure per month.
-    """
-    df = prepare_data(df)
-    df['date'] = df['date'].dt.strftime('%m')
-    month_sum = df.groupby('date')['price'].sum()
-    avg_expenditure = month_sum.mean()
-    return f"{format_number_with_spaces(round(avg_expenditure))}"
-
-
-def total_spending(df):
-    """
-    Calculate the total spending.
-
-    Args:
-        df (DataFrame): DataFrame containing expenditure data.
-
-    Returns:
-        str: A formatted string indicating the total spending.
-    """
-    df = prepare_data(df)
-    total = df["price"].sum()
-    return f"{format_number_with_spaces(total)}"
-
-
-def total_income(df):
-    """
-    Calculate the total income.
-
-    Args:
-        df (DataFrame): DataFrame containing income data.
-
-    Returns:
-        str: A formatted string indicating the total income.
-    """
-    df = prepare_data(df)
-    total = df["price"].sum()
-    return f"{format_number_with_spaces(total)}"
-
-
-def month_max(df):
-    """
-    Calculate the maximum income in a single month.
-
-    Args:
-        df (DataFrame): DataFrame containing income data.
-
-    Returns:
-        str: A formatted string indicating the maximum income and the corresponding month.
-    """
-    df = prepare_data(df)
-    df['date'] = df['date'].dt.strftime('%m')
-    month_sum = df.groupby('date')['price'].sum()
-    max_month = month_sum.idxmax()
-    max_value = month_sum.max()
-    return f"{format_number_with_spaces(max_value)} ({max_month})"
-
-
-def month_avg(df):
-    """
-    Calculate the average income per month.
-
-    Args:
-        df (DataFrame): DataFrame containing income data.
-
-    Returns:
-        str: A formatted string indicating the average income per month.
-    """
-    df = prepare_data(df)
-    df['date'] = df['date'].dt.strftime('%m')
-    month_sum = df.groupby('date')['price'].sum()
-    avg_month = month_sum.mean()
-    return f"{format_number_with_spaces(round(avg_month))}"
+from render_cache import RenderCache
+from prefetch import EXPENDITURE_TYPES, view_cache
+from currency import BASE_CURRENCY, RateTable, conversions, currency_symbol, money_key, open_rates
 
 
 class ThirdFrame(customtkinter.CTkFrame):
     """
     A class for visualizing data using charts and statistics.
 
-    This class is designed to display charts and statistics based on data
-    loaded from the `self.data` attribute, which is saved from the home frame.
+    This class is designed to display charts and statistics based on the typed ledger
+    stored in the `self.ledger` attribute, which is saved from the home frame.
     """
 
     def __init__(self, parent):
@@ -180,7 +27,24 @@ class ThirdFrame(customtkinter.CTkFrame):
         self.type_menu = None
         self.tabview = None
         self.chart = None
-        self.data = None
+        self.hist = None
+        self.money_balance = None
+        self.ledger = None
+        self.aggregates = None
+        # Rollups of the rows within the date range shown by the charts
+        self.view_aggregates = None
+        self.date_filter = None
+        self.tab_menu_state = "ALL"
+        # Version of the ledger set by the application and the version and date range of the shown rows, they key the
+        # bitmaps of the rendered charts, so switching back to a view already shown blits it instead of rendering it
+        self.version = None
+        self.view = None
+        self.render_cache = RenderCache()
+        # Currency of the charts and statistics, the amounts are converted at the rates read next to the ledgers
+        self.currency = BASE_CURRENCY
+        self.currency_menu = None
+        # The charts are prepared by the worker pool of the application
+        self.workers = parent.workers
         self.initialize_ui()
 
     def initialize_ui(self):
@@ -191,10 +55,12 @@ class ThirdFrame(customtkinter.CTkFrame):
         # Create the tab view and other UI elements
         self.create_tabview()
         self.create_type_menu()
+        self.create_date_filter()
+        self.create_currency_menu()
         self.create_statistics_labels()
 
         # Initialize instance variables
-        self.chart = Chart(self.tabview, self.data, None)
+        self.chart = Chart(self.tabview, self.ledger, None, self.render_cache)
 
     # Create the tab view widget
     def create_tabview(self):
@@ -232,11 +98,13 @@ class ThirdFrame(customtkinter.CTkFrame):
             # In this state, a histogram plot is built by the HistogramBuilder class.
             self.type_menu.configure(state="disabled")
 
-            if hasattr(self, 'hist'):
-                # If a histogram plot has already been created, destroy it to update the plot.
-                self.hist.canvas.get_tk_widget().pack_forget()  # Destroy the existing chart
-
-            self.hist = HistogramBuilder(self.tabview, self.data)
+            key = self.render_key("HistogramPlot")
+            if self.hist is None:
+                self.hist = HistogramBuilder(self.tabview, self.view_aggregates, self.render_cache, key,
+                                             currency_symbol(self.view_currency()))
+            else:
+                # The figure of the tab is kept, only its bars are updated, and only if the shown view changed
+                self.hist.update(self.view_aggregates, key)
             self.type_menu.set("ALL")
 
         elif state == "MoneyBalance":
@@ -244,19 +112,106 @@ class ThirdFrame(customtkinter.CTkFrame):
             # Here, a money balance plot is created using the MoneyBalancePlotter class.
             self.type_menu.configure(state="disabled")
 
-            if hasattr(self, 'money_balance'):
-                # If a money balance plot has already been created, destroy it to update the plot.
-                self.money_balance.canvas.get_tk_widget().pack_forget()  # Destroy the existing chart
-
-            self.money_balance = MoneyBalancePlotter(self.tabview, self.data)
+            key = self.render_key("MoneyBalance")
+            if self.money_balance is None:
+                self.money_balance = MoneyBalancePlotter(self.tabview, self.view_aggregates, self.render_cache, key,
+                                                         currency_symbol(self.view_currency()))
+            else:
+                # The figure of the tab is kept, only its line is updated, and only if the shown view changed
+                self.money_balance.update(self.view_aggregates, key)
             self.type_menu.set("ALL")
 
+    def destroy(self):
+        """
+        Release the figures of all charts before the frame is destroyed.
+        """
+        for chart in (self.chart, self.hist, self.money_balance):
+            if chart is not None:
+                chart.release()
+        self.render_cache.clear()
+        super().destroy()
+
+    def render_key(self, tab, expenditure="ALL"):
+        """
+        Build the key of the view of a chart in the render cache.
+
+        Args:
+            tab (str): The tab of the chart.
+            expenditure (str): The type of expenditure shown by the chart.
+
+        Returns:
+            tuple or None: The version of the ledger, the currency with the version of its rates, the date range, the
+            tab, the type of expenditure and the appearance mode, None while the shown rows have no version.
+        """
+        if self.view is None:
+            return None
+        return self.view + (tab, expenditure, customtkinter.get_appearance_mode())
+
     # Create the drop-down menu for selecting expenditure type
     def create_type_menu(self):
-        values = ["ALL", "Food", "Clothes", "Party", "Fuel", "Rent", "Sport"]
-        self.type_menu = customtkinter.CTkOptionMenu(self, values=values, command=self.create_chart)
+        self.type_menu = customtkinter.CTkOptionMenu(self, values=EXPENDITURE_TYPES, command=self.create_chart)
         self.type_menu.grid(row=1, column=0, padx=20, pady=(36, 0), sticky="nsew")
 
+    # Create the entries of the date range shown by the charts and statistics
+    def create_date_filter(self):
+        self.date_filter = DateRangeFilter(self, command=self.filter_dates)
+        self.date_filter.grid(row=2, column=0, padx=20, pady=(20, 0), sticky="n")
+
+    # Create the drop-down menu for selecting the currency of the charts and statistics
+    def create_currency_menu(self):
+        self.currency_menu = customtkinter.CTkOptionMenu(self, values=[BASE_CURRENCY], command=self.change_currency)
+        self.currency_menu.grid(row=3, column=0, padx=20, pady=(20, 0), sticky="nsew")
+
+    def view_currency(self):
+        """
+        Get the currency of the shown view.
+
+        Returns:
+            str: The code of the currency the shown rollups are in.
+        """
+        return self.view[1][0] if self.view is not None else BASE_CURRENCY
+
+    def change_currency(self, currency):
+        """
+        Show the charts and statistics in another currency, called by the currency menu.
+
+        Args:
+            currency (str): The code of the chosen currency.
+        """
+        self.currency = currency
+        if self.ledger is not None:
+            self.refresh_chart(self.tab_menu_state)
+
+    def load_rates(self):
+        """
+        Read the exchange rates next to the shown ledger and offer their currencies in the currency menu.
+
+        Returns:
+            RateTable: The rates, empty if there are none or they can not be read.
+        """
+        rates = RateTable()
+        if self.version is not None:
+            try:
+                rates = open_rates(os.path.dirname(self.version[0]))
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Error", str(e))
+        currencies = rates.currencies()
+        self.currency_menu.configure(values=currencies)
+        if self.currency not in currencies:
+            self.currency = BASE_CURRENCY
+            self.currency_menu.set(BASE_CURRENCY)
+        return rates
+
+    def filter_dates(self, date_range):
+        """
+        Show the charts and statistics of the rows within a date range, called by the date filter.
+
+        Args:
+            date_range (tuple): The first and last day of the range, a missing bound is None.
+        """
+        if self.ledger is not None:
+            self.refresh_chart(self.tab_menu_state)
+
     # Create the labels for displaying statistics
     def create_statistics_labels(self):
 
@@ -304,12 +259,15 @@ class ThirdFrame(customtkinter.CTkFrame):
         self.label9.grid(row=11, column=0, padx=10, pady=(0, 10), sticky="w")
 
     # Create the chart
+    @traced("ThirdFrame.create_chart")
     def create_chart(self, expenditure):
         """
         Create a visualization chart.
 
-        This method is called when the 'Visualisation' tab is clicked in the navigation frame. It creates a chart based on
-        the selected expenditure type. Existing charts are destroyed and replaced with the new chart.
+        This method is called when the 'Visualisation' tab is clicked in the navigation frame. It updates the chart
+        based on the selected expenditure type. The figure of the chart is created once and its artists are updated in
+        place. The data of the chart and the statistics are prepared by a worker thread; when the type is changed again
+        before they are ready, the preparation for the previous type is cancelled.
 
         Args:
             expenditure (str): The type of expenditure for which the chart should be created.
@@ -317,25 +275,105 @@ class ThirdFrame(customtkinter.CTkFrame):
         Returns:
             None
         """
-        if hasattr(self, 'chart'):
-            self.chart.canvas.get_tk_widget().pack_forget()  # Destroy the existing chart
+        self.refresh_chart(expenditure)
 
-        self.chart = Chart(self.tabview, self.data, expenditure)
+        self.tab_menu_state = self.type_menu.get()  # Save the current state of the type menu for return to TimePlot
+        # tab (Tabclick_event METHOD)
 
-        # Update the statistics labels
-        data = pd.DataFrame(self.data["items"])
-        df_exp = data[data['income_expenditure'] == "0"]
-        df_in = data[data['income_expenditure'] == "1"]
+    def refresh_chart(self, expenditure):
+        """
+        Prepare the charts and statistics in a worker thread and show them when they are ready.
 
-        self.label2.configure(text=f"MAX by DAY: {max_expenditure_per_day(df_exp)}")
-        self.label3.configure(text=f"MAX by Category: {max_expenditure_by_category(df_exp)}")
-        self.label4.configure(text=f"MONTH Average: {avg_expenditure_per_month(df_exp)}")
-        self.label5.configure(text=f"TOTAL: {total_spending(df_exp)}")
+        Args:
+            expenditure (str): The type of expenditure for which the chart should be created.
+        """
+        date_range = (self.date_filter.start, self.date_filter.end)
+        rates = self.load_rates()
+        currency = self.currency
+        # The version of the rates is a part of the view, views converted at replaced rates are not shown again
+        view = (self.version, money_key(currency, rates), date_range) if self.version is not None else None
+        self.workers.submit("chart", self.prepare_chart, self.ledger, self.aggregates, expenditure, date_range,
+                            self.version, currency, rates,
+                            on_done=lambda result: self.show_chart(result, view, expenditure, currency),
+                            text="Preparing chart")
+
+    @traced("ThirdFrame.prepare_chart")
+    def prepare_chart(self, job, ledger, aggregates, expenditure, date_range, version=None, currency=BASE_CURRENCY,
+                      rates=None):
+        """
+        Prepare the data of the chart and the statistics, it runs in a worker thread.
 
-        self.label7.configure(text=f"MAX by MONTH: {month_max(df_in)}")
-        self.label8.configure(text=f"MONTH Average: {month_avg(df_in)}")
-        self.label9.configure(text=f"TOTAL: {total_income(df_in)}")
+        When a date range is set, the rows of the range are taken from the date index of the ledger by binary
+        searches and the rollups of the charts and statistics are built from these rows only. Views prepared before,
+        also by the prefetch started in the home frame, are taken from the view cache. For a foreign currency the ledger
+        is converted first at the rates of the days of its rows, the converted ledger is kept by the conversion cache.
 
-        self.tab_menu_state = self.type_menu.get()  # Save the current state of the type menu for return to TimePlot
-        # tab (Tabclick_event METHOD)
+        Args:
+            job (Job): The job running the method.
+            ledger (Ledger): The typed ledger.
+            aggregates (AggregateStore): The rollups of the ledger.
+            expenditure (str): The type of expenditure for which the chart should be created.
+            date_range (tuple): The first and last day of the range, a missing bound is None.
+            version (tuple): The version of the ledger, None if the view should not be cached.
+            currency (str): The code of the currency of the chart (optional).
+            rates (RateTable): The exchange rates, needed for a foreign currency (optional).
 
+        Returns:
+            tuple: The data of the chart, the statistics and the rollups of the rows within the date range.
+        """
+        key = (version, money_key(currency, rates), date_range, expenditure)
+        if version is not None:
+            view = view_cache.get(key)
+            if view is not None:
+                return view
+
+        if currency != BASE_CURRENCY:
+            ledger, aggregates = conversions.convert(version, ledger, aggregates, currency, rates)
+            job.check()
+        if date_range != (None, None):
+            ledger = ledger.between(*date_range)
+            aggregates = AggregateStore.from_ledger(ledger)
+            job.check()
+        df_pre = self.chart.prepare(ledger, expenditure)
+        job.check()
+        # All statistics are taken from the rollups of the shown rows
+        view = df_pre, statistics_from_aggregates(aggregates), aggregates
+        if version is not None:
+            view_cache.put(key, view)
+        return view
+
+    @traced("ThirdFrame.show_chart")
+    def show_chart(self, result, view=None, expenditure="ALL", currency=BASE_CURRENCY):
+        """
+        Draw the prepared chart and update the statistics labels, called on the main loop.
+
+        Args:
+            result (tuple): The data of the chart, the statistics and the rollups returned by prepare_chart.
+            view (tuple): The version of the ledger, the currency with the version of its rates and the date range of
+                the prepared rows, None if not versioned.
+            expenditure (str): The type of expenditure of the prepared chart.
+            currency (str): The code of the currency of the prepared chart (optional).
+        """
+        df_pre, stats, self.view_aggregates = result
+        self.view = view
+        symbol = currency_symbol(currency)
+        for chart in (self.chart, self.hist, self.money_balance):
+            if chart is not None:
+                chart.set_currency(symbol)
+        self.chart.draw(df_pre, self.render_key("TimePlot", expenditure))
+
+        # The charts of the other tabs are updated only if they were already created
+        if self.hist is not None:
+            self.hist.update(self.view_aggregates, self.render_key("HistogramPlot"))
+        if self.money_balance is not None:
+            self.money_balance.update(self.view_aggregates, self.render_key("MoneyBalance"))
+
+        labels = format_statistics(stats, symbol)
+        self.label2.configure(text=f"MAX by DAY: {labels['expenditure_max_by_day']}")
+        self.label3.configure(text=f"MAX by Category: {labels['expenditure_max_by_category']}")
+        self.label4.configure(text=f"MONTH Average: {labels['expenditure_month_average']}")
+        self.label5.configure(text=f"TOTAL: {labels['expenditure_total']}")
+
+        self.label7.configure(text=f"MAX by MONTH: {labels['income_max_by_month']}")
+        self.label8.configure(text=f"MONTH Average: {labels['income_month_average']}")
+        self.label9.configure(text=f"TOTAL: {labels['income_total']}")
@@ -0,0 +1,269 @@
+import numpy as np
+
+from aggregates import parse_date
+from ledger import date_range_bounds, parse_date_column
+from storage import JOURNAL_MODE, JSON_MODE
+
+COLUMNS = ("date", "type", "price", "income_expenditure")
+
+
+class TransactionModel:
+    """
+    In-memory model of the records of one ledger.
+
+    The model holds the columns of the ledger file and is the single source of the records shown in the adding frame.
+    Records are added, edited and deleted through the model, which keeps the rollups of the ledger in sync, and the
+    ledger file is serialized straight from the model. Indices of the records are their positions in the model.
+    The changes since the last save are collected, so a journaled storage can write only them.
+    """
+
+    def __init__(self, author, file_name, datetime_str, columns, aggregates=None, storage=JSON_MODE, journal_seq=0):
+        self.author = author
+        self.file_name = file_name
+        self.datetime = datetime_str
+        self.columns = columns
+        self.aggregates = aggregates
+        self.storage = storage
+        self.journal_seq = journal_seq
+
+        # Incremented on every change, views and caches use it to detect changes
+        self.version = 0
+
+        # Changes since the last save as (operation, index, record)
+        self.changes = []
+
+        # Dates of the records added, edited or deleted since the last save, old dates of edited records included
+        self.touched_dates = set()
+
+        # Sorted date index as [sorted dates, record indices], built on first use and then updated record by record
+        self._date_index = None
+
+    @classmethod
+    def from_file_data(cls, data, aggregates=None):
+        """
+        Build the model from the loaded content of a ledger file.
+
+        The column lists are copied, so changes of the model do not leak into the loaded data shared by other frames.
+
+        Args:
+            data (dict): The loaded ledger file.
+            aggregates (AggregateStore): The rollups updated together with the model (optional).
+
+        Returns:
+            TransactionModel: The model of the ledger.
+        """
+        items = data["items"]
+        # Files created in the home frame store the author under "name_of_author"
+        author = data.get("author", data.get("name_of_author", ""))
+        return cls(author, data["file_name"], data["datetime"],
+                   {name: list(items[name]) for name in COLUMNS}, aggregates,
+                   storage=data.get("storage", JSON_MODE), journal_seq=data.get("journal_seq", 0))
+
+    def __len__(self):
+        return len(self.columns["date"])
+
+    def record(self, index):
+        """
+        Get one record.
+
+        Args:
+            index (int): The index of the record.
+
+        Returns:
+            tuple: The date, type, price and income/expenditure flag of the record.
+        """
+        return tuple(self.columns[name][index] for name in COLUMNS)
+
+    def add(self, date, type_of_ex_in, price, in_or_ex):
+        """
+        Append a record.
+
+        Args:
+            date (str): The date of the record in the format dd.mm.yyyy.
+            type_of_ex_in (str): The type of the record.
+            price (str): The price of the record.
+            in_or_ex (str): "1" for income, "0" for expenditure.
+
+        Returns:
+            int: The index of the added record.
+        """
+        record = (date, type_of_ex_in, price, in_or_ex)
+        for name, value in zip(COLUMNS, record):
+            self.columns[name].append(value)
+        self._index_insert(date, len(self) - 1)
+        if self.aggregates is not None:
+            self.aggregates.add(*record)
+        self.changes.append(("add", None, list(record)))
+        self.touched_dates.add(date)
+        self.version += 1
+        return len(self) - 1
+
+    def extend(self, records):
+        """
+        Append many records, e.g. the records of an imported bank statement.
+
+        Args:
+            records (iterable): The date, type, price and income/expenditure flag of every record, as taken by add.
+
+        Returns:
+            int: The number of added records.
+        """
+        count = len(self)
+        # Merge the new dates into the date index at once instead of inserting them one by one
+        index, self._date_index = self._date_index, None
+        for record in records:
+            self.add(*record)
+        if index is not None:
+            added = parse_date_column(self.columns["date"][count:])
+            dates = np.concatenate((index[0], added))
+            order = np.concatenate((index[1], np.arange(count, len(self))))
+            merged = np.argsort(dates, kind='stable')
+            self._date_index = [dates[merged], order[merged]]
+        return len(self) - count
+
+    def edit(self, index, date, type_of_ex_in, price, in_or_ex):
+        """
+        Replace a record.
+
+        Args:
+            index (int): The index of the edited record.
+            date (str): The new date in the format dd.mm.yyyy.
+            type_of_ex_in (str): The new type.
+            price (str): The new price.
+            in_or_ex (str): "1" for income, "0" for expenditure.
+        """
+        record = (date, type_of_ex_in, price, in_or_ex)
+        self.touched_dates.update((self.columns["date"][index], date))
+        self._index_remove(self.columns["date"][index], index)
+        self._index_insert(date, index)
+        if self.aggregates is not None:
+            self.aggregates.replace(self.record(index), record)
+        for name, value in zip(COLUMNS, record):
+            self.columns[name][index] = value
+        self.changes.append(("edit", index, list(record)))
+        self.version += 1
+
+    def delete(self, index):
+        """
+        Delete a record, the indices of the following records decrease by one.
+
+        Args:
+            index (int): The index of the deleted record.
+        """
+        self.touched_dates.add(self.columns["date"][index])
+        self._index_remove(self.columns["date"][index], index)
+        if self._date_index is not None:
+            # The following records move one position up
+            order = self._date_index[1]
+            order[order > index] -= 1
+        if self.aggregates is not None:
+            self.aggregates.remove(*self.record(index))
+        for name in COLUMNS:
+            del self.columns[name][index]
+        self.changes.append(("delete", index, None))
+        self.version += 1
+
+    def mark_saved(self):
+        """
+        Forget the changes since the last save, called by the storages after the model was saved.
+        """
+        self.changes = []
+        self.touched_dates = set()
+
+    def date_index(self):
+        """
+        Get the index of the records sorted by date.
+
+        The index is built on first use by parsing and sorting all dates. Added, edited and deleted records then update
+        it one by one, each by binary searches without parsing the other dates again. Records of the same day are kept
+        in the order of their indices.
+
+        Returns:
+            tuple: The sorted datetime64[D] dates (NaT last) and the indices of the records in the same order.
+        """
+        if self._date_index is None:
+            dates = parse_date_column(self.columns["date"])
+            order = np.argsort(dates, kind='stable')
+            self._date_index = [dates[order], order]
+        return tuple(self._date_index)
+
+    def _index_span(self, day, index):
+        """
+        Find the position of a record in the date index, it is the position where the record is or would be inserted.
+        """
+        dates, order = self._date_index
+        if np.isnat(day):
+            lo, hi = date_range_bounds(dates)[1], len(dates)
+        else:
+            lo, hi = date_range_bounds(dates, day, day)
+        return lo + int(np.searchsorted(order[lo:hi], index))
+
+    def _index_insert(self, date, index):
+        """
+        Insert a record into the date index, if it is built.
+        """
+        if self._date_index is None:
+            return
+        day = _parse_day(date)
+        position = self._index_span(day, index)
+        dates, order = self._date_index
+        self._date_index = [np.insert(dates, position, day), np.insert(order, position, index)]
+
+    def _index_remove(self, date, index):
+        """
+        Remove a record from the date index, if it is built.
+        """
+        if self._date_index is None:
+            return
+        position = self._index_span(_parse_day(date), index)
+        dates, order = self._date_index
+        self._date_index = [np.delete(dates, position), np.delete(order, position)]
+
+    def between(self, start=None, end=None):
+        """
+        Find the records dated within a date range with binary searches in the date index.
+
+        Args:
+            start (np.datetime64): The first day of the range, None for no lower bound.
+            end (np.datetime64): The last day of the range (inclusive), None for no upper bound.
+
+        Returns:
+            np.ndarray: The indices of the records in the range, in ascending order.
+        """
+        dates, order = self.date_index()
+        lo, hi = date_range_bounds(dates, start, end)
+        return np.sort(order[lo:hi])
+
+    def to_file_data(self):
+        """
+        Serialize the model to the content of a ledger file.
+
+        Returns:
+            dict: The ledger file content, its lists are copies of the columns of the model.
+        """
+        items = {"index": list(range(len(self)))}
+        items.update({name: list(self.columns[name]) for name in COLUMNS})
+        data = {
+            "author": self.author,
+            "file_name": self.file_name,
+            "datetime": self.datetime,
+            "items": items
+        }
+        if self.storage == JOURNAL_MODE:
+            data["storage"] = self.storage
+            data["journal_seq"] = self.journal_seq
+        return data
+
+
+def _parse_day(value):
+    """
+    Parse the date of one record like parse_date_column.
+
+    Args:
+        value (str): The date in the format dd.mm.yyyy.
+
+    Returns:
+        np.datetime64: The day, NaT if the date can not be parsed.
+    """
+    parsed = parse_date(value)
+    return np.datetime64(parsed.date(), 'D') if parsed is not None else np.datetime64('NaT', 'D')
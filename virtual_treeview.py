@@ -0,0 +1,128 @@
+from tkinter import ttk
+
+# Height of one Treeview row and of the heading in pixels, used when the style does not define them
+DEFAULT_ROW_HEIGHT = 20
+HEADING_HEIGHT = 25
+
+
+class VirtualTreeview(ttk.Frame):
+    """
+    A Treeview which materializes only the rows in its viewport.
+
+    The rows are not inserted into the Treeview up front. Instead the widget asks a row source for the number of rows
+    and for the rows currently visible, and keeps only one page of Treeview items which are refilled on every scroll.
+    Opening a list therefore costs the same for ten and for a million rows.
+    """
+
+    def __init__(self, parent, columns, **kwargs):
+        super().__init__(parent)
+
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.view = ttk.Treeview(self, columns=columns, show="headings", **kwargs)
+        self.view.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        # Place for the row source
+        self.row_count = lambda: 0
+        self.get_row = None
+
+        # Position of the first visible row and the number of rows fitting into the viewport
+        self.offset = 0
+        self.page_size = 1
+
+        self.view.bind("<Configure>", self.on_resize)
+        self.view.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.view.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.view.bind("<Button-5>", lambda event: self.scroll(3))
+
+    def heading(self, column, **kwargs):
+        """
+        Configure the heading of a column of the underlying Treeview.
+        """
+        self.view.heading(column, **kwargs)
+
+    def set_source(self, row_count, get_row):
+        """
+        Set the source of the displayed rows and show its first page.
+
+        Args:
+            row_count (callable): Returns the number of rows.
+            get_row (callable): Returns the values of the row at the given position (0 is the top row).
+        """
+        self.row_count = row_count
+        self.get_row = get_row
+        self.offset = 0
+        self.render()
+
+    def refresh(self):
+        """
+        Redraw the visible rows, e.g. after rows were added to the source.
+        """
+        self.render()
+
+    def render(self):
+        """
+        Fill the page of Treeview items with the rows of the viewport.
+        """
+        total = self.row_count()
+        self.offset = max(0, min(self.offset, total - self.page_size))
+        visible = min(self.page_size, total - self.offset)
+
+        items = self.view.get_children()
+        for position in range(visible):
+            values = self.get_row(self.offset + position)
+            if position < len(items):
+                self.view.item(items[position], values=values)
+            else:
+                self.view.insert(parent="", index="end", values=values)
+
+        # Drop the items which are not needed anymore
+        if len(items) > visible:
+            self.view.delete(*items[visible:])
+
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + visible) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll(self, rows):
+        """
+        Scroll the viewport by a number of rows.
+
+        Args:
+            rows (int): Number of rows to scroll, negative values scroll up.
+        """
+        self.offset += rows
+        self.render()
+
+    def yview(self, *args):
+        """
+        Handle the commands of the scrollbar ('moveto' and 'scroll').
+        """
+        if args[0] == "moveto":
+            self.offset = round(float(args[1]) * self.row_count())
+            self.render()
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self.scroll(amount * self.page_size if args[2] == "pages" else amount)
+
+    def on_mouse_wheel(self, event):
+        """
+        Scroll with the mouse wheel, the delta is 120 per notch on Windows and 1 per notch on macOS.
+        """
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll(-3 * delta)
+        return "break"
+
+    def on_resize(self, event):
+        """
+        Recompute the number of rows fitting into the viewport when the widget is resized.
+        """
+        row_height = ttk.Style().lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT
+        page_size = max(1, (event.height - HEADING_HEIGHT) // int(row_height))
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.render()
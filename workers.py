@@ -0,0 +1,227 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+# Interval in milliseconds in which the Tk main loop collects the results of the workers
+POLL_INTERVAL = 20
+
+# Interval in seconds in which a paused low priority job checks whether it was cancelled
+PAUSE_INTERVAL = 0.05
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job which was superseded by a newer job, so it stops at its next checkpoint.
+    """
+
+
+class Job:
+    """
+    A unit of work running in the worker pool.
+
+    The job is passed to its function, which uses it to report progress and to check whether it was cancelled.
+    Python threads can not be interrupted, so a cancelled job keeps running until its next checkpoint and its
+    result is dropped. A low priority job pauses at its checkpoints while other jobs are running.
+    """
+
+    def __init__(self, pool, key, text, on_done=None, on_error=None, low_priority=False):
+        self.pool = pool
+        self.key = key
+        self.text = text
+        self.on_done = on_done
+        self.on_error = on_error
+        self.low_priority = low_priority
+        self.future = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        """bool: True if the job was cancelled or superseded."""
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """
+        Cancel the job, a job which has not started yet is not run at all.
+        """
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check(self):
+        """
+        Checkpoint of the job function, stops the job if it was cancelled.
+
+        Raises:
+            JobCancelled: If the job was cancelled.
+        """
+        if self.cancelled:
+            raise JobCancelled()
+        if self.low_priority:
+            # Speculative work waits until the jobs the user waits for are finished
+            while not self.pool.idle.wait(PAUSE_INTERVAL):
+                if self.cancelled:
+                    raise JobCancelled()
+
+    def report(self, fraction, text=None):
+        """
+        Report the progress of the job, it is shown by the main loop.
+
+        Args:
+            fraction (float): The finished part of the job between 0 and 1.
+            text (str): The description of the current step (optional).
+        """
+        self.check()
+        if not self.low_priority:
+            self.pool.results.put((self, "progress", (fraction, text or self.text)))
+
+
+class WorkerPool:
+    """
+    Pool of worker threads running loading, parsing and aggregation off the Tk main loop.
+
+    Tk widgets may only be used from the thread running the main loop, so the workers never touch them. The results,
+    errors and progress of the jobs are put to a queue which the main loop drains through after(), and the callbacks
+    of the jobs are called from there. Every job has a key; submitting a job cancels the previous job with the same
+    key, so only the result of the latest request (e.g. the last type chosen in a menu) is ever applied.
+
+    Low priority jobs (speculative work such as prefetching) run one at a time in a thread of their own, so they never
+    hold up the other jobs, and pause at their checkpoints while any other job is running. Their progress is not shown
+    and their errors are dropped.
+    """
+
+    def __init__(self, widget, max_workers=2):
+        self.widget = widget
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="worker")
+        self.background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self.results = queue.Queue()
+        self.jobs = {}
+        self._polling = False
+        self._progress_visible = False
+
+        # Set while no other job than the low priority ones is running
+        self.idle = threading.Event()
+        self.idle.set()
+        self._running = 0
+        self._running_lock = threading.Lock()
+
+        # Called on the main loop with (fraction, text) of the running jobs, or (None, None) when all are finished
+        self.on_progress = None
+
+    def submit(self, key, function, *args, on_done=None, on_error=None, text="Loading", low_priority=False):
+        """
+        Run a function in a worker thread.
+
+        The function is called with the job followed by args. on_done is called with its result and on_error with
+        the raised exception, both from the Tk main loop and only if the job was not superseded in the meantime.
+
+        Args:
+            key (str): The key of the job, a running job with the same key is cancelled.
+            function (callable): The function run in the worker thread.
+            *args: The arguments of the function.
+            on_done (callable): Called with the result of the function (optional).
+            on_error (callable): Called with the exception raised by the function, by default it is shown in
+                a message box (optional).
+            text (str): The description of the job shown with its progress.
+            low_priority (bool): Run the job in the background thread, paused while other jobs run.
+
+        Returns:
+            Job: The submitted job.
+        """
+        self.cancel(key)
+        job = Job(self, key, text, on_done, on_error, low_priority)
+        self.jobs[key] = job
+
+        def run():
+            if not low_priority:
+                self._set_running(1)
+            try:
+                job.check()
+                result = function(job, *args)
+                job.check()
+            except JobCancelled:
+                return
+            except Exception as error:
+                self.results.put((job, "error", error))
+            else:
+                self.results.put((job, "done", result))
+            finally:
+                if not low_priority:
+                    self._set_running(-1)
+
+        if low_priority:
+            job.future = self.background.submit(run)
+        else:
+            job.future = self.executor.submit(run)
+            self.results.put((job, "progress", (0.0, text)))
+        self._start_polling()
+        return job
+
+    def cancel(self, key):
+        """
+        Cancel the job with a key, if any.
+
+        Args:
+            key (str): The key of the job.
+        """
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def shutdown(self):
+        """
+        Cancel all jobs and stop the worker threads.
+        """
+        for key in list(self.jobs):
+            self.cancel(key)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.background.shutdown(wait=False, cancel_futures=True)
+
+    def _set_running(self, change):
+        with self._running_lock:
+            self._running += change
+            if self._running:
+                self.idle.clear()
+            else:
+                self.idle.set()
+
+    def _start_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        # Runs on the main loop, the callbacks of the jobs may use Tk widgets
+        try:
+            while True:
+                try:
+                    job, kind, value = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                if job.cancelled or self.jobs.get(job.key) is not job:
+                    continue  # Superseded, the result is not wanted anymore
+                if kind == "progress":
+                    self._show_progress(*value)
+                    continue
+
+                del self.jobs[job.key]
+                if kind == "done" and job.on_done is not None:
+                    job.on_done(value)
+                elif kind == "error" and job.on_error is not None:
+                    job.on_error(value)
+                elif kind == "error" and not job.low_priority:
+                    messagebox.showerror("Error", str(value))
+        finally:
+            # Keep polling while any job is running, even if a callback failed
+            if self.jobs:
+                self.widget.after(POLL_INTERVAL, self._poll)
+            else:
+                self._polling = False
+            # Low priority jobs are not shown, the progress is hidden once no other job is running
+            if self._progress_visible and all(job.low_priority for job in self.jobs.values()):
+                self._show_progress(None, None)
+
+    def _show_progress(self, fraction, text):
+        self._progress_visible = fraction is not None
+        if self.on_progress is not None:
+            self.on_progress(fraction, text)